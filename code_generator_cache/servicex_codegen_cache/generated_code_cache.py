@@ -0,0 +1,161 @@
+# Copyright (c) 2019, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable, Optional, Union
+
+
+class GeneratedCodeCache:
+    """
+    Bounded on-disk cache of generated code directories, addressed by the hash
+    of everything that goes into them. An entry is written to a staging
+    directory and published with a single rename, so concurrent requests for
+    the same code never see a partially written entry. Entries are never
+    modified once published; the least recently used ones are evicted once
+    there are more than max_entries.
+    """
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None):
+        self.cache_dir = cache_dir or os.environ.get(
+            'CODEGEN_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'servicex-codegen-cache'))
+        self.max_entries = max_entries or int(os.environ.get('CODEGEN_CACHE_SIZE', 256))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: Union[str, bytes]) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    @staticmethod
+    def key_for_files(*parts: Union[str, bytes], files: list[str]) -> str:
+        """
+        Key that also covers the contents of the given files, such as the
+        templates copied into the generated code
+        """
+        contents = []
+        for path in files:
+            with open(path, 'rb') as f:
+                contents.append(f.read())
+        return GeneratedCodeCache.key(*parts, *contents)
+
+    def lookup(self, key: str) -> Optional[str]:
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            # Mark the entry as recently used
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        return entry
+
+    def publish(self, key: str, write: Callable[[str], None]) -> str:
+        """
+        Return the cached entry for key, creating it with write if it doesn't
+        exist yet. write is given an empty directory to write the files into.
+        """
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry
+
+        entry = os.path.join(self.cache_dir, key)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.cache_dir)
+        try:
+            write(staging)
+            os.rename(staging, entry)
+        except OSError:
+            # Lost the race with another request publishing the same code
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(entry):
+                raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._evict()
+        return entry
+
+    def materialize(self, key: str, write: Callable[[str], None], output_dir: str) -> str:
+        """
+        Make the files of the cached entry for key available in output_dir,
+        creating the entry with write first if needed. Files are hard linked
+        where possible rather than copied.
+
+        output_dir should be named after whatever addresses the entry, such as
+        the key or the query hash. Its files are linked into a staging
+        directory that is renamed into place, so a request never sees it half
+        populated, and once it exists it is left alone, since its contents can
+        only be those of the entry.
+        """
+        entry = self.publish(key, write)
+        if os.path.isdir(output_dir):
+            return output_dir
+
+        parent = os.path.dirname(os.path.abspath(output_dir))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=parent)
+        try:
+            for name in os.listdir(entry):
+                try:
+                    os.link(os.path.join(entry, name), os.path.join(staging, name))
+                except OSError:
+                    shutil.copyfile(os.path.join(entry, name), os.path.join(staging, name))
+            os.rename(staging, output_dir)
+        except OSError:
+            # Another request populated output_dir first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(output_dir):
+                raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return output_dir
+
+    def _evict(self):
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if not name.startswith('.')]
+        if len(entries) <= self.max_entries:
+            return
+
+        def last_used(path):
+            try:
+                return os.stat(path).st_mtime
+            except FileNotFoundError:
+                return 0
+
+        entries.sort(key=last_used)
+        for path in entries[:len(entries) - self.max_entries]:
+            # Move the entry out of the way first, so it disappears atomically
+            trash = tempfile.mkdtemp(prefix='.evicted-', dir=self.cache_dir)
+            try:
+                os.rename(path, os.path.join(trash, 'entry'))
+            except OSError:
+                pass
+            shutil.rmtree(trash, ignore_errors=True)
@@ -0,0 +1,115 @@
+# Copyright (c) 2019, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+import os
+import threading
+
+from servicex_codegen_cache.generated_code_cache import GeneratedCodeCache
+
+
+def _writer(source: str):
+    def write(output_dir):
+        with open(os.path.join(output_dir, 'generated_transformer.py'), 'w') as f:
+            f.write(source)
+    return write
+
+
+def test_publish(tmp_path):
+    cache = GeneratedCodeCache(str(tmp_path / 'cache'))
+    key = cache.key('import os')
+    assert cache.lookup(key) is None
+
+    entry = cache.publish(key, _writer('import os'))
+    assert cache.lookup(key) == entry
+
+    # Published entries are served as they are
+    assert cache.publish(key, _writer('something else')) == entry
+    with open(os.path.join(entry, 'generated_transformer.py')) as f:
+        assert f.read() == 'import os'
+
+
+def test_key_for_files(tmp_path):
+    template = tmp_path / 'template.py'
+    template.write_text('v1')
+    first = GeneratedCodeCache.key_for_files('query', files=[str(template)])
+    template.write_text('v2')
+    assert GeneratedCodeCache.key_for_files('query', files=[str(template)]) != first
+
+
+def test_materialize(tmp_path):
+    cache = GeneratedCodeCache(str(tmp_path / 'cache'))
+    key = cache.key('import os')
+    output_dir = str(tmp_path / 'out' / key)
+
+    assert cache.materialize(key, _writer('import os'), output_dir) == output_dir
+    assert os.listdir(output_dir) == ['generated_transformer.py']
+    assert not [name for name in os.listdir(tmp_path / 'out') if name.startswith('.')]
+
+    # An output directory that is already there is left alone
+    inode = os.stat(os.path.join(output_dir, 'generated_transformer.py')).st_ino
+    cache.materialize(key, _writer('import os'), output_dir)
+    assert os.stat(os.path.join(output_dir, 'generated_transformer.py')).st_ino == inode
+
+
+def test_materialize_concurrent(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    key = GeneratedCodeCache.key('import os')
+    output_dir = str(tmp_path / 'out' / key)
+    start = threading.Barrier(16)
+    seen = []
+    errors = []
+
+    def materialize():
+        start.wait()
+        try:
+            cache = GeneratedCodeCache(cache_dir)
+            cache.materialize(key, _writer('import os'), output_dir)
+            with open(os.path.join(output_dir, 'generated_transformer.py')) as f:
+                seen.append(f.read())
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=materialize) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert seen == ['import os'] * 16
+    assert os.listdir(tmp_path / 'out') == [key]
+
+
+def test_evict(tmp_path):
+    cache = GeneratedCodeCache(str(tmp_path / 'cache'), max_entries=2)
+    entries = []
+    for i in range(3):
+        entries.append(cache.publish(cache.key(str(i)), _writer(str(i))))
+        os.utime(entries[-1], (i, i))
+
+    assert not os.path.exists(entries[0])
+    assert sorted(os.listdir(tmp_path / 'cache')) == sorted(
+        os.path.basename(entry) for entry in entries[1:])
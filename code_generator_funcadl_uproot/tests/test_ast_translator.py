@@ -35,7 +35,7 @@ from uproot_code_generator.ast_translator import GenerateCodeException, \
 
 
 class TestGenerateCode:
-    def test_post_good_query(self, mocker):
+    def test_post_good_query(self, mocker, monkeypatch):
         mock_transform = namedtuple('GeneratedFileResult', 'body')(body=[
             namedtuple('GeneratedFileBody', 'value')(value="hi")
         ])
@@ -50,6 +50,7 @@ class TestGenerateCode:
             return_value="import foo")
 
         with tempfile.TemporaryDirectory() as tmpdirname:
+            monkeypatch.setenv('CODEGEN_CACHE_DIR', os.path.join(tmpdirname, 'cache'))
             os.environ['TEMPLATE_PATH'] = "uproot_code_generator/templates/transform_single_file.py" # NOQA E501
             os.environ['CAPABILITIES_PATH'] = "transformer_capabilities.json"
             query = "(Select (call EventDataset) (lambda (list event) (dict (list 'pt' 'eta') (list (attr event 'Muon_pt') (attr event 'Muon_eta')))))" # NOQA E501
@@ -64,6 +65,39 @@ class TestGenerateCode:
             mock_hash.assert_called_with("hi")
             gen_python_source.assert_called_with("hi")
 
+    def test_generate_code_cached(self, mocker, monkeypatch):
+        mock_transform = namedtuple('GeneratedFileResult', 'body')(body=[
+            namedtuple('GeneratedFileBody', 'value')(value="hi")
+        ])
+        mocker.patch(
+            "uproot_code_generator.ast_translator.text_ast_to_python_ast",
+            return_value=mock_transform)
+        mocker.patch(
+            "uproot_code_generator.ast_translator.ast_hash.calc_ast_hash",
+            return_value="123-456")
+        gen_python_source = mocker.patch(
+            "uproot_code_generator.ast_translator.generate_python_source",
+            return_value="import foo")
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            monkeypatch.setenv('CODEGEN_CACHE_DIR', os.path.join(tmpdirname, 'cache'))
+            os.environ['TEMPLATE_PATH'] = "uproot_code_generator/templates/transform_single_file.py" # NOQA E501
+            os.environ['CAPABILITIES_PATH'] = "transformer_capabilities.json"
+
+            translator = AstUprootTranslator()
+            first = translator.generate_code("query", cache_path=os.path.join(tmpdirname, "a"))
+            second = translator.generate_code("query", cache_path=os.path.join(tmpdirname, "b"))
+
+            gen_python_source.assert_called_once_with("hi")
+            assert first.hash == second.hash
+            with open(os.path.join(second.output_dir, 'generated_transformer.py')) as f:
+                assert f.read() == "import foo"
+            assert sorted(os.listdir(second.output_dir)) == [
+                'generated_transformer.py',
+                'transform_single_file.py',
+                'transformer_capabilities.json'
+            ]
+
     def test_post_codegen_error_query(self):
         """Post a query with a code-gen level error"""
         with tempfile.TemporaryDirectory() as tmpdirname:
@@ -35,9 +35,10 @@ from qastle import text_ast_to_python_ast
 from servicex_codegen.code_generator import CodeGenerator, GeneratedFileResult, \
     GenerateCodeException
 
+from servicex_codegen_cache.generated_code_cache import GeneratedCodeCache
+
 
 class AstUprootTranslator(CodeGenerator):
-    # Generate the code. Ignoring caching for now
     def generate_code(self, query, cache_path: str):
 
         if len(query) == 0:
@@ -52,25 +53,26 @@ class AstUprootTranslator(CodeGenerator):
         hash = ast_hash.calc_ast_hash(a)
         query_file_path = os.path.join(cache_path, hash)
 
-        # Create the files to run in that location.
-        if not os.path.exists(query_file_path):
-            os.makedirs(query_file_path)
-
-        src = generate_python_source(a)
-        print(query_file_path)
-        with open(os.path.join(query_file_path, 'generated_transformer.py'), 'w') as python_file:
-            python_file.write(src)
-
-        # Transfer the templated main python script
         template_path = os.environ.get('TEMPLATE_PATH',
                                        "/home/servicex/uproot_code_generator/"
                                        "templates/transform_single_file.py")
-        shutil.copyfile(template_path, os.path.join(query_file_path, "transform_single_file.py"))
-
         capabilities_path = os.environ.get('CAPABILITIES_PATH',
                                            "/home/servicex/transformer_capabilities.json")
-        shutil.copyfile(capabilities_path, os.path.join(query_file_path,
-                                                        "transformer_capabilities.json"))
+
+        def write_files(output_dir):
+            src = generate_python_source(a)
+            with open(os.path.join(output_dir, 'generated_transformer.py'), 'w') as python_file:
+                python_file.write(src)
+
+            # Transfer the templated main python script
+            shutil.copyfile(template_path, os.path.join(output_dir, "transform_single_file.py"))
+            shutil.copyfile(capabilities_path, os.path.join(output_dir,
+                                                            "transformer_capabilities.json"))
+
+        # Identical queries share the files generated for the first of them
+        cache = GeneratedCodeCache()
+        key = cache.key_for_files(hash, files=[template_path, capabilities_path])
+        cache.materialize(key, write_files, query_file_path)
 
         os.system("ls -lht " + query_file_path)
 
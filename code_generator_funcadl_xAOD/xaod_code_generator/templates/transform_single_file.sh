@@ -1,10 +1,90 @@
 #!/usr/bin/env bash
 set +e
 
-# If transformer has already run then we don't need to compile
-if [ ! -d /home/atlas/rel ]; then
+BUILD_DIR=/home/atlas/rel
+
+compile() {
   echo "Compile"
   bash /generated/runner.sh -c
+}
+
+# Pods running the same generated code in the same science image share the
+# compiled build through COMPILE_CACHE_DIR. Published archives are never
+# modified, so pods unpack them without any lock. Only a pod that finds no
+# archive takes the exclusive lock on the key to compile and publish it; the
+# others wait on the lock and then unpack what it published.
+restore() {
+  [ -f "$1" ] || return 1
+  echo "Restore compiled transformer from $1"
+  # Mark the archive as recently used so pruning keeps it
+  touch -c "$1"
+  if tar -xzf "$1" -C "$(dirname $BUILD_DIR)"; then
+    return 0
+  fi
+  echo "Could not unpack $1"
+  rm -rf "$BUILD_DIR"
+  return 1
+}
+
+# Keep only the COMPILE_CACHE_MAX_ENTRIES most recently used archives.
+# Removing an archive that another pod is unpacking is safe, it keeps
+# reading the unlinked file.
+prune() {
+  ls -t "$COMPILE_CACHE_DIR"/*.tar.gz 2> /dev/null | tail -n +$((${COMPILE_CACHE_MAX_ENTRIES:-32} + 1)) | \
+    while read -r old; do
+      echo "Prune compiled transformer $old"
+      rm -f "$old" "$old.lock"
+    done
+  # Archives left half written by pods that died while publishing, and the
+  # locks of builds that failed
+  find "$COMPILE_CACHE_DIR" -maxdepth 1 -name '*.tar.gz.*' ! -name '*.lock' -mmin +120 -delete 2> /dev/null
+  find "$COMPILE_CACHE_DIR" -maxdepth 1 -name '*.tar.gz.lock' -mmin +120 2> /dev/null | \
+    while read -r lock; do
+      [ -f "${lock%.lock}" ] || rm -f "$lock"
+    done
+}
+
+compile_or_restore() {
+  if [ -z "$COMPILE_CACHE_DIR" ] || [ ! -d "$COMPILE_CACHE_DIR" ] || ! command -v flock > /dev/null; then
+    compile
+    return $?
+  fi
+
+  key=$( (for f in $(ls /generated | sort); do echo "$f"; cat "/generated/$f"; done
+          echo "$SCIENCE_IMAGE"; cat /release_setup.sh 2> /dev/null) | sha256sum | cut -d ' ' -f 1)
+  archive="$COMPILE_CACHE_DIR/$key.tar.gz"
+
+  restore "$archive" && return 0
+
+  exec 9> "$archive.lock"
+  if ! flock -w "${COMPILE_CACHE_LOCK_TIMEOUT:-1800}" 9; then
+    echo "Timed out waiting for the compile cache, compiling locally"
+    compile
+    return $?
+  fi
+
+  # Another pod may have published the archive while we waited for the lock
+  if restore "$archive"; then
+    flock -u 9
+    return 0
+  fi
+
+  compile
+  status=$?
+  if [ $status == 0 ]; then
+    # Publish with a rename so nobody unpacks a partially written archive
+    tar -czf "$archive.$HOSTNAME" -C "$(dirname $BUILD_DIR)" "$(basename $BUILD_DIR)" && \
+      mv "$archive.$HOSTNAME" "$archive"
+    rm -f "$archive.$HOSTNAME"
+    prune
+  fi
+  flock -u 9
+  return $status
+}
+
+# If transformer has already run then we don't need to compile
+if [ ! -d $BUILD_DIR ]; then
+  compile_or_restore
   if [ $? != 0 ]; then
     echo "Compile step failed"
     exit 1
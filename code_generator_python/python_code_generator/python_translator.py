@@ -31,33 +31,37 @@ import shutil
 
 from servicex_codegen.code_generator import CodeGenerator, GeneratedFileResult
 
+from servicex_codegen_cache.generated_code_cache import GeneratedCodeCache
+
 
 class PythonTranslator(CodeGenerator):
 
-    # Generate the code. Ignoring caching for now
     def generate_code(self, query, cache_path: str):
 
         src = base64.b64decode(query).decode('ascii')
-        hash = "no-hash"
-        query_file_path = os.path.join(cache_path, hash)
-
-        # Create the files to run in that location.
-        if not os.path.exists(query_file_path):
-            os.makedirs(query_file_path)
 
-        with open(os.path.join(query_file_path, 'generated_transformer.py'), 'w') as python_file:
-            python_file.write(src)
-
-        # Transfer the templated main python script
         template_path = os.environ.get('TEMPLATE_PATH',
                                        "/home/servicex/python_code_generator/templates/transform_single_file.py")  # NOQA: 501
-        shutil.copyfile(template_path,
-                        os.path.join(query_file_path, "transform_single_file.py"))
-
         capabilities_path = os.environ.get('CAPABILITIES_PATH',
                                            "/home/servicex/transformer_capabilities.json")
-        shutil.copyfile(capabilities_path, os.path.join(query_file_path,
-                                                        "transformer_capabilities.json"))
+
+        def write_files(output_dir):
+            with open(os.path.join(output_dir, 'generated_transformer.py'), 'w') as python_file:
+                python_file.write(src)
+
+            # Transfer the templated main python script
+            shutil.copyfile(template_path,
+                            os.path.join(output_dir, "transform_single_file.py"))
+            shutil.copyfile(capabilities_path, os.path.join(output_dir,
+                                                            "transformer_capabilities.json"))
+
+        # The user supplied source is the whole of the generated code, so it
+        # addresses the cache entry. Concurrent requests for different code
+        # get their own output directory.
+        cache = GeneratedCodeCache()
+        hash = cache.key_for_files(src, files=[template_path, capabilities_path])
+        query_file_path = os.path.join(cache_path, hash)
+        cache.materialize(hash, write_files, query_file_path)
 
         os.system("ls -lht " + query_file_path)
         os.system(f"cat {query_file_path}/generated_transformer.py")
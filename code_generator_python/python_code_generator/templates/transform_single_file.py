@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 import time
@@ -5,6 +6,7 @@ from pathlib import Path
 import generated_transformer
 import awkward as ak
 import uproot
+import pyarrow as pa
 import pyarrow.parquet as pq
 import numpy as np
 instance = os.environ.get('INSTANCE_NAME', 'Unknown')
@@ -12,6 +14,27 @@ default_tree_name = "servicex"
 default_branch_name = "branch"
 
 
+def write_stats(total_events, output_size, query_time, serialization_time, writing_time):
+    """
+    Write the stats of the transform as a small JSON document to the file named
+    by the sidecar, which then has no need to scan the log for them
+    """
+    stats_file = os.environ.get('SERVICEX_STATS_FILE')
+    if not stats_file:
+        return
+
+    with open(stats_file, 'w') as stats:
+        json.dump({
+            'total-events': int(total_events),
+            'output-bytes': int(output_size),
+            'timings': {
+                'query': round(query_time, 3),
+                'serialization': round(serialization_time, 3),
+                'writing': round(writing_time, 3)
+            }
+        }, stats)
+
+
 def transform_single_file(file_path: str, output_path: Path, output_format: str):
     """
     Transform a single file and return some information about output
@@ -49,11 +72,13 @@ def transform_single_file(file_path: str, output_path: Path, output_format: str)
                         writer[key] = o_dict
 
             wtime = time.time()
+            output_size = os.stat(output_path).st_size
         elif output_format == 'raw-file':
             etime = time.time()
             total_events = 0
             output_path = output
             wtime = time.time()
+            output_size = os.stat(output_path).st_size
         else:
             if isinstance(output, dict):
                 tree_name = list(output.keys())[0]
@@ -69,18 +94,25 @@ def transform_single_file(file_path: str, output_path: Path, output_format: str)
 
             etime = time.time()
 
-            writer = pq.ParquetWriter(output_path, arrow.schema)
-            writer.write_table(table=arrow)
-            writer.close()
+            # Write through a file object rather than the path, so the output can
+            # be a FIFO the sidecar streams to the object store. ParquetWriter
+            # seeks in a file it opens itself, and a FIFO can't be stat'ed for its
+            # size, so count the bytes as they are written.
+            with open(output_path, 'wb') as wfile, pa.PythonFile(wfile, mode='w') as sink:
+                writer = pq.ParquetWriter(sink, arrow.schema)
+                writer.write_table(table=arrow)
+                writer.close()
+                output_size = sink.tell()
 
             wtime = time.time()
 
-        output_size = os.stat(output_path).st_size
         print(f'Detailed transformer times. query_time:{round(ttime - stime, 3)} '
               f'serialization: {round(etime - ttime, 3)} '
               f'writing: {round(wtime - etime, 3)}')
 
         print(f"Transform stats: Total Events: {total_events}, resulting file size {output_size}")
+        write_stats(total_events, output_size,
+                    ttime - stime, etime - ttime, wtime - etime)
     except Exception as error:
         mesg = f"Failed to transform input file {file_path}: {error}"
         print(mesg)
@@ -34,6 +34,7 @@
 import base64
 import os
 import tempfile
+import threading
 
 from python_code_generator.python_translator import \
     PythonTranslator
@@ -46,7 +47,61 @@ def test_generate_code():
     with tempfile.TemporaryDirectory() as tmpdirname:
         translator = PythonTranslator()
         code = base64.b64encode(b"import os")
-        expected_hash = "no-hash"
         result = translator.generate_code(code, tmpdirname)
-        assert result.hash == expected_hash
-        assert result.output_dir == os.path.join(tmpdirname, expected_hash)
+        assert len(result.hash) == 64
+        assert result.output_dir == os.path.join(tmpdirname, result.hash)
+
+
+def test_generate_code_cached(monkeypatch):
+    os.environ['TEMPLATE_PATH'] = "python_code_generator/templates/transform_single_file.py"
+    os.environ['CAPABILITIES_PATH'] = "transformer_capabilities.json"
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        monkeypatch.setenv('CODEGEN_CACHE_DIR', os.path.join(tmpdirname, 'cache'))
+        translator = PythonTranslator()
+
+        translator.generate_code(base64.b64encode(b"import os"), os.path.join(tmpdirname, 'a'))
+        result = translator.generate_code(base64.b64encode(b"import sys"),
+                                          os.path.join(tmpdirname, 'b'))
+
+        # Different source must never be served from another entry
+        with open(os.path.join(result.output_dir, 'generated_transformer.py')) as f:
+            assert f.read() == "import sys"
+        assert len(os.listdir(os.path.join(tmpdirname, 'cache'))) == 2
+
+
+def test_generate_code_concurrent(monkeypatch):
+    os.environ['TEMPLATE_PATH'] = "python_code_generator/templates/transform_single_file.py"
+    os.environ['CAPABILITIES_PATH'] = "transformer_capabilities.json"
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        monkeypatch.setenv('CODEGEN_CACHE_DIR', os.path.join(tmpdirname, 'cache'))
+        cache_path = os.path.join(tmpdirname, 'generated')
+        sources = [f"import module_{i % 4}".encode() for i in range(32)]
+        start = threading.Barrier(len(sources))
+        results = [None] * len(sources)
+        errors = []
+
+        def generate(index):
+            start.wait()
+            try:
+                results[index] = PythonTranslator().generate_code(
+                    base64.b64encode(sources[index]), cache_path)
+            except Exception as error:
+                errors.append(error)
+
+        # All of the requests share the one cache path
+        threads = [threading.Thread(target=generate, args=(i,)) for i in range(len(sources))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        for source, result in zip(sources, results):
+            with open(os.path.join(result.output_dir, 'generated_transformer.py'), 'rb') as f:
+                assert f.read() == source
+            assert sorted(os.listdir(result.output_dir)) == [
+                'generated_transformer.py', 'transform_single_file.py',
+                'transformer_capabilities.json']
+        assert len({result.output_dir for result in results}) == 4
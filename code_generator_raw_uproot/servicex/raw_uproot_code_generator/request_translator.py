@@ -31,9 +31,10 @@ import shutil
 from servicex_codegen.code_generator import CodeGenerator, GeneratedFileResult, \
     GenerateCodeException
 
+from servicex_codegen_cache.generated_code_cache import GeneratedCodeCache
+
 
 class RawUprootTranslator(CodeGenerator):
-    # Generate the code. Ignoring caching for now
     def generate_code(self, query, cache_path: str):
         import hashlib
 
@@ -160,21 +161,23 @@ def run_single_query(file_path, query):
         _hash = hashlib.md5(generated_code.encode(), usedforsecurity=False).hexdigest()
         query_file_path = os.path.join(cache_path, _hash)
 
-        # Create the files to run in that location.
-        if not os.path.exists(query_file_path):
-            os.makedirs(query_file_path)
-
-        with open(os.path.join(query_file_path, 'generated_transformer.py'), 'w') as python_file:
-            python_file.write(generated_code)
-
-        # Transfer the templated main python script
         template_path = os.environ.get('TEMPLATE_PATH',
                                        "/home/servicex/servicex/templates/transform_single_file.py")  # NOQA: 501
-        shutil.copyfile(template_path, os.path.join(query_file_path, "transform_single_file.py"))
-
         capabilities_path = os.environ.get('CAPABILITIES_PATH',
                                            "/home/servicex/transformer_capabilities.json")
-        shutil.copyfile(capabilities_path, os.path.join(query_file_path,
-                                                        "transformer_capabilities.json"))
+
+        def write_files(output_dir):
+            with open(os.path.join(output_dir, 'generated_transformer.py'), 'w') as python_file:
+                python_file.write(generated_code)
+
+            # Transfer the templated main python script
+            shutil.copyfile(template_path, os.path.join(output_dir, "transform_single_file.py"))
+            shutil.copyfile(capabilities_path, os.path.join(output_dir,
+                                                            "transformer_capabilities.json"))
+
+        # Identical queries share the files generated for the first of them
+        cache = GeneratedCodeCache()
+        key = cache.key_for_files(_hash, files=[template_path, capabilities_path])
+        cache.materialize(key, write_files, query_file_path)
 
         return GeneratedFileResult(_hash, query_file_path)
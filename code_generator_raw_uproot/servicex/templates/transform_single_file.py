@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 import time
@@ -9,6 +10,27 @@ import pyarrow
 instance = os.environ.get('INSTANCE_NAME', 'Unknown')
 
 
+def write_stats(total_events, output_size, query_time, serialization_time, writing_time):
+    """
+    Write the stats of the transform as a small JSON document to the file named
+    by the sidecar, which then has no need to scan the log for them
+    """
+    stats_file = os.environ.get('SERVICEX_STATS_FILE')
+    if not stats_file:
+        return
+
+    with open(stats_file, 'w') as stats:
+        json.dump({
+            'total-events': int(total_events),
+            'output-bytes': int(output_size),
+            'timings': {
+                'query': round(query_time, 3),
+                'serialization': round(serialization_time, 3),
+                'writing': round(writing_time, 3)
+            }
+        }, stats)
+
+
 def transform_single_file(file_path: str, output_path: Path, output_format: str):
     """
     Transform a single file and return some information about output
@@ -43,6 +65,7 @@ def transform_single_file(file_path: str, output_path: Path, output_format: str)
                     for k, v in histograms.items():
                         writer[k] = v
             wtime = time.time()
+            output_size = os.stat(output_path).st_size
 
         else:
             if histograms:
@@ -57,22 +80,31 @@ def transform_single_file(file_path: str, output_path: Path, output_format: str)
 
             etime = time.time()
 
-            try:
-                writer = pq.ParquetWriter(output_path, arrow.schema)
-            except pyarrow.lib.ArrowNotImplementedError:
-                raise RuntimeError("Unable to translate output tables to parquet "
-                                   "(probably different queries give different branches?)")
-            writer.write_table(table=arrow)
-            writer.close()
+            # Write through a file object rather than the path, so the output can
+            # be a FIFO the sidecar streams to the object store. ParquetWriter
+            # seeks in a file it opens itself, and a FIFO can't be stat'ed for its
+            # size, so count the bytes as they are written.
+            with open(output_path, 'wb') as wfile, \
+                    pyarrow.PythonFile(wfile, mode='w') as sink:
+                try:
+                    writer = pq.ParquetWriter(sink, arrow.schema)
+                except pyarrow.lib.ArrowNotImplementedError:
+                    raise RuntimeError("Unable to translate output tables to parquet "
+                                       "(probably different queries give different "
+                                       "branches?)")
+                writer.write_table(table=arrow)
+                writer.close()
+                output_size = sink.tell()
 
             wtime = time.time()
 
-        output_size = os.stat(output_path).st_size
         print(f'Detailed transformer times. query_time:{round(ttime - stime, 3)} '
               f'serialization: {round(etime - ttime, 3)} '
               f'writing: {round(wtime - etime, 3)}')
 
         print(f"Transform stats: Total Events: {total_events}, resulting file size {output_size}")
+        write_stats(total_events, output_size,
+                    ttime - stime, etime - ttime, wtime - etime)
     except Exception as error:
         mesg = f"Failed to transform input file {file_path}: {error}"
         print(mesg)
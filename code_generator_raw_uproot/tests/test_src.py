@@ -76,6 +76,25 @@ def test_generate_code():
             translator.generate_code(query, tmpdirname)
 
 
+def test_generate_code_cached(monkeypatch):
+    os.environ['TEMPLATE_PATH'] = "servicex/templates/transform_single_file.py"
+    os.environ['CAPABILITIES_PATH'] = "transformer_capabilities.json"
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        monkeypatch.setenv('CODEGEN_CACHE_DIR', os.path.join(tmpdirname, 'cache'))
+        translator = RawUprootTranslator()
+        query = json.dumps([{'treename': 'nominal', 'filter_name': ['lbn']}])
+
+        first = translator.generate_code(query, os.path.join(tmpdirname, 'a'))
+        second = translator.generate_code(query, os.path.join(tmpdirname, 'b'))
+
+        assert first.hash == second.hash
+        assert second.output_dir == os.path.join(tmpdirname, 'b', first.hash)
+        first_stat = os.stat(os.path.join(first.output_dir, 'generated_transformer.py'))
+        second_stat = os.stat(os.path.join(second.output_dir, 'generated_transformer.py'))
+        assert first_stat.st_ino == second_stat.st_ino
+
+
 def test_app():
     import servicex.raw_uproot_code_generator
     servicex.raw_uproot_code_generator.create_app()
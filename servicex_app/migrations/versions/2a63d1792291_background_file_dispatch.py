@@ -0,0 +1,32 @@
+"""Track dispatch of dataset files to requests.
+
+Revision ID: 2a63d1792291
+Revises: 553760254523
+Create Date: 2024-06-24
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a63d1792291'
+down_revision = '553760254523'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('files_dispatched', sa.Integer(),
+                                        nullable=False, server_default='0'))
+
+    # Files are published in chunks by keyset on (dataset_id, id), which also
+    # serves the plain dataset_id lookups
+    op.create_index('ix_files_dataset_id_id', 'files', ['dataset_id', 'id'], unique=False)
+    op.drop_index('ix_dataset_id', table_name='files')
+
+
+def downgrade():
+    op.create_index('ix_dataset_id', 'files', ['dataset_id'], unique=False)
+    op.drop_index('ix_files_dataset_id_id', table_name='files')
+    op.drop_column('requests', 'files_dispatched')
@@ -0,0 +1,24 @@
+"""Heartbeat of background file dispatch.
+
+Revision ID: 4f2c8e1a7b93
+Revises: b91d4f6e2c58
+Create Date: 2024-07-22
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2c8e1a7b93'
+down_revision = 'b91d4f6e2c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('dispatch_heartbeat', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('requests', 'dispatch_heartbeat')
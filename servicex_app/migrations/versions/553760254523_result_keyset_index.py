@@ -0,0 +1,24 @@
+"""Index for keyset pagination of transformation results.
+
+Revision ID: 553760254523
+Revises: cc6f51bf8b37
+Create Date: 2024-06-17
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '553760254523'
+down_revision = 'cc6f51bf8b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_transform_result_request_id_id',
+                    'transform_result', ['request_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transform_result_request_id_id', table_name='transform_result')
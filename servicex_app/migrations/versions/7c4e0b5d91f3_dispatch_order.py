@@ -0,0 +1,24 @@
+"""Per-request file dispatch order.
+
+Revision ID: 7c4e0b5d91f3
+Revises: 2a63d1792291
+Create Date: 2024-07-01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e0b5d91f3'
+down_revision = '2a63d1792291'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('dispatch_order', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    op.drop_column('requests', 'dispatch_order')
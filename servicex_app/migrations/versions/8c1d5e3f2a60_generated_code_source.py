@@ -0,0 +1,24 @@
+"""Keep the generated code archive with the code generation cache.
+
+Revision ID: 8c1d5e3f2a60
+Revises: 4f2c8e1a7b93
+Create Date: 2024-07-23
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d5e3f2a60'
+down_revision = '4f2c8e1a7b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('generated_code', sa.Column('source_zip', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('generated_code', 'source_zip')
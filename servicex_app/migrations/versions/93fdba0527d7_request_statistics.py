@@ -0,0 +1,60 @@
+"""Running transformation statistics on the request.
+
+Revision ID: 93fdba0527d7
+Revises: v1_3_0
+Create Date: 2024-06-03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '93fdba0527d7'
+down_revision = 'v1_3_0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('results_recorded', sa.Integer(),
+                                        nullable=False, server_default='0'))
+    op.add_column('requests', sa.Column('total_time', sa.BigInteger(),
+                                        nullable=False, server_default='0'))
+    op.add_column('requests', sa.Column('min_time', sa.Integer(), nullable=True))
+    op.add_column('requests', sa.Column('max_time', sa.Integer(), nullable=True))
+    op.add_column('requests', sa.Column('total_rate', sa.Float(),
+                                        nullable=False, server_default='0'))
+
+    # Backfill the aggregates of requests that already have results
+    op.execute("""
+        UPDATE requests
+        SET results_recorded = stats.results_recorded,
+            total_time = stats.total_time,
+            min_time = stats.min_time,
+            max_time = stats.max_time,
+            total_rate = stats.total_rate,
+            total_bytes = stats.total_bytes,
+            total_events = stats.total_events
+        FROM (
+            SELECT request_id,
+                   COUNT(*) AS results_recorded,
+                   COALESCE(SUM(transform_time), 0) AS total_time,
+                   MIN(transform_time) AS min_time,
+                   MAX(transform_time) AS max_time,
+                   COALESCE(SUM(avg_rate), 0) AS total_rate,
+                   COALESCE(SUM(total_bytes), 0) AS total_bytes,
+                   COALESCE(SUM(total_events), 0) AS total_events
+            FROM transform_result
+            GROUP BY request_id
+        ) AS stats
+        WHERE requests.request_id = stats.request_id;
+    """)
+
+
+def downgrade():
+    op.drop_column('requests', 'results_recorded')
+    op.drop_column('requests', 'total_time')
+    op.drop_column('requests', 'min_time')
+    op.drop_column('requests', 'max_time')
+    op.drop_column('requests', 'total_rate')
@@ -0,0 +1,28 @@
+"""Leases that let one App process at a time run the transformer scaler.
+
+Revision ID: a3e7c9d15b42
+Revises: d47a9b2c6e15
+Create Date: 2024-07-25
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c9d15b42'
+down_revision = 'd47a9b2c6e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leases',
+                    sa.Column('name', sa.String(length=64), nullable=False),
+                    sa.Column('holder', sa.String(length=256), nullable=False),
+                    sa.Column('expires', sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint('name'))
+
+
+def downgrade():
+    op.drop_table('leases')
@@ -0,0 +1,28 @@
+"""Index reading the files of a dataset largest first.
+
+Revision ID: b5d2f8e3a901
+Revises: a3e7c9d15b42
+Create Date: 2024-07-26
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2f8e3a901'
+down_revision = 'a3e7c9d15b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Files are published largest first in chunks by keyset on
+    # (dataset_id, coalesce(file_size, 0) DESC, id)
+    op.create_index('ix_files_dataset_id_size_id', 'files',
+                    ['dataset_id', sa.text('coalesce(file_size, 0) DESC'), 'id'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_files_dataset_id_size_id', table_name='files')
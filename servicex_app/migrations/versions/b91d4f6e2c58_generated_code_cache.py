@@ -0,0 +1,42 @@
+"""Cache of generated code.
+
+Revision ID: b91d4f6e2c58
+Revises: e5b8a3c07d14
+Create Date: 2024-07-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b91d4f6e2c58'
+down_revision = 'e5b8a3c07d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('generated_code',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('codegen', sa.String(length=128), nullable=False),
+                    sa.Column('code_gen_image', sa.String(length=256), nullable=False),
+                    sa.Column('selection_hash', sa.String(length=64), nullable=False),
+                    sa.Column('configmap', sa.String(length=128), nullable=False),
+                    sa.Column('source_hash', sa.String(length=64), nullable=False),
+                    sa.Column('transformer_image', sa.String(length=256), nullable=False),
+                    sa.Column('transformer_language', sa.String(length=256), nullable=False),
+                    sa.Column('transformer_command', sa.String(length=256), nullable=False),
+                    sa.Column('created', sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('codegen', 'code_gen_image', 'selection_hash',
+                                        name='uq_generated_code_key'))
+
+    # Reference counting of shared ConfigMaps looks requests up by ConfigMap
+    op.create_index(op.f('ix_requests_generated_code_cm'), 'requests',
+                    ['generated_code_cm'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_requests_generated_code_cm'), table_name='requests')
+    op.drop_table('generated_code')
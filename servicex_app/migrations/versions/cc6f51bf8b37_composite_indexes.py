@@ -0,0 +1,34 @@
+"""Composite indexes for request, result and file lookups.
+
+Revision ID: cc6f51bf8b37
+Revises: 93fdba0527d7
+Create Date: 2024-06-10
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc6f51bf8b37'
+down_revision = '93fdba0527d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Results are always looked up by request and listed in file order, the
+    # composite index makes the request_id only index redundant
+    op.create_index('ix_transform_result_request_id_file_id',
+                    'transform_result', ['request_id', 'file_id'], unique=False)
+    op.drop_index('ix_transform_result_request_id', table_name='transform_result')
+
+    # Requests waiting for a dataset are looked up on every add-file call
+    op.create_index('ix_requests_did_id_status',
+                    'requests', ['did_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_requests_did_id_status', table_name='requests')
+    op.create_index('ix_transform_result_request_id',
+                    'transform_result', ['request_id'], unique=False)
+    op.drop_index('ix_transform_result_request_id_file_id', table_name='transform_result')
@@ -0,0 +1,43 @@
+"""Count the results that the average time and rate are taken over.
+
+Revision ID: d47a9b2c6e15
+Revises: 8c1d5e3f2a60
+Create Date: 2024-07-24
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd47a9b2c6e15'
+down_revision = '8c1d5e3f2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('timed_results', sa.Integer(),
+                                        nullable=False, server_default='0'))
+    op.add_column('requests', sa.Column('rated_results', sa.Integer(),
+                                        nullable=False, server_default='0'))
+
+    # Backfill the counts of requests that already have results
+    op.execute("""
+        UPDATE requests
+        SET timed_results = stats.timed_results,
+            rated_results = stats.rated_results
+        FROM (
+            SELECT request_id,
+                   COUNT(transform_time) AS timed_results,
+                   COUNT(avg_rate) AS rated_results
+            FROM transform_result
+            GROUP BY request_id
+        ) AS stats
+        WHERE requests.request_id = stats.request_id;
+    """)
+
+
+def downgrade():
+    op.drop_column('requests', 'timed_results')
+    op.drop_column('requests', 'rated_results')
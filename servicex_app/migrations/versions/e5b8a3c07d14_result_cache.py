@@ -0,0 +1,29 @@
+"""Generated code hash of requests and output object of results, for the result cache.
+
+Revision ID: e5b8a3c07d14
+Revises: 7c4e0b5d91f3
+Create Date: 2024-07-08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8a3c07d14'
+down_revision = '7c4e0b5d91f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('code_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_requests_code_hash'), 'requests', ['code_hash'], unique=False)
+    op.add_column('transform_result', sa.Column('output_object', sa.String(length=512),
+                                                nullable=True))
+
+
+def downgrade():
+    op.drop_column('transform_result', 'output_object')
+    op.drop_index(op.f('ix_requests_code_hash'), table_name='requests')
+    op.drop_column('requests', 'code_hash')
@@ -29,6 +29,7 @@ import logging
 import os
 import sys
 from celery import Celery
+from datetime import timedelta
 from distutils.util import strtobool
 
 import base64
@@ -44,12 +45,17 @@ from flask_restful import Api
 from servicex_app.celery_task_router import route_task
 from servicex_app.cli.user_commands import add_user, list_users, approve_user
 from servicex_app.code_gen_adapter import CodeGenAdapter
+from servicex_app.code_gen_cache import CodeGenCache
 from servicex_app.docker_repo_adapter import DockerRepoAdapter
-from servicex_app.lookup_result_processor import LookupResultProcessor
+from servicex_app.file_dispatcher import FileDispatcher
+from servicex_app.lookup_result_processor import LookupResultProcessor, DISPATCH_AS_FOUND
 from servicex_app.object_store_manager import ObjectStoreManager
 from servicex_app.rabbit_adaptor import RabbitAdaptor
+from servicex_app.result_cache import ResultCache
 from servicex_app.routes import add_routes
+from servicex_app.status_notifier import StatusNotifier
 from servicex_app.transformer_manager import TransformerManager
+from servicex_app.transformer_scaler import TransformerScaler
 from flask_migrate import Migrate
 from servicex_app.models import db
 
@@ -265,21 +271,48 @@ def create_app(test_config=None,
             rabbit_adaptor = provided_rabbit_adaptor
 
         if not provided_code_gen_service:
+            if app.config.get('CODE_GEN_CACHE_ENABLED', False):
+                code_gen_cache = CodeGenCache(
+                    app.config.get('CODE_GEN_CACHE_SIZE', 256),
+                    timedelta(seconds=app.config.get('CODE_GEN_CACHE_TTL', 86400)))
+            else:
+                code_gen_cache = None
             code_gen_service = CodeGenAdapter(
                 app.config['CODE_GEN_SERVICE_URLS'],
-                transformer_manager)
+                transformer_manager,
+                code_gen_cache)
         else:
             code_gen_service = provided_code_gen_service
 
+        status_notifier = StatusNotifier()
+        if object_store and app.config.get('RESULT_CACHE_ENABLED', False):
+            result_cache = ResultCache(object_store, transformer_manager, status_notifier)
+        else:
+            result_cache = None
+
         if not provided_lookup_result_processor:
             lookup_result_processor = LookupResultProcessor(celery_app,
                                                             "http://" +
                                                             app.config[
-                                                                'ADVERTISED_HOSTNAME'] + "/"
+                                                                'ADVERTISED_HOSTNAME'] + "/",
+                                                            app.config.get(
+                                                                'TRANSFORMER_TASK_TARGET_BYTES', 0),
+                                                            app.config.get(
+                                                                'TRANSFORMER_DISPATCH_ORDER',
+                                                                DISPATCH_AS_FOUND),
+                                                            result_cache
                                                             )
         else:
             lookup_result_processor = provided_lookup_result_processor
 
+        file_dispatcher = FileDispatcher(app, lookup_result_processor,
+                                         app.config.get('FILE_DISPATCH_WORKERS', 4),
+                                         transformer_manager,
+                                         app.config.get('FILE_DISPATCH_STALL_SECONDS', 600))
+        if app.config.get('FILE_DISPATCH_RECOVERY_ENABLED', False) and \
+                app.config.get('FILE_DISPATCH_RECOVERY_INTERVAL', 60) > 0:
+            file_dispatcher.start_recovery(app.config.get('FILE_DISPATCH_RECOVERY_INTERVAL', 60))
+
         if not provided_docker_repo_adapter:
             docker_repo_adapter = DockerRepoAdapter()
         else:
@@ -294,6 +327,32 @@ def create_app(test_config=None,
             app.logger.error("Supplied Transformer Persistent Volume Claim Doesn't exist")
             sys.exit(-1)
 
+        if transformer_manager and \
+                app.config.get('TRANSFORMER_COMPILE_CACHE_CLAIM') and \
+                not transformer_manager.persistent_volume_claim_exists(
+                    app.config['TRANSFORMER_COMPILE_CACHE_CLAIM'],
+                    app.config['TRANSFORMER_NAMESPACE']):
+            app.logger.error("Supplied Compile Cache Persistent Volume Claim Doesn't exist")
+            sys.exit(-1)
+
+        # Keep idle transformers running for the images requests are most
+        # often made with, so they can start on a request immediately
+        if transformer_manager and app.config.get('TRANSFORMER_WARM_POOL_IMAGES') and \
+                app.config.get('TRANSFORMER_WARM_POOL_SIZE', 0):
+            transformer_manager.ensure_warm_pools(app.config)
+
+        if transformer_manager and app.config.get('TRANSFORMER_AUTOSCALE_ENABLED') and \
+                app.config.get('TRANSFORMER_AUTOSCALE_METRIC', 'cpu') == 'queue-depth':
+            TransformerScaler(
+                app, celery_app, transformer_manager,
+                min_replicas=app.config.get('TRANSFORMER_MIN_REPLICAS', 1),
+                max_replicas=app.config.get('TRANSFORMER_MAX_REPLICAS', 20),
+                max_step=app.config.get('TRANSFORMER_SCALER_MAX_STEP', 4),
+                drain_seconds=app.config.get('TRANSFORMER_SCALER_DRAIN_SECONDS', 300),
+                rate_window=app.config.get('TRANSFORMER_SCALER_RATE_WINDOW', 120),
+                interval=app.config.get('TRANSFORMER_SCALER_INTERVAL', 15)
+            ).start()
+
         api = Api(app, errors=Flask.errorhandler)
 
         # ensure the instance folder exists
@@ -308,7 +367,8 @@ def create_app(test_config=None,
             db.create_all()
 
         add_routes(api, transformer_manager, rabbit_adaptor, object_store, code_gen_service,
-                   lookup_result_processor, docker_repo_adapter, celery_app)
+                   lookup_result_processor, docker_repo_adapter, celery_app, file_dispatcher,
+                   result_cache, status_notifier)
 
         # Inject useful Python modules to make them available in all templates
         @app.context_processor
@@ -32,7 +32,7 @@ did_finder_pattern = r'(.+)\.lookup_dataset'
 
 
 def route_task(name, args, kwargs, options, task=None, **kw):
-    if name == 'transformer_sidecar.transform_file':
+    if name in ('transformer_sidecar.transform_file', 'transformer_sidecar.transform_files'):
         return {
             "queue": Queue(name=f"transformer-{kwargs['request_id']}",
                            durable=False,
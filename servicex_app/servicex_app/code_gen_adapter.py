@@ -25,17 +25,62 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import hashlib
+from typing import Optional
+
 import requests
 from requests_toolbelt.multipart import decoder
 
+from servicex_app.code_gen_cache import CodeGenCache, CodeGenResult
 from servicex_app.models import TransformRequest
 from servicex_app.reliable_requests import REQUEST_TIMEOUT, servicex_retry
 
 
 class CodeGenAdapter:
-    def __init__(self, code_gen_service_urls, transformer_manager):
+    def __init__(self, code_gen_service_urls, transformer_manager,
+                 cache: Optional[CodeGenCache] = None):
+        """
+        :param cache: Optional cache of generated code. When given, identical
+            selections reuse the earlier generated code and requests with the
+            same generated code share one ConfigMap.
+        """
         self.code_gen_service_urls = code_gen_service_urls
         self.transformer_manager = transformer_manager
+        self.cache = cache
+
+    @staticmethod
+    def source_hash(zipfile) -> str:
+        """
+        Hash the contents of the generated code. The zip archive itself isn't
+        hashed since it carries timestamps.
+        """
+        digest = hashlib.sha256()
+        for name in sorted(zipfile.namelist()):
+            digest.update(name.encode('utf-8') + b'\0')
+            digest.update(zipfile.read(name))
+        return digest.hexdigest()
+
+    @staticmethod
+    def generated_code_hash(source_hash: str, *settings: str) -> str:
+        """
+        Hash the generated code along with the settings it runs with
+        """
+        digest = hashlib.sha256()
+        for setting in settings:
+            digest.update(setting.encode('utf-8') + b'\0')
+        digest.update(source_hash.encode('ascii'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _use_generated_code(request_record: TransformRequest,
+                            generated: CodeGenResult) -> tuple[str, str, str, str]:
+        request_record.code_hash = CodeGenAdapter.generated_code_hash(
+            generated.source_hash, request_record.image or generated.transformer_image,
+            generated.transformer_language, generated.transformer_command)
+        return (generated.configmap,
+                generated.transformer_image,
+                generated.transformer_language,
+                generated.transformer_command)
 
     @servicex_retry()
     def post_request(self, post_url, post_obj):
@@ -66,6 +111,17 @@ class CodeGenAdapter:
         if not post_url:
             raise ValueError(f'{user_codegen_name}, code generator unavailable for use')
 
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(user_codegen_name, request_record.code_gen_image,
+                                       request_record.selection)
+            cached = self.cache.get(cache_key)
+
+            # The ConfigMap may have been cleaned up since the code was cached
+            if cached is not None and \
+                    self.transformer_manager.configmap_exists(cached.configmap, namespace):
+                return self._use_generated_code(request_record, cached)
+
         result = self.post_request(post_url + "/servicex/generated-code", post_obj={
             "code": request_record.selection,
         })
@@ -82,13 +138,21 @@ class CodeGenAdapter:
         transformer_image = (decoder_parts.parts[0].text).strip()
         transformer_language = (decoder_parts.parts[1].text).strip()
         transformer_command = (decoder_parts.parts[2].text).strip()
-        zipfile = decoder_parts.parts[3].content
+        source_zip = decoder_parts.parts[3].content
+
+        zipfile = ZipFile(BytesIO(source_zip))
+        source_hash = self.source_hash(zipfile)
+
+        if self.cache is not None:
+            configmap = self.transformer_manager.create_shared_configmap_from_zip(
+                zipfile, source_hash, namespace)
+        else:
+            configmap = self.transformer_manager.create_configmap_from_zip(
+                zipfile, request_record.request_id, namespace)
 
-        zipfile = ZipFile(BytesIO(zipfile))
+        generated = CodeGenResult(configmap, source_hash, transformer_image,
+                                  transformer_language, transformer_command)
+        if self.cache is not None:
+            self.cache.put(cache_key, generated, source_zip)
 
-        return (self.transformer_manager.create_configmap_from_zip(zipfile,
-                                                                   request_record.request_id,
-                                                                   namespace),
-                transformer_image,
-                transformer_language,
-                transformer_command)
+        return self._use_generated_code(request_record, generated)
@@ -0,0 +1,135 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import NamedTuple, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from servicex_app.models import GeneratedCode, db
+
+
+class CodeGenKey(NamedTuple):
+    codegen: str
+    code_gen_image: str
+    selection_hash: str
+
+
+class CodeGenResult(NamedTuple):
+    configmap: str
+    source_hash: str
+    transformer_image: str
+    transformer_language: str
+    transformer_command: str
+
+
+class CodeGenCache:
+    """
+    Remember the code generated for a selection, keyed by the code generator
+    and the hash of the selection. Recently used entries are kept in memory,
+    and every entry is persisted to the database so that other app workers
+    and restarts can use it too. Entries expire after ttl, so that a code
+    generator redeployed under the same image tag is eventually picked up.
+    """
+    def __init__(self, max_entries: int = 256, ttl: timedelta = timedelta(days=1)):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[CodeGenKey, tuple[datetime, CodeGenResult]] = OrderedDict()
+        self.lock = Lock()
+
+    @staticmethod
+    def key(codegen: str, code_gen_image: str, selection: str) -> CodeGenKey:
+        selection_hash = hashlib.sha256(selection.encode('utf-8')).hexdigest()
+        return CodeGenKey(codegen, code_gen_image or '', selection_hash)
+
+    def _expired(self, created: datetime) -> bool:
+        return created < datetime.utcnow() - self.ttl
+
+    def _remember(self, key: CodeGenKey, created: datetime, result: CodeGenResult):
+        with self.lock:
+            self.entries[key] = (created, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get(self, key: CodeGenKey) -> Optional[CodeGenResult]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+
+        if entry is None:
+            record = GeneratedCode.lookup(*key)
+            if record is None:
+                return None
+            entry = (record.created, CodeGenResult(record.configmap, record.source_hash,
+                                                   record.transformer_image,
+                                                   record.transformer_language,
+                                                   record.transformer_command))
+            self._remember(key, *entry)
+
+        created, result = entry
+        if self._expired(created):
+            self.discard(key)
+            return None
+        return result
+
+    def put(self, key: CodeGenKey, result: CodeGenResult,
+            source_zip: Optional[bytes] = None) -> None:
+        """
+        Remember the result. The database row is written in the caller's
+        transaction, inside a savepoint, so that losing a race with another
+        worker caching the same selection doesn't fail the caller.
+        :param source_zip: The generated code archive, kept in the database
+            only, to recreate the ConfigMap from
+        """
+        created = datetime.utcnow()
+        self._remember(key, created, result)
+
+        try:
+            with db.session.begin_nested():
+                GeneratedCode.query.filter_by(codegen=key.codegen,
+                                              code_gen_image=key.code_gen_image,
+                                              selection_hash=key.selection_hash).delete()
+                db.session.add(GeneratedCode(codegen=key.codegen,
+                                             code_gen_image=key.code_gen_image,
+                                             selection_hash=key.selection_hash,
+                                             created=created,
+                                             source_zip=source_zip,
+                                             **result._asdict()))
+        except IntegrityError:
+            pass
+
+    def discard(self, key: CodeGenKey) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+        GeneratedCode.query.filter_by(codegen=key.codegen,
+                                      code_gen_image=key.code_gen_image,
+                                      selection_hash=key.selection_hash).delete()
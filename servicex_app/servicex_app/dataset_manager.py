@@ -28,16 +28,19 @@
 import hashlib
 from datetime import datetime, timezone
 from logging import Logger
-from typing import List
+from typing import Iterator, List
 
 from celery import Celery
 from flask_sqlalchemy import SQLAlchemy
 from servicex_app.did_parser import DIDParser
-from servicex_app.lookup_result_processor import LookupResultProcessor
+from servicex_app.lookup_result_processor import LookupResultProcessor, DISPATCH_LARGEST_FIRST
 from servicex_app.models import Dataset, DatasetFile, TransformRequest, DatasetStatus
 
 
 class DatasetManager:
+    # Number of files read from the database and published at a time
+    PUBLISH_CHUNK_SIZE = 10000
+
     def __init__(self, dataset: Dataset, logger: Logger, db: SQLAlchemy):
         self.dataset = dataset
         self.did = None if dataset.did_finder == 'user' else DIDParser(dataset.name)
@@ -85,6 +88,7 @@ class DatasetManager:
                 last_updated=datetime.fromtimestamp(0),
                 lookup_status=DatasetStatus.complete,
                 did_finder='user',
+                n_files=len(file_list),
                 files=[
                     DatasetFile(
                         paths=file,
@@ -116,7 +120,8 @@ class DatasetManager:
         if self.did:
             return self.did.full_did
         else:
-            return self.file_list_hash(self.file_paths)
+            # Datasets made from a file list are named by the hash of the list
+            return self.dataset.name
 
     @property
     def id(self):
@@ -135,8 +140,13 @@ class DatasetManager:
         return self.dataset.lookup_status == DatasetStatus.complete
 
     @property
-    def file_paths(self) -> List[str]:
-        return [file.paths for file in self.dataset.files]
+    def file_paths(self) -> Iterator[str]:
+        """
+        The paths of the dataset's files, read a chunk at a time
+        """
+        for chunk in DatasetFile.chunks_for_dataset(self.dataset.id, self.PUBLISH_CHUNK_SIZE):
+            for file in chunk:
+                yield file.paths
 
     def refresh(self):
         self.db.session.refresh(self.dataset)
@@ -148,21 +158,56 @@ class DatasetManager:
         self.logger.debug(f"Submitted lookup request for {self.did.did} taskID {task_id} ")
         self.dataset.lookup_status = DatasetStatus.looking
 
-    def publish_files(self, request: TransformRequest,
-                      lookup_result_processor: LookupResultProcessor) -> None:
-        request.files = len(self.dataset.files)
-        lookup_result_processor.add_files_to_processing_queue(request, files=[
-            file for file in self.dataset.files
-        ])
+    @property
+    def file_count(self) -> int:
+        # The lookup records the number of files once it completes
+        if self.is_complete and self.dataset.n_files is not None:
+            return self.dataset.n_files
+        return DatasetFile.count_for_dataset(self.dataset.id)
 
-    def add_files(self, files: List[DatasetFile], requests: List[TransformRequest],
+    def publish_files(self, request: TransformRequest,
+                      lookup_result_processor: LookupResultProcessor,
+                      commit_progress: bool = False, resume: bool = False) -> None:
+        """
+        Publish every file of the dataset to the request, a chunk at a time
+        :param commit_progress: Commit the request's files_dispatched and
+            dispatch_heartbeat after each chunk
+        :param resume: Skip the files_dispatched files already published by an
+            earlier attempt that didn't finish
+        """
+        if resume:
+            skip = request.files_dispatched
+        else:
+            request.files = self.file_count
+            request.files_dispatched = 0
+            skip = 0
+        if commit_progress:
+            request.dispatch_heartbeat = datetime.now(tz=timezone.utc)
+            self.db.session.commit()
+
+        # Ordering within a chunk is up to the processor, but largest-first has
+        # to be applied across the whole dataset for the big files to go first
+        largest_first = lookup_result_processor.dispatch_order_for(request) == \
+            DISPATCH_LARGEST_FIRST
+        for chunk in DatasetFile.chunks_for_dataset(self.dataset.id, self.PUBLISH_CHUNK_SIZE,
+                                                    largest_first=largest_first):
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            chunk, skip = chunk[skip:], 0
+
+            lookup_result_processor.add_files_to_processing_queue(request, files=chunk,
+                                                                  use_cache=True)
+            request.files_dispatched += len(chunk)
+            if commit_progress:
+                request.dispatch_heartbeat = datetime.now(tz=timezone.utc)
+                self.db.session.commit()
+
+    def add_files(self, files: List[dict], requests: List[TransformRequest],
                   lookup_result_processor: LookupResultProcessor) -> None:
-        self.dataset.files.extend(files)
-        self.dataset.save_to_db()
+        new_files = DatasetFile.bulk_insert(self.dataset.id, files)
 
         for request in requests:
-            request.files += len(files)
-            lookup_result_processor.add_files_to_processing_queue(request, files=[
-                file for file in files
-            ])
+            request.files += len(new_files)
+            lookup_result_processor.add_files_to_processing_queue(request, files=new_files)
             request.save_to_db()
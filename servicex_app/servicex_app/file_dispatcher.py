@@ -0,0 +1,173 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from flask import Flask
+
+from servicex_app.dataset_manager import DatasetManager
+from servicex_app.lookup_result_processor import LookupResultProcessor
+from servicex_app.models import Dataset, TransformRequest, TransformStatus, db
+
+
+class FileDispatcher:
+    """
+    Publish the files of an already looked up dataset to a transform request
+    from a pool of background threads, so that submitting a request doesn't
+    wait for one task per file to be sent. Progress is committed to the
+    request's files_dispatched after every chunk. With no workers the files
+    are published inline.
+
+    Requests expected to be served entirely from the result cache are
+    published without transformers, which are only started if some of the
+    files still need to be transformed once publishing is done.
+
+    Publishing is lost with the app worker running it. Every request's
+    dispatch_heartbeat is moved on with each committed chunk, and a recovery
+    pass resumes publishing the requests whose heartbeat is older than
+    stall_seconds, from the last committed chunk. Only one recovery thread
+    runs per process, however many apps the process creates.
+    """
+    _recovery_lock = threading.Lock()
+    _recovery_thread: Optional[threading.Thread] = None
+
+    def __init__(self, app: Flask, lookup_result_processor: LookupResultProcessor,
+                 max_workers: int, transformer_manager=None, stall_seconds: float = 600):
+        self.app = app
+        self.lookup_result_processor = lookup_result_processor
+        self.transformer_manager = transformer_manager
+        self.stall_seconds = stall_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='file-dispatcher') \
+            if max_workers > 0 else None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_recovery(self, interval: float) -> bool:
+        """
+        Start the recovery thread of this process, unless it is already running
+        :return: Whether this dispatcher's thread was started
+        """
+        with FileDispatcher._recovery_lock:
+            running = FileDispatcher._recovery_thread
+            if running is not None and running.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run_recovery, args=(interval,),
+                                            name='file-dispatcher-recovery', daemon=True)
+            FileDispatcher._recovery_thread = self._thread
+            self._thread.start()
+            return True
+
+    def stop_recovery(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run_recovery(self, interval: float):
+        while not self._stop.wait(interval):
+            with self.app.app_context():
+                try:
+                    self.recover_stalled()
+                except Exception:
+                    self.app.logger.exception("File dispatch recovery pass failed")
+
+    def recover_stalled(self) -> int:
+        """
+        Resume publishing the files of the requests whose dispatch stalled. Each
+        stalled request is claimed first, so only one app worker resumes it.
+        :return: Number of requests resumed
+        """
+        before = datetime.now(tz=timezone.utc) - timedelta(seconds=self.stall_seconds)
+        resumed = 0
+        for request in TransformRequest.stalled_dispatches(before):
+            if not TransformRequest.claim_dispatch(request.request_id, request.dispatch_heartbeat):
+                continue
+
+            self.app.logger.warning("Resuming stalled publishing of files", extra={
+                'requestId': request.request_id, 'files_dispatched': request.files_dispatched})
+            if self.executor is None:
+                self._publish_files(request.did_id, request.request_id, True, resume=True)
+            else:
+                self.executor.submit(self._publish_files, request.did_id, request.request_id,
+                                     True, resume=True)
+            resumed += 1
+        return resumed
+
+    def publish_files(self, dataset_manager: DatasetManager, request: TransformRequest,
+                      start_transformers: bool = False) -> Optional[Future]:
+        """
+        Publish the files of the dataset to the request. The request must have
+        been committed, since the background thread looks it up again.
+        :param start_transformers: Start the request's transformers after publishing
+            if it wasn't completed from the result cache
+        :return: Future of the background dispatch, or None if it ran inline
+        """
+        if self.executor is None:
+            self._publish(dataset_manager, request, start_transformers)
+            return None
+
+        return self.executor.submit(self._publish_files, dataset_manager.id, request.request_id,
+                                    start_transformers)
+
+    def _publish(self, dataset_manager: DatasetManager, request: TransformRequest,
+                 start_transformers: bool, resume: bool = False) -> None:
+        dataset_manager.publish_files(request, self.lookup_result_processor,
+                                      commit_progress=True, resume=resume)
+        if not (start_transformers and self.transformer_manager and
+                self.app.config['TRANSFORMER_MANAGER_ENABLED'] and
+                request.status == TransformStatus.running):
+            return
+
+        # A resumed request may have had its transformers started already
+        if resume and self.transformer_manager.get_transformer_replicas(
+                request.request_id, self.app.config['TRANSFORMER_NAMESPACE']) is not None:
+            return
+        self.transformer_manager.start_transformers(self.app.config, request)
+
+    def _publish_files(self, dataset_id: int, request_id: str, start_transformers: bool,
+                       resume: bool = False) -> None:
+        with self.app.app_context():
+            try:
+                request = TransformRequest.lookup(request_id)
+                dataset_manager = DatasetManager(Dataset.find_by_id(dataset_id),
+                                                 self.app.logger, db)
+                self._publish(dataset_manager, request, start_transformers, resume)
+                self.app.logger.info("Finished publishing files", extra={
+                    'requestId': request_id, 'files_dispatched': request.files_dispatched})
+            except Exception as e:
+                self.app.logger.exception("Failed to publish files",
+                                          extra={'requestId': request_id})
+                db.session.rollback()
+                request = TransformRequest.lookup(request_id)
+                if request is not None:
+                    request.status = TransformStatus.fatal
+                    request.failure_description = f"Failed to publish files: {e}"
+                    db.session.commit()
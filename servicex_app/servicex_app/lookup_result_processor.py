@@ -26,38 +26,158 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from collections import defaultdict, deque
+from typing import Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
 from celery import Celery
 from flask import current_app
 
+# Order in which the files of a request are put on the transformer queue
+DISPATCH_AS_FOUND = 'as-found'
+DISPATCH_LARGEST_FIRST = 'largest-first'
+DISPATCH_INTERLEAVE_SITES = 'interleave-sites'
+DISPATCH_ORDERS = [DISPATCH_AS_FOUND, DISPATCH_LARGEST_FIRST, DISPATCH_INTERLEAVE_SITES]
+
 
 class LookupResultProcessor:
-    def __init__(self, celery_app: Celery, advertised_endpoint: str):
+    def __init__(self, celery_app: Celery, advertised_endpoint: str,
+                 target_bytes_per_task: int = 0,
+                 dispatch_order: str = DISPATCH_AS_FOUND,
+                 result_cache=None):
+        """
+        :param celery_app: Celery app used to publish the transform tasks
+        :param advertised_endpoint: URL of this app as seen by the transformers
+        :param target_bytes_per_task: When non-zero, files are batched into
+            transform_files tasks of roughly this many bytes each rather than
+            sent as one transform_file task per file
+        :param dispatch_order: Default order in which files are dispatched, for
+            requests that don't choose one. One of DISPATCH_ORDERS
+        :param result_cache: Optional ResultCache that files are served from
+            instead of being transformed again
+        """
+        if dispatch_order not in DISPATCH_ORDERS:
+            raise ValueError(f"Unknown dispatch order {dispatch_order}")
         self.celery = celery_app
         self.advertised_endpoint = advertised_endpoint
+        self.target_bytes_per_task = target_bytes_per_task
+        self.dispatch_order = dispatch_order
+        self.result_cache = result_cache
 
     @staticmethod
     def celery_task_name(request_id):
         return f'transformer-{request_id}.transform_file'
 
-    def add_files_to_processing_queue(self, request, files=None):
+    def dispatch_order_for(self, request) -> str:
+        return request.dispatch_order or self.dispatch_order
+
+    @staticmethod
+    def replica_site(paths: str) -> Optional[str]:
+        return urlparse(paths.split(',')[0]).hostname
+
+    @classmethod
+    def order_files(cls, files: Iterable, dispatch_order: str) -> List:
+        """
+        Put files in the order they should be dispatched in.
+
+        largest-first starts the biggest files (by size, then events) early so
+        they don't end up defining the tail of the request. interleave-sites
+        round-robins over the site of each file's first replica so that
+        concurrent transformers spread their reads across sites.
+        """
+        if dispatch_order == DISPATCH_LARGEST_FIRST:
+            return sorted(files,
+                          key=lambda f: (f.file_size or 0, f.file_events or 0),
+                          reverse=True)
+
+        if dispatch_order == DISPATCH_INTERLEAVE_SITES:
+            by_site = defaultdict(deque)
+            for file_record in files:
+                by_site[cls.replica_site(file_record.paths)].append(file_record)
+
+            ordered = []
+            sites = list(by_site.values())
+            while sites:
+                ordered.extend(site.popleft() for site in sites)
+                sites = [site for site in sites if site]
+            return ordered
+
+        return list(files)
+
+    def batch_files(self, files: Iterable) -> Iterator[List]:
+        """
+        Group files into batches whose total size does not exceed the target
+        bytes per task. A file larger than the target gets a batch of its own,
+        as does any file whose size is not known.
+        """
+        batch = []
+        batch_bytes = 0
+        for file_record in files:
+            size = file_record.file_size or self.target_bytes_per_task
+            if batch and batch_bytes + size > self.target_bytes_per_task:
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(file_record)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def add_files_to_processing_queue(self, request, files=None, use_cache=False):
+        """
+        Send the files to the request's transformers.
+        :param use_cache: Serve files from the result cache where possible. Only
+            safe once the dataset lookup is complete, since the request completes
+            if the last of its files are served from the cache.
+        """
         if files is None:
             files = request.all_files
-        for file_record in files:
-            self.celery.send_task("transformer_sidecar.transform_file",
-                                  kwargs={
-                                        'request_id': request.request_id,
-                                        'file_id': file_record.id,
-                                        'paths': file_record.paths.split(','),
-                                        "service_endpoint": self.advertised_endpoint
-                                        + "servicex/internal/transformation/"
-                                        + request.request_id,
-                                        "result_destination": request.result_destination,
-                                        "result_format": request.result_format
-                                    })
-
-            current_app.logger.info("Added file to processing queue", extra={
-                                    "paths": file_record.paths.split(','),
-                                    "task_id": self.celery_task_name(request.request_id)})
+
+        if use_cache and self.result_cache:
+            files, _ = self.result_cache.serve(request, files)
+
+        files = self.order_files(files, self.dispatch_order_for(request))
+
+        service_endpoint = self.advertised_endpoint + \
+            "servicex/internal/transformation/" + request.request_id
+
+        # Publish the whole batch over one producer rather than acquiring a
+        # connection from the pool for every file
+        with self.celery.producer_or_acquire() as producer:
+            if self.target_bytes_per_task:
+                for batch in self.batch_files(files):
+                    self.celery.send_task("transformer_sidecar.transform_files",
+                                          kwargs={
+                                              'request_id': request.request_id,
+                                              'files': [(file_record.id,
+                                                         file_record.paths.split(','),
+                                                         file_record.file_size)
+                                                        for file_record in batch],
+                                              "service_endpoint": service_endpoint,
+                                              "result_destination": request.result_destination,
+                                              "result_format": request.result_format
+                                          },
+                                          producer=producer)
+
+                    current_app.logger.debug("Added batch of files to processing queue", extra={
+                                             "num_files": len(batch),
+                                             "task_id": self.celery_task_name(request.request_id)})
+            else:
+                for file_record in files:
+                    self.celery.send_task("transformer_sidecar.transform_file",
+                                          kwargs={
+                                              'request_id': request.request_id,
+                                              'file_id': file_record.id,
+                                              'paths': file_record.paths.split(','),
+                                              "service_endpoint": service_endpoint,
+                                              "result_destination": request.result_destination,
+                                              "result_format": request.result_format
+                                          },
+                                          producer=producer)
+
+                    current_app.logger.debug("Added file to processing queue", extra={
+                                             "paths": file_record.paths.split(','),
+                                             "task_id": self.celery_task_name(request.request_id)})
 
         current_app.logger.info("Added files to processing queue", extra={
             "num_files": len(files),
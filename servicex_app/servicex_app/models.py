@@ -28,12 +28,13 @@
 from __future__ import annotations
 
 import hashlib
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Iterable, List, Optional, Union
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
 
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy import DateTime, ForeignKey, case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.exc import NoResultFound
 
@@ -159,8 +160,37 @@ class TransformStatus(Enum):
         self.is_complete = is_complete
 
 
+class RequestCounts(NamedTuple):
+    """
+    File counters of a TransformRequest as returned by the atomic update
+    """
+    files: int
+    files_completed: int
+    files_failed: int
+
+    @property
+    def files_remaining(self) -> Optional[int]:
+        if self.files:
+            return self.files - self.files_completed - self.files_failed
+        else:
+            return None
+
+    def completed_by(self, files: int) -> bool:
+        """
+        Whether the update that returned these counts, which recorded the given
+        number of files, is the one that took files_remaining from a positive
+        number to zero or below
+        """
+        remaining = self.files_remaining
+        return remaining is not None and files > 0 and remaining <= 0 < remaining + files
+
+
 class TransformRequest(db.Model):
     __tablename__ = 'requests'
+    __table_args__ = (
+        # Lookup of the requests waiting on a dataset
+        db.Index('ix_requests_did_id_status', 'did_id', 'status'),
+    )
     OBJECT_STORE_DEST = 'object-store'
     VOLUME_DEST = 'volume'
 
@@ -182,50 +212,121 @@ class TransformRequest(db.Model):
     files = db.Column(db.Integer, default=0, nullable=False)
     files_completed = db.Column(db.Integer, default=0, nullable=False)
     files_failed = db.Column(db.Integer, default=0, nullable=False)
+    files_dispatched = db.Column(db.Integer, default=0, nullable=False)
+
+    # Last time the file dispatcher committed progress publishing the files of
+    # this request, so publishing cut short by a lost app worker can be resumed
+    dispatch_heartbeat = db.Column(db.DateTime, nullable=True)
 
     total_events = db.Column(db.BigInteger, nullable=True)
     total_bytes = db.Column(db.BigInteger, nullable=True)
+
+    # Running aggregates of the transformation results, maintained as results
+    # are recorded so that statistics don't need to scan transform_result
+    results_recorded = db.Column(db.Integer, default=0, nullable=False)
+    total_time = db.Column(db.BigInteger, default=0, nullable=False)
+    min_time = db.Column(db.Integer, nullable=True)
+    max_time = db.Column(db.Integer, nullable=True)
+    total_rate = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Results that reported a transform time and a rate. The averages are taken
+    # over these only, like AVG() skips the results without a value.
+    timed_results = db.Column(db.Integer, default=0, nullable=False)
+    rated_results = db.Column(db.Integer, default=0, nullable=False)
+
     did_lookup_time = db.Column(db.Integer, nullable=True)
-    generated_code_cm = db.Column(db.String(128), nullable=True)
+    generated_code_cm = db.Column(db.String(128), nullable=True, index=True)
     status = db.Column(db.Enum(TransformStatus), nullable=False)
     failure_description = db.Column(db.String(max_string_size), nullable=True)
     app_version = db.Column(db.String(64), nullable=True)
     code_gen_image = db.Column(db.String(256), nullable=True)
     transformer_language = db.Column(db.String(256), nullable=True)
     transformer_command = db.Column(db.String(256), nullable=True)
+    dispatch_order = db.Column(db.String(32), nullable=True)
+
+    # Hash of the generated code and the transformer it runs in. Requests with
+    # the same hash and result format produce interchangeable outputs.
+    code_hash = db.Column(db.String(64), nullable=True, index=True)
 
     def save_to_db(self):
         db.session.add(self)
         db.session.commit()
 
-    def to_json(self):
+    @classmethod
+    def json_fields(cls) -> dict:
+        """
+        The fields of the JSON representation of a request. Each field maps to
+        the columns it is computed from and a function computing it from an
+        object or row that has those columns.
+        """
         iso_fmt = '%Y-%m-%dT%H:%M:%S.%fZ'
-        result_obj = {
-            'request_id': self.request_id,
-            'title': self.title,
-            'did': self.did,
-            'did_id': self.did_id,
-            'selection': self.selection,
-            'tree-name': self.tree_name,
-            'image': self.image,
-            'workers': self.workers,
-            'result-destination': self.result_destination,
-            'result-format': self.result_format,
-            'generated-code-cm': self.generated_code_cm,
-            'status': self.status.string_name,
-            'failure-info': self.failure_description,
-            'app-version': self.app_version,
-            'code-gen-image': self.code_gen_image,
-            'files': self.files,
-            'files-completed': self.files_completed,
-            'files-failed': self.files_failed,
-            'files-remaining': self.files_remaining,
-            'submit-time': str(self.submit_time.strftime(iso_fmt)),
-            'finish-time': str(self.finish_time)
+
+        def finish_time(r):
+            if r.finish_time is not None:
+                return str(r.finish_time.strftime(iso_fmt))
+            return str(r.finish_time)
+
+        def files_remaining(r):
+            if r.files:
+                return r.files - r.files_completed - r.files_failed
+            return None
+
+        return {
+            'request_id': ([cls.request_id], lambda r: r.request_id),
+            'title': ([cls.title], lambda r: r.title),
+            'did': ([cls.did], lambda r: r.did),
+            'did_id': ([cls.did_id], lambda r: r.did_id),
+            'selection': ([cls.selection], lambda r: r.selection),
+            'tree-name': ([cls.tree_name], lambda r: r.tree_name),
+            'image': ([cls.image], lambda r: r.image),
+            'workers': ([cls.workers], lambda r: r.workers),
+            'result-destination': ([cls.result_destination], lambda r: r.result_destination),
+            'result-format': ([cls.result_format], lambda r: r.result_format),
+            'generated-code-cm': ([cls.generated_code_cm], lambda r: r.generated_code_cm),
+            'status': ([cls.status], lambda r: r.status.string_name),
+            'failure-info': ([cls.failure_description], lambda r: r.failure_description),
+            'app-version': ([cls.app_version], lambda r: r.app_version),
+            'code-gen-image': ([cls.code_gen_image], lambda r: r.code_gen_image),
+            'dispatch-order': ([cls.dispatch_order], lambda r: r.dispatch_order),
+            'files': ([cls.files], lambda r: r.files),
+            'files-completed': ([cls.files_completed], lambda r: r.files_completed),
+            'files-failed': ([cls.files_failed], lambda r: r.files_failed),
+            'files-remaining': ([cls.files, cls.files_completed, cls.files_failed],
+                                files_remaining),
+            'submit-time': ([cls.submit_time],
+                            lambda r: str(r.submit_time.strftime(iso_fmt))),
+            'finish-time': ([cls.finish_time], finish_time)
         }
-        if self.finish_time is not None:
-            result_obj['finish-time'] = str(self.finish_time.strftime(iso_fmt))
-        return result_obj
+
+    def to_json(self):
+        return {name: to_json(self) for name, (_, to_json) in self.json_fields().items()}
+
+    @classmethod
+    def json_page(cls, criteria: list, fields: List[str], after: int,
+                  limit: Optional[int]) -> Iterator[tuple[int, dict]]:
+        """
+        Keyset paginated JSON representations of the requests matching the
+        criteria, in id order. Only the columns behind the requested fields are
+        fetched and no ORM objects are constructed.
+        :param criteria: SQL expressions the requests must match
+        :param fields: Names of the JSON fields to return, see json_fields
+        :param after: Only return requests with an id greater than this one
+        :param limit: Maximum number of requests to return, or None for all of them
+        :return: Iterator of the id and JSON dictionary of each request
+        """
+        json_fields = cls.json_fields()
+        columns = {cls.id.key: cls.id}
+        for name in fields:
+            columns.update({c.key: c for c in json_fields[name][0]})
+
+        stmt = select(*[c.label(key) for key, c in columns.items()]) \
+            .where(cls.id > after, *criteria) \
+            .order_by(cls.id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        for row in db.session.execute(stmt.execution_options(yield_per=500)):
+            yield row.id, {name: json_fields[name][1](row) for name in fields}
 
     @classmethod
     def return_json(cls, requests: Iterable['TransformRequest']):
@@ -262,6 +363,47 @@ class TransformRequest(db.Model):
         except NoResultFound:
             return []
 
+    @classmethod
+    def count_active_using_configmap(cls, configmap_name: str, excluding: str) -> int:
+        """
+        Count the requests that haven't finished yet and mount the given
+        generated code ConfigMap, other than the excluded one
+        """
+        active = [status for status in TransformStatus if not status.is_complete]
+        return db.session.scalar(
+            select(func.count()).select_from(cls).where(
+                cls.generated_code_cm == configmap_name,
+                cls.status.in_(active),
+                cls.request_id != excluding))
+
+    @classmethod
+    def stalled_dispatches(cls, before: datetime) -> list[TransformRequest]:
+        """
+        Running requests whose files the file dispatcher started publishing but
+        hasn't finished, and made no progress on since the given time
+        """
+        return cls.query.filter(cls.status == TransformStatus.running,
+                                cls.dispatch_heartbeat < before,
+                                cls.files_dispatched < cls.files).all()
+
+    @classmethod
+    def claim_dispatch(cls, key: str, heartbeat: datetime) -> bool:
+        """
+        Take over publishing the files of a stalled request by moving its
+        heartbeat on from the one that was seen. Only one of several concurrent
+        callers that saw the same heartbeat succeeds. Commits the claim.
+        :param key: request_id (UUID) of the request
+        :param heartbeat: The dispatch_heartbeat the request was found stalled with
+        :return: True if the caller now owns publishing the request's files
+        """
+        result = db.session.execute(
+            update(cls)
+            .where(cls.request_id == key, cls.dispatch_heartbeat == heartbeat)
+            .values(dispatch_heartbeat=datetime.now(tz=timezone.utc))
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        return result.rowcount == 1
+
     @classmethod
     def lookup_pending_on_dataset(cls, dataset_id: int) -> list[TransformRequest]:
         """
@@ -277,16 +419,82 @@ class TransformRequest(db.Model):
             return []
 
     @classmethod
-    def file_transformed_successfully(cls, key: Union[str, int]) -> None:
-        req = cls.query.filter_by(request_id=key).one()
-        req.files_completed = cls.files_completed + 1
+    def file_transformed_successfully(cls, key: str) -> Optional[RequestCounts]:
+        counts = cls.files_transformed(key, succeeded=1, failed=0)
         db.session.commit()
+        return counts
 
     @classmethod
-    def file_transformed_unsuccessfully(cls, key: Union[str, int]) -> None:
-        req = cls.query.filter_by(request_id=key).one()
-        req.files_failed = cls.files_failed + 1
+    def file_transformed_unsuccessfully(cls, key: str) -> Optional[RequestCounts]:
+        counts = cls.files_transformed(key, succeeded=0, failed=1)
         db.session.commit()
+        return counts
+
+    @classmethod
+    def files_transformed(cls, key: str, succeeded: int, failed: int) -> Optional[RequestCounts]:
+        """
+        Apply file completions to the request counters with a single
+        UPDATE ... RETURNING statement. The increment happens in the database, so
+        the returned counts are exactly the ones produced by this update, even with
+        concurrent completions. Exactly one caller will see files_remaining reach
+        zero. The caller owns the transaction and is responsible for the commit.
+        :param key: request_id (UUID) of the request
+        :param succeeded: Number of files that were transformed successfully
+        :param failed: Number of files that failed to transform
+        :return: The updated counters, or None if the request doesn't exist
+        """
+        row = db.session.execute(
+            update(cls)
+            .where(cls.request_id == key)
+            .values(files_completed=cls.files_completed + succeeded,
+                    files_failed=cls.files_failed + failed)
+            .returning(cls.files, cls.files_completed, cls.files_failed)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+        return RequestCounts(*row) if row else None
+
+    @classmethod
+    def add_result_statistics(cls, key: str, results: List[dict]) -> None:
+        """
+        Fold a set of transformation results into the running statistics of the
+        request with a single UPDATE statement. Should be called in the same
+        transaction that inserts the results. The caller is responsible for the commit.
+        :param key: request_id (UUID) of the request
+        :param results: List of dictionaries keyed by TransformationResult column name
+        """
+        if not results:
+            return
+
+        times = [r['transform_time'] for r in results if r.get('transform_time') is not None]
+        rates = [r['avg_rate'] for r in results if r.get('avg_rate') is not None]
+        batch_min = min(times) if times else None
+        batch_max = max(times) if times else None
+
+        values = {
+            'results_recorded': cls.results_recorded + len(results),
+            'timed_results': cls.timed_results + len(times),
+            'rated_results': cls.rated_results + len(rates),
+            'total_time': cls.total_time + sum(times),
+            'total_rate': cls.total_rate + sum(rates),
+            'total_bytes': func.coalesce(cls.total_bytes, 0) +
+            sum(r.get('total_bytes') or 0 for r in results),
+            'total_events': func.coalesce(cls.total_events, 0) +
+            sum(r.get('total_events') or 0 for r in results)
+        }
+        if times:
+            values['min_time'] = case(
+                ((cls.min_time.is_(None)) | (cls.min_time > batch_min), batch_min),
+                else_=cls.min_time)
+            values['max_time'] = case(
+                ((cls.max_time.is_(None)) | (cls.max_time < batch_max), batch_max),
+                else_=cls.max_time)
+
+        db.session.execute(
+            update(cls)
+            .where(cls.request_id == key)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
 
     @classmethod
     def add_a_file(cls, key) -> None:
@@ -327,47 +535,42 @@ class TransformRequest(db.Model):
 
     @property
     def statistics(self) -> Optional[dict]:
-        rslt_list = db.session.query(
-            TransformationResult.request_id,
-            func.min(TransformationResult.transform_time).label('min_time'),
-            func.max(TransformationResult.transform_time).label('max_time'),
-            func.avg(TransformationResult.transform_time).label('avg_time'),
-            func.sum(TransformationResult.transform_time).label('total_time'),
-            func.avg(TransformationResult.avg_rate).label('avg_rate'),
-            func.sum(TransformationResult.total_bytes).label('total_bytes'),
-            func.sum(TransformationResult.total_events).label('total_events')
-        ).group_by(TransformationResult.request_id).filter_by(
-            request_id=self.request_id).all()
-
-        if len(rslt_list) == 0:
+        if not self.results_recorded:
             return None
 
-        rslt = rslt_list[0]
-
         return {
-            "min-time": int(rslt.min_time),
-            "max-time": int(rslt.max_time),
-            "avg-time": float(rslt.avg_time),
-            "total-time": int(rslt.total_time),
-            "avg-rate": float(rslt.avg_rate),
-            "total-bytes": int(rslt.total_bytes),
-            "total-events": int(rslt.total_events)
+            "min-time": int(self.min_time or 0),
+            "max-time": int(self.max_time or 0),
+            "avg-time": float(self.total_time) / self.timed_results
+            if self.timed_results else 0.0,
+            "total-time": int(self.total_time),
+            "avg-rate": float(self.total_rate) / self.rated_results
+            if self.rated_results else 0.0,
+            "total-bytes": int(self.total_bytes or 0),
+            "total-events": int(self.total_events or 0)
         }
 
 
 class TransformationResult(db.Model):
     __tablename__ = 'transform_result'
+    __table_args__ = (
+        # Results of a request, in file order for the results page
+        db.Index('ix_transform_result_request_id_file_id', 'request_id', 'file_id'),
+        # Keyset pagination of the results of a request
+        db.Index('ix_transform_result_request_id_id', 'request_id', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     did = db.Column(db.String(512), unique=False, nullable=False)
     file_id = db.Column(db.Integer, ForeignKey('files.id'))
     file_path = db.Column(db.String(512), unique=False, nullable=False)
     request_id = db.Column(db.String(48), unique=False, nullable=False)
-    transform_status = db.Column(db.String(120), nullable=False)
+    transform_status = db.Column(db.String(120), nullable=False, index=True)
     transform_time = db.Column(db.Integer, nullable=True)
     total_events = db.Column(db.BigInteger, nullable=True)
     total_bytes = db.Column(db.BigInteger, nullable=True)
     avg_rate = db.Column(db.Float, nullable=True)
+    output_object = db.Column(db.String(512), nullable=True)
 
     @classmethod
     def to_json_list(cls, a_list):
@@ -388,10 +591,94 @@ class TransformationResult(db.Model):
             'avg-rate': x.avg_rate
         }
 
+    @classmethod
+    def json_columns(cls) -> dict:
+        """
+        Columns that can be selected by their JSON field name
+        """
+        return {
+            'id': cls.id,
+            'request-id': cls.request_id,
+            'did': cls.did,
+            'file-id': cls.file_id,
+            'file-path': cls.file_path,
+            'transform_status': cls.transform_status,
+            'transform_time': cls.transform_time,
+            'total-events': cls.total_events,
+            'total-bytes': cls.total_bytes,
+            'avg-rate': cls.avg_rate,
+            'output-object': cls.output_object
+        }
+
+    @classmethod
+    def page(cls, request_id: str, after: int, limit: int, fields: List[str],
+             status: Optional[str] = None) -> Iterator[dict]:
+        """
+        Keyset paginated results of a request, ordered by id. Only the selected
+        columns are fetched and rows are returned as plain dictionaries without
+        constructing ORM objects.
+        :param request_id: request_id (UUID) of the request
+        :param after: Only return results with an id greater than this one
+        :param limit: Maximum number of results to return
+        :param fields: JSON names of the fields to return, see json_columns
+        :param status: Optionally restrict to results with this transform status
+        """
+        columns = cls.json_columns()
+        stmt = select(*[columns[f].label(f) for f in fields]) \
+            .where(cls.request_id == request_id, cls.id > after)
+        if status:
+            stmt = stmt.where(cls.transform_status == status)
+        stmt = stmt.order_by(cls.id).limit(limit).execution_options(yield_per=1000)
+        for row in db.session.execute(stmt):
+            yield row._asdict()
+
     def save_to_db(self):
         db.session.add(self)
         db.session.flush()
 
+    @classmethod
+    def unrecorded(cls, request_id: str, records: List[dict]) -> List[dict]:
+        """
+        Drop the records of files that already have a result for the request, or
+        that appear earlier in the list. Transformers report files at least once,
+        so the same file can be reported again after a retry or a restart.
+        The request row is locked first so concurrent reports of the same file
+        can't both get through. The caller owns the transaction and must record
+        the returned results in it.
+        :param request_id: request_id (UUID) of the request
+        :param records: List of dictionaries keyed by column name
+        :return: The records of the files reported for the first time
+        """
+        if not records:
+            return []
+
+        db.session.execute(
+            select(TransformRequest.id)
+            .where(TransformRequest.request_id == request_id)
+            .with_for_update())
+
+        seen = set(db.session.scalars(
+            select(cls.file_id).where(
+                cls.request_id == request_id,
+                cls.file_id.in_({r['file_id'] for r in records}))))
+
+        new_records = []
+        for record in records:
+            if record['file_id'] not in seen:
+                seen.add(record['file_id'])
+                new_records.append(record)
+        return new_records
+
+    @classmethod
+    def bulk_insert(cls, records: List[dict]) -> None:
+        """
+        Insert many results with a single multi-row INSERT without constructing
+        ORM objects. The caller owns the transaction and is responsible for the commit.
+        :param records: List of dictionaries keyed by column name
+        """
+        if records:
+            db.session.execute(insert(cls), records)
+
 
 class DatasetStatus(Enum):
     created = "created"
@@ -443,6 +730,13 @@ class Dataset(db.Model):
 
 class DatasetFile(db.Model):
     __tablename__ = 'files'
+    __table_args__ = (
+        # Files of a dataset, read in id order a chunk at a time
+        db.Index('ix_files_dataset_id_id', 'dataset_id', 'id'),
+        # The same, largest files first, matching chunks_for_dataset(largest_first=True)
+        db.Index('ix_files_dataset_id_size_id', 'dataset_id',
+                 db.text('coalesce(file_size, 0) DESC'), 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     dataset_id = db.Column(db.Integer,
@@ -459,6 +753,157 @@ class DatasetFile(db.Model):
         db.session.add(self)
         db.session.flush()
 
+    @classmethod
+    def bulk_insert(cls, dataset_id: int, files: List[dict]) -> list:
+        """
+        Insert many files of a dataset with a single multi-row INSERT without
+        constructing ORM objects or loading the dataset's files. The caller is
+        responsible for the commit.
+        :param dataset_id: Dataset the files belong to
+        :param files: List of dictionaries keyed by column name
+        :return: Rows with the id, paths, size and events of the new files, in the
+            order of files
+        """
+        if not files:
+            return []
+        return db.session.execute(
+            insert(cls).returning(cls.id, cls.paths, cls.file_size, cls.file_events,
+                                  sort_by_parameter_order=True),
+            [dict(file, dataset_id=dataset_id) for file in files]
+        ).all()
+
+    @classmethod
+    def count_for_dataset(cls, dataset_id: int) -> int:
+        return db.session.scalar(
+            select(func.count()).select_from(cls).where(cls.dataset_id == dataset_id))
+
+    @classmethod
+    def chunks_for_dataset(cls, dataset_id: int, chunk_size: int,
+                           largest_first: bool = False) -> Iterator[list]:
+        """
+        Read the id, paths, size and events of the files of a dataset in chunks,
+        in id order. Each chunk is a separate keyset query, so only one chunk is
+        held in memory at a time and the caller may commit between chunks.
+        :param dataset_id: Dataset to read the files of
+        :param chunk_size: Number of files per chunk
+        :param largest_first: Read the files in descending size order instead,
+            with files of unknown size last
+        :return: Iterator over lists of rows with id, paths, file_size and file_events
+        """
+        size = func.coalesce(cls.file_size, 0)
+        query = select(cls.id, cls.paths, cls.file_size, cls.file_events) \
+            .where(cls.dataset_id == dataset_id)
+        if largest_first:
+            query = query.order_by(size.desc(), cls.id)
+        else:
+            query = query.order_by(cls.id)
+
+        last = None
+        while True:
+            page = query
+            if last is not None and largest_first:
+                # The first condition bounds the scan of the size index, the
+                # second skips the rows of the previous chunk that share its size
+                last_size = last.file_size or 0
+                page = page.where(size <= last_size,
+                                  (size < last_size) | (cls.id > last.id))
+            elif last is not None:
+                page = page.where(cls.id > last.id)
+
+            chunk = db.session.execute(page.limit(chunk_size)).all()
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1]
+
     @classmethod
     def get_by_id(cls, dataset_file_id):
         return cls.query.filter_by(id=dataset_file_id).one()
+
+
+class GeneratedCode(db.Model):
+    """
+    Code generated for a selection, kept so that identical selections don't
+    have to be sent to the code generator again. The generated source lives in
+    the shared ConfigMap, and a copy of the archive is kept here so that the
+    ConfigMap can be recreated if the last request using it deleted it.
+    """
+    __tablename__ = 'generated_code'
+    __table_args__ = (
+        db.UniqueConstraint('codegen', 'code_gen_image', 'selection_hash',
+                            name='uq_generated_code_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    codegen = db.Column(db.String(128), nullable=False)
+    code_gen_image = db.Column(db.String(256), nullable=False)
+    selection_hash = db.Column(db.String(64), nullable=False)
+    configmap = db.Column(db.String(128), nullable=False)
+    source_hash = db.Column(db.String(64), nullable=False)
+    transformer_image = db.Column(db.String(256), nullable=False)
+    transformer_language = db.Column(db.String(256), nullable=False)
+    transformer_command = db.Column(db.String(256), nullable=False)
+    created = db.Column(db.DateTime, nullable=False)
+    source_zip = db.Column(db.LargeBinary, nullable=True)
+
+    @classmethod
+    def lookup(cls, codegen: str, code_gen_image: str,
+               selection_hash: str) -> Optional['GeneratedCode']:
+        return cls.query.filter_by(codegen=codegen, code_gen_image=code_gen_image,
+                                   selection_hash=selection_hash).one_or_none()
+
+    @classmethod
+    def source_zip_for(cls, configmap: str) -> Optional[bytes]:
+        """
+        The generated code archive behind a shared ConfigMap, if one was kept
+        """
+        return db.session.scalar(
+            select(cls.source_zip)
+            .where(cls.configmap == configmap, cls.source_zip.is_not(None))
+            .limit(1))
+
+
+class Lease(db.Model):
+    """
+    A named lease held by one App process at a time, for background work such
+    as scaling transformers that must not be repeated by every worker
+    """
+    __tablename__ = 'leases'
+
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(256), nullable=False)
+    expires = db.Column(db.DateTime, nullable=False)
+
+    @classmethod
+    def acquire(cls, name: str, holder: str, duration: timedelta) -> bool:
+        """
+        Take the lease if it is free or has expired, or renew it if the caller
+        already holds it. Commits the claim.
+        :param name: Name of the lease
+        :param holder: Identifies the process asking for the lease
+        :param duration: How long the lease is held for unless renewed
+        :return: True if the caller holds the lease
+        """
+        now = datetime.now(tz=timezone.utc)
+        result = db.session.execute(
+            update(cls)
+            .where(cls.name == name, or_(cls.holder == holder, cls.expires < now))
+            .values(holder=holder, expires=now + duration)
+            .execution_options(synchronize_session=False))
+        if result.rowcount == 1:
+            db.session.commit()
+            return True
+
+        if db.session.get(cls, name) is not None:
+            db.session.commit()
+            return False
+
+        # Nobody has held the lease yet. Only one of the processes racing to
+        # create it gets to insert the row.
+        db.session.add(cls(name=name, holder=holder, expires=now + duration))
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
@@ -37,5 +37,13 @@ class ObjectStoreManager:
     def create_bucket(self, bucket_name):
         self.minio_client.make_bucket(bucket_name)
 
+    def bucket_exists(self, bucket_name):
+        return self.minio_client.bucket_exists(bucket_name)
+
     def list_buckets(self):
         return self.minio_client.list_buckets()
+
+    def copy_object(self, bucket_name, object_name, source_bucket_name):
+        from minio.commonconfig import CopySource
+        self.minio_client.copy_object(bucket_name, object_name,
+                                      CopySource(source_bucket_name, object_name))
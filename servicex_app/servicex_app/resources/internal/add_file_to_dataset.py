@@ -27,7 +27,7 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 from flask import request, current_app
 
-from servicex_app.models import DatasetFile, TransformRequest, db
+from servicex_app.models import TransformRequest, db
 from servicex_app.resources.servicex_resource import ServiceXResource
 
 from servicex_app.dataset_manager import DatasetManager
@@ -58,11 +58,10 @@ class AddFileToDataset(ServiceXResource):
                 f"Adding {len(add_file_request)} files to dataset: {dataset_manager.name}",
                 extra={'dataset_id': dataset_id})
 
-            new_files = [DatasetFile(dataset_id=dataset_id,
-                                     paths=','.join(file['paths']),
-                                     adler32=file['adler32'],
-                                     file_events=file['file_events'],
-                                     file_size=file['file_size']) for file in add_file_request]
+            new_files = [{'paths': ','.join(file['paths']),
+                          'adler32': file['adler32'],
+                          'file_events': file['file_events'],
+                          'file_size': file['file_size']} for file in add_file_request]
             dataset_manager.add_files(new_files, running_requests, self.lookup_result_processor)
             db.session.commit()
 
@@ -34,9 +34,10 @@ from servicex_app.resources.servicex_resource import ServiceXResource
 
 class FilesetComplete(ServiceXResource):
     @classmethod
-    def make_api(cls, lookup_result_processor, transformer_manager):
+    def make_api(cls, lookup_result_processor, transformer_manager, file_dispatcher):
         cls.lookup_result_processor = lookup_result_processor
         cls.transformer_manager = transformer_manager
+        cls.file_dispatcher = file_dispatcher
         return cls
 
     def put(self, dataset_id):
@@ -52,12 +53,14 @@ class FilesetComplete(ServiceXResource):
         dataset.lookup_status = DatasetStatus.complete
         db.session.commit()
 
+        pending_requests = []
         if summary['files'] > 0:
             # Now time to pick up any transform requests for this dataset that came in
             # while we were still looking up files and send the dataset to them
             dataset_manager = DatasetManager(dataset, current_app.logger, db)
-            for transform_request in TransformRequest.lookup_pending_on_dataset(int(dataset_id)):
-                dataset_manager.publish_files(transform_request, self.lookup_result_processor)
+            # The request is marked running first, since publishing may complete it
+            pending_requests = TransformRequest.lookup_pending_on_dataset(int(dataset_id))
+            for transform_request in pending_requests:
                 transform_request.status = TransformStatus.running
 
             # also resolve the status of whatever transform prompted this lookup
@@ -84,3 +87,8 @@ class FilesetComplete(ServiceXResource):
                 pending_transform.status = TransformStatus.complete
 
         db.session.commit()
+
+        # Published by the file dispatcher like any other request, so publishing
+        # resumes from the last committed chunk if this app worker goes away
+        for transform_request in pending_requests:
+            self.file_dispatcher.publish_files(dataset_manager, transform_request)
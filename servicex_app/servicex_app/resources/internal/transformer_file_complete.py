@@ -34,15 +34,17 @@ from tenacity import retry, stop_after_attempt, wait_exponential_jitter, \
     before_sleep_log, after_log
 
 from servicex_app import TransformerManager
-from servicex_app.models import TransformRequest, TransformationResult, db, TransformStatus
+from servicex_app.models import TransformRequest, TransformationResult, db, TransformStatus, \
+    RequestCounts
 from servicex_app.resources.servicex_resource import ServiceXResource
 import time
 
 
 class TransformerFileComplete(ServiceXResource):
     @classmethod
-    def make_api(cls, transformer_manager):
+    def make_api(cls, transformer_manager, status_notifier=None):
         cls.transformer_manager = transformer_manager
+        cls.status_notifier = status_notifier
         return cls
 
     def put(self, request_id):
@@ -50,66 +52,95 @@ class TransformerFileComplete(ServiceXResource):
         info = request.get_json()
         logger = current_app.logger
         logger.info("FileComplete", extra={'requestId': request_id, 'metric': info})
-        transform_req = self.record_file_complete(current_app.logger, request_id, info)
+        transform_req, counts, complete = self.record_file_complete(logger, request_id, info)
 
         if transform_req is None:
             return "Request not found", 404
 
-        self.save_transform_result(transform_req, info)
-
-        files_remaining = transform_req.files_remaining
-        if files_remaining is not None and files_remaining == 0:
+        if complete:
             self.transform_complete(current_app.logger, transform_req, self.transformer_manager)
+        self.publish_status_change(request_id, complete)
 
         current_app.logger.info("FileComplete. Request state.", extra={
             'requestId': request_id,
-            'files_remaining': transform_req.files_remaining,
-            'files_completed': transform_req.files_completed,
-            'files_failed': transform_req.files_failed,
+            'files_remaining': counts.files_remaining,
+            'files_completed': counts.files_completed,
+            'files_failed': counts.files_failed,
             'report_processed_time': (time.time() - start_time)
         })
         return "Ok"
 
+    def publish_status_change(self, request_id: str, complete: bool):
+        """
+        Wake up the clients waiting on the status stream of this request
+        """
+        if self.status_notifier is None:
+            return
+        self.status_notifier.notify(request_id)
+        if complete:
+            self.status_notifier.forget(request_id)
+
+    @staticmethod
+    def result_record(transform_req: TransformRequest, info: dict[str, str]) -> dict:
+        """
+        The TransformationResult columns of a file complete report
+        """
+        return {
+            'did': transform_req.did,
+            'file_id': info['file-id'],
+            'request_id': transform_req.request_id,
+            'file_path': info['file-path'],
+            'transform_status': info['status'],
+            'transform_time': info['total-time'],
+            'total_bytes': info['total-bytes'],
+            'total_events': info['total-events'],
+            'avg_rate': info['avg-rate'],
+            'output_object': info.get('output-object')
+        }
+
+    @staticmethod
+    def record_results(request_id: str, results: list[dict]) -> tuple[RequestCounts, bool]:
+        """
+        Update the request counters, insert the transformation results and fold
+        them into the request statistics in one transaction. Files that already
+        have a result are skipped, so a report delivered more than once is only
+        counted once.
+        :return: The updated counters and whether these results completed the request
+        """
+        try:
+            new_results = TransformationResult.unrecorded(request_id, results)
+            succeeded = sum(1 for r in new_results if r['transform_status'] == 'success')
+            counts = TransformRequest.files_transformed(request_id, succeeded,
+                                                        len(new_results) - succeeded)
+            TransformationResult.bulk_insert(new_results)
+            TransformRequest.add_result_statistics(request_id, new_results)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Decide on completion from the counters returned by our own update rather
+        # than re-reading the request, so only one report can complete the transform
+        return counts, counts.completed_by(len(new_results))
+
     @staticmethod
     @retry(stop=stop_after_attempt(3),
            wait=wait_exponential_jitter(initial=0.1, max=30),
            before_sleep=before_sleep_log(current_app.logger, logging.INFO),
            after=after_log(current_app.logger, logging.INFO),
            )
-    def record_file_complete(logger: Logger, request_id: str, info: dict[str, str]) -> TransformRequest | None:
+    def record_file_complete(logger: Logger, request_id: str, info: dict[str, str]) \
+            -> tuple[TransformRequest | None, RequestCounts | None, bool]:
         transform_req = TransformRequest.lookup(request_id)
         if transform_req is None:
             msg = f"Request not found with id: '{request_id}'"
             logger.error(msg, extra={'requestId': request_id})
-            return None
-
-        if info['status'] == 'success':
-            TransformRequest.file_transformed_successfully(request_id)
-        else:
-            TransformRequest.file_transformed_unsuccessfully(request_id)
+            return None, None, False
 
-        return transform_req
-
-    @staticmethod
-    @retry(stop=stop_after_attempt(3),
-           wait=wait_exponential_jitter(initial=0.1, max=30),
-           before_sleep=before_sleep_log(current_app.logger, logging.INFO),
-           after=after_log(current_app.logger, logging.INFO),
-           )
-    def save_transform_result(transform_req: TransformRequest, info: dict[str, str]):
-        rec = TransformationResult(
-            did=transform_req.did,
-            file_id=info['file-id'],
-            request_id=transform_req.request_id,
-            file_path=info['file-path'],
-            transform_status=info['status'],
-            transform_time=info['total-time'],
-            total_bytes=info['total-bytes'],
-            total_events=info['total-events'],
-            avg_rate=info['avg-rate']
-        )
-        rec.save_to_db()
-        db.session.commit()
+        result = TransformerFileComplete.result_record(transform_req, info)
+        counts, complete = TransformerFileComplete.record_results(transform_req.request_id,
+                                                                  [result])
+        return transform_req, counts, complete
 
     @staticmethod
     @retry(stop=stop_after_attempt(3),
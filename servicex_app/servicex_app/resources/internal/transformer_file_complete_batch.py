@@ -0,0 +1,95 @@
+# Copyright (c) 2019, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+import logging
+import time
+from logging import Logger
+
+from flask import request, current_app
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter, \
+    before_sleep_log, after_log
+
+from servicex_app.models import TransformRequest, RequestCounts
+from servicex_app.resources.internal.transformer_file_complete import TransformerFileComplete
+
+
+class TransformerFileCompleteBatch(TransformerFileComplete):
+    """
+    Accept a list of file complete reports for a single request and apply them
+    in one transaction: one counter update and one multi-row insert of the
+    transformation results, regardless of the number of files in the batch.
+    """
+    def put(self, request_id):
+        start_time = time.time()
+        records = request.get_json()
+        if isinstance(records, dict):
+            records = [records]
+
+        logger = current_app.logger
+        logger.info("FileCompleteBatch", extra={'requestId': request_id,
+                                                'num_files': len(records)})
+
+        transform_req, counts, complete = self.record_file_complete_batch(logger, request_id,
+                                                                          records)
+        if transform_req is None:
+            return "Request not found", 404
+
+        if complete:
+            self.transform_complete(logger, transform_req, self.transformer_manager)
+        self.publish_status_change(request_id, complete)
+
+        logger.info("FileCompleteBatch. Request state.", extra={
+            'requestId': request_id,
+            'files_remaining': counts.files_remaining,
+            'files_completed': counts.files_completed,
+            'files_failed': counts.files_failed,
+            'report_processed_time': (time.time() - start_time)
+        })
+        return "Ok"
+
+    @staticmethod
+    @retry(stop=stop_after_attempt(3),
+           wait=wait_exponential_jitter(initial=0.1, max=30),
+           before_sleep=before_sleep_log(current_app.logger, logging.INFO),
+           after=after_log(current_app.logger, logging.INFO),
+           )
+    def record_file_complete_batch(logger: Logger, request_id: str,
+                                   records: list[dict[str, str]]) \
+            -> tuple[TransformRequest | None, RequestCounts | None, bool]:
+        transform_req = TransformRequest.lookup(request_id)
+        if transform_req is None:
+            msg = f"Request not found with id: '{request_id}'"
+            logger.error(msg, extra={'requestId': request_id})
+            return None, None, False
+
+        # Since everything happens in one transaction a retry after a database
+        # error can't double count any of the files in the batch, and files
+        # reported by an earlier delivery of the batch are skipped
+        results = [TransformerFileComplete.result_record(transform_req, info)
+                   for info in records]
+        counts, complete = TransformerFileComplete.record_results(transform_req.request_id,
+                                                                  results)
+        return transform_req, counts, complete
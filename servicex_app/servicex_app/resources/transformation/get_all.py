@@ -25,30 +25,104 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
-from typing import List
+import json
+from datetime import datetime, timezone
+from typing import Optional
 
-from flask import current_app
+from flask import Response, current_app, stream_with_context
 from flask_restful import reqparse
 
 from servicex_app.decorators import auth_required
-from servicex_app.models import TransformRequest
+from servicex_app.models import TransformRequest, TransformStatus
 from servicex_app.resources.servicex_resource import ServiceXResource
 
+
+def _iso_datetime(value: str) -> datetime:
+    """
+    Parse an ISO-8601 timestamp into the naive UTC datetimes stored in the database
+    """
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
 parser = reqparse.RequestParser()
 parser.add_argument('submitted_by', type=int, location='args')
+parser.add_argument('status', type=str, location='args')
+parser.add_argument('submitted_after', type=_iso_datetime, location='args')
+parser.add_argument('submitted_before', type=_iso_datetime, location='args')
+parser.add_argument('did', type=str, location='args')
+parser.add_argument('title', type=str, location='args')
+parser.add_argument('fields', type=str, location='args')
+parser.add_argument('after', type=int, default=0, location='args')
+parser.add_argument('limit', type=int, location='args')
+
+
+def _parse_status(value: str) -> Optional[TransformStatus]:
+    for status in TransformStatus:
+        if value.lower() in (status.name, status.string_name.lower()):
+            return status
+    return None
 
 
 class AllTransformationRequests(ServiceXResource):
+    """
+    List transformation requests, optionally filtered, as a streamed JSON
+    document. Pages are requested with `limit`; when there are more requests
+    the response carries the `next-after` value to pass as `after` to get the
+    next page.
+    """
 
     @auth_required
     def get(self):
         args = parser.parse_args()
-        query_id = args.get('submitted_by')
-        transforms: List[TransformRequest]
-        if query_id:
-            current_app.logger.debug(f"Querying transform request by id: {query_id}")
-            transforms = TransformRequest.query.filter_by(submitted_by=query_id)
+        criteria = []
+        if args.submitted_by:
+            current_app.logger.debug(f"Querying transform request by id: {args.submitted_by}")
+            criteria.append(TransformRequest.submitted_by == args.submitted_by)
+        if args.status:
+            statuses = [_parse_status(s.strip()) for s in args.status.split(',')]
+            if None in statuses:
+                return {'message': f'Unknown status in: {args.status}'}, 400
+            criteria.append(TransformRequest.status.in_(statuses))
+        if args.submitted_after:
+            criteria.append(TransformRequest.submit_time >= args.submitted_after)
+        if args.submitted_before:
+            criteria.append(TransformRequest.submit_time < args.submitted_before)
+        if args.did:
+            criteria.append(TransformRequest.did == args.did)
+        if args.title:
+            criteria.append(TransformRequest.title.icontains(args.title, autoescape=True))
+
+        json_fields = TransformRequest.json_fields()
+        if args.fields:
+            fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+            unknown = [f for f in fields if f not in json_fields]
+            if unknown:
+                return {'message': f'Unknown fields: {", ".join(unknown)}. '
+                                   f'Valid fields are: {", ".join(json_fields)}'}, 400
         else:
-            current_app.logger.debug("Querying for all  transform requests")
-            transforms = TransformRequest.query.all()
-        return TransformRequest.return_json(transforms)
+            fields = list(json_fields)
+
+        if args.limit is not None and args.limit < 1:
+            return {'message': 'limit must be positive'}, 400
+
+        # Fetch one extra row to find out if there is another page
+        rows = TransformRequest.json_page(
+            criteria, fields, args.after,
+            args.limit + 1 if args.limit is not None else None)
+
+        def generate():
+            yield '{"requests": ['
+            next_after = None
+            last_id = None
+            for count, (request_id, record) in enumerate(rows):
+                if count == args.limit:
+                    next_after = last_id
+                    break
+                yield (', ' if count else '') + json.dumps(record)
+                last_id = request_id
+            yield f'], "next-after": {json.dumps(next_after)}}}'
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
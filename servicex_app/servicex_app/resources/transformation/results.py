@@ -0,0 +1,85 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
+
+from flask import Response, current_app, stream_with_context
+from flask_restful import reqparse
+
+from servicex_app.decorators import auth_required
+from servicex_app.models import TransformationResult, TransformRequest
+from servicex_app.resources.servicex_resource import ServiceXResource
+
+results_parser = reqparse.RequestParser()
+results_parser.add_argument('after', type=int, default=0, required=False, location='args')
+results_parser.add_argument('limit', type=int, default=1000, required=False, location='args')
+results_parser.add_argument('fields', type=str, default=None, required=False, location='args')
+results_parser.add_argument('status', type=str, default=None, required=False, location='args')
+
+
+class TransformationResults(ServiceXResource):
+    """
+    Page through the transformation results of a request as newline delimited
+    JSON. Results are ordered by id; to get the next page pass the id of the
+    last record as `after`. A page shorter than `limit` is the last one.
+    """
+    MAX_LIMIT = 10000
+
+    @auth_required
+    def get(self, request_id):
+        transform = TransformRequest.lookup(request_id)
+        if not transform:
+            msg = f'Transformation request not found with id: {request_id}'
+            current_app.logger.error(msg, extra={'requestId': request_id})
+            return {'message': msg}, 404
+
+        args = results_parser.parse_args()
+        if args.limit < 1 or args.limit > self.MAX_LIMIT:
+            return {'message': f'limit must be between 1 and {self.MAX_LIMIT}'}, 400
+
+        columns = TransformationResult.json_columns()
+        if args.fields:
+            fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+            unknown = [f for f in fields if f not in columns]
+            if unknown:
+                return {'message': f'Unknown fields: {", ".join(unknown)}. '
+                                   f'Valid fields are: {", ".join(columns)}'}, 400
+
+            # The id is the pagination cursor, so always return it
+            if 'id' not in fields:
+                fields.insert(0, 'id')
+        else:
+            fields = list(columns)
+
+        rows = TransformationResult.page(transform.request_id, args.after, args.limit,
+                                         fields, args.status)
+
+        def generate():
+            for row in rows:
+                yield json.dumps(row) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -38,6 +38,27 @@ status_request_parser.add_argument('details', type=bool, default=False,
                                    required=False, location='args')
 
 
+def transformation_status_json(transform: TransformRequest, request_id: str) -> dict:
+    # Format timestamps with military timezone, given that they are in UTC.
+    # See https://stackoverflow.com/a/42777551/8534196
+    iso_fmt = '%Y-%m-%dT%H:%M:%S.%fZ'
+    result_dict = {
+        "status": transform.status.string_name,
+        "request-id": request_id,
+        "submit-time": transform.submit_time.strftime(iso_fmt),
+        "finish-time": transform.finish_time,
+        "files-completed": transform.files_completed,
+        "files-processed": transform.files_completed,  # obsolete
+        "files-failed": transform.files_failed,
+        "files-skipped": transform.files_failed,  # obsolete
+        "files-remaining": transform.files_remaining,
+        "stats": transform.statistics
+    }
+    if transform.finish_time is not None:
+        result_dict["finish-time"] = transform.finish_time.strftime(iso_fmt)
+    return result_dict
+
+
 class TransformationStatus(ServiceXResource):
     @auth_required
     def get(self, request_id):
@@ -49,24 +70,7 @@ class TransformationStatus(ServiceXResource):
 
         status_request = status_request_parser.parse_args()
 
-        # Format timestamps with military timezone, given that they are in UTC.
-        # See https://stackoverflow.com/a/42777551/8534196
-        iso_fmt = '%Y-%m-%dT%H:%M:%S.%fZ'
-        result_dict = {
-            "status": transform.status.string_name,
-            "request-id": request_id,
-            "submit-time": transform.submit_time.strftime(iso_fmt),
-            "finish-time": transform.finish_time,
-            "files-completed": transform.files_completed,
-            "files-processed": transform.files_completed,  # obsolete
-            "files-failed": transform.files_failed,
-            "files-skipped": transform.files_failed,  # obsolete
-            "files-remaining": transform.files_remaining,
-            "stats": transform.statistics
-        }
-        if transform.finish_time is not None:
-            result_dict["finish-time"] = transform.finish_time.strftime(iso_fmt)
-
+        result_dict = transformation_status_json(transform, request_id)
         if status_request.details:
             result_dict['details'] = TransformationResult.to_json_list(transform.results)
         current_app.logger.debug("Transformation status",
@@ -0,0 +1,107 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import time
+
+from flask import jsonify, current_app
+from flask_restful import reqparse
+
+from servicex_app.decorators import auth_required
+from servicex_app.models import TransformRequest, db
+from servicex_app.resources.servicex_resource import ServiceXResource
+from servicex_app.resources.transformation.status import transformation_status_json
+from servicex_app.status_notifier import StatusNotifier
+
+status_stream_parser = reqparse.RequestParser()
+status_stream_parser.add_argument('since', type=str, default=None,
+                                  required=False, location='args')
+status_stream_parser.add_argument('timeout', type=float, default=30.0,
+                                  required=False, location='args')
+
+
+class TransformationStatusStream(ServiceXResource):
+    """
+    Long-poll version of the status endpoint. The client passes back the cursor
+    from the previous response as `since` and the call is held until the
+    status moves past that cursor or the timeout expires. File complete reports
+    handled by this process wake the waiters right away; changes recorded by
+    other processes are picked up by re-reading the request row every poll
+    interval.
+
+    Each waiter holds a thread of the worker, so only STATUS_STREAM_MAX_WAITERS
+    calls per worker wait at a time. Beyond that the status is returned right
+    away with a Retry-After header. It defaults to 0, since waiting only makes
+    sense once the workers run more than one thread.
+    """
+    @classmethod
+    def make_api(cls, status_notifier: StatusNotifier):
+        cls.status_notifier = status_notifier
+        return cls
+
+    @staticmethod
+    def cursor(transform: TransformRequest) -> str:
+        return f"{transform.status.name}:{transform.files}:" \
+               f"{transform.files_completed}:{transform.files_failed}"
+
+    @auth_required
+    def get(self, request_id):
+        transform = TransformRequest.lookup(request_id)
+        if not transform:
+            msg = f'Transformation request not found with id: {request_id}'
+            current_app.logger.error(msg, extra={'requestId': request_id})
+            return {'message': msg}, 404
+
+        args = status_stream_parser.parse_args()
+        max_wait = current_app.config.get('STATUS_STREAM_MAX_WAIT', 60)
+        poll_interval = current_app.config.get('STATUS_STREAM_POLL_INTERVAL', 2)
+        deadline = time.monotonic() + max(0.0, min(args.timeout, max_wait))
+
+        version = self.status_notifier.version(transform.request_id)
+        cursor = self.cursor(transform)
+        busy = False
+        if cursor == args.since and not transform.status.is_complete:
+            max_waiters = current_app.config.get('STATUS_STREAM_MAX_WAITERS', 0)
+            with self.status_notifier.waiter(max_waiters) as admitted:
+                busy = not admitted
+                while admitted and cursor == args.since and not transform.status.is_complete:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    # Don't hold a transaction open while waiting. The rollback expires
+                    # the request, so computing the cursor again re-reads the row
+                    db.session.rollback()
+                    version = self.status_notifier.wait(transform.request_id, version,
+                                                        min(remaining, poll_interval))
+                    cursor = self.cursor(transform)
+
+        result_dict = transformation_status_json(transform, request_id)
+        result_dict['cursor'] = cursor
+        response = jsonify(result_dict)
+        if busy:
+            response.headers['Retry-After'] = str(int(poll_interval))
+        return response
@@ -34,6 +34,7 @@ from flask_restful import reqparse
 from servicex_app.dataset_manager import DatasetManager
 from servicex_app.decorators import auth_required
 from servicex_app.did_parser import DIDParser
+from servicex_app.lookup_result_processor import DISPATCH_ORDERS
 from servicex_app.models import TransformRequest, db, TransformStatus
 from servicex_app.resources.servicex_resource import ServiceXResource
 from werkzeug.exceptions import BadRequest
@@ -43,7 +44,7 @@ class SubmitTransformationRequest(ServiceXResource):
     @classmethod
     def make_api(cls, rabbitmq_adaptor, object_store,
                  code_gen_service, lookup_result_processor, docker_repo_adapter,
-                 transformer_manager, celery_app):
+                 transformer_manager, celery_app, file_dispatcher=None, result_cache=None):
         cls.rabbitmq_adaptor = rabbitmq_adaptor
         cls.object_store = object_store
         cls.code_gen_service = code_gen_service
@@ -54,6 +55,8 @@ class SubmitTransformationRequest(ServiceXResource):
         if cls.transformer_manager is not None:
             cls.transformer_manager.make_api(celery_app)
         cls.celery_app = celery_app
+        cls.file_dispatcher = file_dispatcher
+        cls.result_cache = result_cache
 
         cls.parser = reqparse.RequestParser()
         cls.parser.add_argument('title',
@@ -79,6 +82,8 @@ class SubmitTransformationRequest(ServiceXResource):
         cls.parser.add_argument(
             'result-format', choices=['arrow', 'parquet', 'root-file'], default='arrow'
         )
+        cls.parser.add_argument('dispatch-order', choices=DISPATCH_ORDERS,
+                                help='Order in which files are sent to the transformers')
         return cls
 
     def _initialize_dataset_manager(self, did: Optional[str],
@@ -189,6 +194,7 @@ class SubmitTransformationRequest(ServiceXResource):
                 status=TransformStatus.submitted,
                 app_version=self._get_app_version(),
                 code_gen_image=code_gen_image_name,
+                dispatch_order=args.get('dispatch-order'),
                 files=0
             )
 
@@ -224,7 +230,8 @@ class SubmitTransformationRequest(ServiceXResource):
             elif dataset_manager.is_complete:
                 current_app.logger.info("dataset already complete", extra={
                                         'requestId': str(request_id)})
-                dataset_manager.publish_files(request_rec, self.lookup_result_processor)
+                # The files are published after the commit by the file dispatcher
+                request_rec.files = dataset_manager.file_count
                 request_rec.status = TransformStatus.running
             else:
                 current_app.logger.info("another request received for dataset that is still being looked up ",
@@ -233,14 +240,33 @@ class SubmitTransformationRequest(ServiceXResource):
 
             db.session.commit()
 
+            # If an identical earlier request already produced every file, the file
+            # dispatcher copies its outputs. The request completes without starting any
+            # transformers unless some of the outputs turn out to be missing.
+            reused_request = None
+            if request_rec.status == TransformStatus.running and self.result_cache:
+                reused_request = self.result_cache.find_reusable_request(request_rec)
+            if reused_request is not None:
+                current_app.logger.info("Reusing the results of an identical request",
+                                        extra={'requestId': request_id,
+                                               'reusedRequestId': reused_request.request_id})
+                self.file_dispatcher.publish_files(dataset_manager, request_rec,
+                                                   start_transformers=True)
+
             # start transformers independently of the state of dataset.
-            if current_app.config['TRANSFORMER_MANAGER_ENABLED']:
+            if current_app.config['TRANSFORMER_MANAGER_ENABLED'] and \
+                    request_rec.status != TransformStatus.complete and reused_request is None:
                 print(f"-----------> files: {request_rec.files}")
                 self.transformer_manager.start_transformers(
                     current_app.config,
                     request_rec
                 )
 
+            # Publish after starting the transformers, so that a request served
+            # entirely from the result cache shuts down transformers that exist
+            if request_rec.status == TransformStatus.running and reused_request is None:
+                self.file_dispatcher.publish_files(dataset_manager, request_rec)
+
             current_app.logger.info("Transformation request submitted!",
                                     extra={'requestId': request_id})
             return {
@@ -0,0 +1,201 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from servicex_app.models import TransformRequest, TransformationResult, TransformStatus, \
+    RequestCounts, db
+from servicex_app.object_store_manager import ObjectStoreManager
+from servicex_app.status_notifier import StatusNotifier
+
+
+class ResultCache:
+    """
+    Serve the files of a request from the outputs of earlier requests that ran
+    the same generated code in the same transformer over the same dataset files
+    and produced the same result format. Cached outputs are copied into the new
+    request's bucket and recorded as successful results, so only the files
+    without a cached output need to be dispatched to the transformers.
+    """
+    def __init__(self, object_store: ObjectStoreManager, transformer_manager=None,
+                 status_notifier: Optional[StatusNotifier] = None):
+        self.object_store = object_store
+        self.transformer_manager = transformer_manager
+        self.status_notifier = status_notifier
+
+    @staticmethod
+    def is_cacheable(request: TransformRequest) -> bool:
+        return bool(request.code_hash) and \
+            request.result_destination == TransformRequest.OBJECT_STORE_DEST
+
+    @staticmethod
+    def lookup(request: TransformRequest, file_ids: List[int]) -> dict:
+        """
+        Find the most recent cached output of each of the files for this request
+        :return: Dictionary of file id to the result row of the cached output
+        """
+        if not file_ids:
+            return {}
+
+        result = TransformationResult
+        rows = db.session.execute(
+            select(result.file_id, result.request_id, result.file_path, result.output_object,
+                   result.transform_time, result.total_bytes, result.total_events,
+                   result.avg_rate)
+            .join(TransformRequest, TransformRequest.request_id == result.request_id)
+            .where(TransformRequest.code_hash == request.code_hash,
+                   TransformRequest.result_format == request.result_format,
+                   TransformRequest.result_destination == TransformRequest.OBJECT_STORE_DEST,
+                   TransformRequest.request_id != request.request_id,
+                   result.transform_status == 'success',
+                   result.output_object.is_not(None),
+                   result.file_id.in_(file_ids))
+            .order_by(result.id.desc())
+        ).all()
+
+        cached = {}
+        for row in rows:
+            cached.setdefault(row.file_id, row)
+        return cached
+
+    def find_reusable_request(self, request: TransformRequest) -> Optional[TransformRequest]:
+        """
+        Find an earlier request whose outputs cover every file of this one,
+        since it ran the same code with the same result format over the same
+        dataset and completed without failures. The request's files must
+        already be set to the size of the dataset.
+        """
+        if not self.is_cacheable(request) or not request.files:
+            return None
+
+        previous = TransformRequest.query.filter(
+            TransformRequest.code_hash == request.code_hash,
+            TransformRequest.did_id == request.did_id,
+            TransformRequest.result_format == request.result_format,
+            TransformRequest.result_destination == TransformRequest.OBJECT_STORE_DEST,
+            TransformRequest.status == TransformStatus.complete,
+            TransformRequest.files_completed == request.files,
+            TransformRequest.files_failed == 0,
+            TransformRequest.request_id != request.request_id
+        ).order_by(TransformRequest.id.desc()).first()
+        if previous is None:
+            return None
+
+        # Results recorded before outputs were tracked can't be copied
+        outputs = db.session.scalar(
+            select(func.count()).select_from(TransformationResult).where(
+                TransformationResult.request_id == previous.request_id,
+                TransformationResult.transform_status == 'success',
+                TransformationResult.output_object.is_not(None)))
+        if outputs < request.files or not self.object_store.bucket_exists(previous.request_id):
+            return None
+        return previous
+
+    def serve(self, request: TransformRequest,
+              files: Iterable) -> tuple[list, Optional[RequestCounts]]:
+        """
+        Copy the cached outputs of any of the files into the request's bucket
+        and record them as transformed. Commits the request's counters, and
+        completes the request if these were the last of its files.
+        :return: The files that still have to be transformed, and the updated
+            counters of the request if any files were served from the cache
+        """
+        files = list(files)
+        if not self.is_cacheable(request):
+            return files, None
+
+        cached = self.lookup(request, [file_record.id for file_record in files])
+        results = []
+        for file_record in files:
+            hit = cached.get(file_record.id)
+            if hit is None:
+                continue
+            try:
+                self.object_store.copy_object(request.request_id, hit.output_object,
+                                              hit.request_id)
+            except Exception:
+                # The earlier request's bucket may have been deleted, just
+                # transform the file again
+                current_app.logger.warning("Cached output not available", exc_info=True,
+                                           extra={'requestId': request.request_id,
+                                                  'cachedRequestId': hit.request_id,
+                                                  'objectName': hit.output_object})
+                continue
+
+            results.append({
+                'did': request.did,
+                'file_id': file_record.id,
+                'request_id': request.request_id,
+                'file_path': hit.file_path,
+                'transform_status': 'success',
+                'transform_time': hit.transform_time,
+                'total_bytes': hit.total_bytes,
+                'total_events': hit.total_events,
+                'avg_rate': hit.avg_rate,
+                'output_object': hit.output_object
+            })
+
+        if not results:
+            return files, None
+
+        # A resumed dispatch can serve the same files again
+        new_results = TransformationResult.unrecorded(request.request_id, results)
+        counts = TransformRequest.files_transformed(request.request_id,
+                                                    succeeded=len(new_results), failed=0)
+        TransformationResult.bulk_insert(new_results)
+        TransformRequest.add_result_statistics(request.request_id, new_results)
+        db.session.commit()
+
+        current_app.logger.info("Served files from the result cache", extra={
+            'requestId': request.request_id, 'num_files': len(new_results)})
+        complete = counts.completed_by(len(new_results))
+        if complete:
+            self.transform_complete(request)
+        if self.status_notifier is not None:
+            self.status_notifier.notify(request.request_id)
+            if complete:
+                self.status_notifier.forget(request.request_id)
+
+        served = {result['file_id'] for result in results}
+        return [file_record for file_record in files if file_record.id not in served], counts
+
+    def transform_complete(self, request: TransformRequest) -> None:
+        """
+        Complete a request whose last files were served from the cache
+        """
+        request.status = TransformStatus.complete
+        request.finish_time = datetime.now(tz=timezone.utc)
+        db.session.commit()
+        current_app.logger.info("Request completed from the result cache. Shutting down transformers",
+                                extra={'requestId': request.request_id})
+        if self.transformer_manager:
+            self.transformer_manager.shutdown_transformer_job(
+                request.request_id, current_app.config['TRANSFORMER_NAMESPACE'])
@@ -30,7 +30,8 @@ from flask import current_app as app
 
 def add_routes(api, transformer_manager, rabbit_mq_adaptor,
                object_store, code_gen_service,
-               lookup_result_processor, docker_repo_adapter, celery_app):
+               lookup_result_processor, docker_repo_adapter, celery_app, file_dispatcher,
+               result_cache=None, status_notifier=None):
 
     from servicex_app.resources.info import Info
 
@@ -38,9 +39,13 @@ def add_routes(api, transformer_manager, rabbit_mq_adaptor,
     from servicex_app.resources.internal.fileset_complete import FilesetComplete
     from servicex_app.resources.internal.transform_status import TransformationStatusInternal
     from servicex_app.resources.internal.transformer_file_complete import TransformerFileComplete
+    from servicex_app.resources.internal.transformer_file_complete_batch import \
+        TransformerFileCompleteBatch
 
     from servicex_app.resources.transformation.submit import SubmitTransformationRequest
     from servicex_app.resources.transformation.status import TransformationStatus
+    from servicex_app.resources.transformation.status_stream import TransformationStatusStream
+    from servicex_app.resources.transformation.results import TransformationResults
     from servicex_app.resources.transformation.cancel import CancelTransform
     from servicex_app.resources.transformation.get_all import AllTransformationRequests
     from servicex_app.resources.transformation.get_one import TransformationRequest
@@ -73,13 +78,19 @@ def add_routes(api, transformer_manager, rabbit_mq_adaptor,
     # Must be its own module to allow patching
     from servicex_app.web.create_profile import create_profile
 
+    from servicex_app.status_notifier import StatusNotifier
+    if status_notifier is None:
+        status_notifier = StatusNotifier()
+
     SubmitTransformationRequest.make_api(rabbitmq_adaptor=rabbit_mq_adaptor,
                                          object_store=object_store,
                                          code_gen_service=code_gen_service,
                                          lookup_result_processor=lookup_result_processor,
                                          docker_repo_adapter=docker_repo_adapter,
                                          transformer_manager=transformer_manager,
-                                         celery_app=celery_app)
+                                         celery_app=celery_app,
+                                         file_dispatcher=file_dispatcher,
+                                         result_cache=result_cache)
 
     # Web Frontend Routes
     app.add_url_rule('/', 'home', home)
@@ -131,6 +142,10 @@ def add_routes(api, transformer_manager, rabbit_mq_adaptor,
     api.add_resource(TransformationRequest, prefix)
     api.add_resource(TransformationStatus, prefix + "/status")
 
+    TransformationStatusStream.make_api(status_notifier)
+    api.add_resource(TransformationStatusStream, prefix + "/status/stream")
+    api.add_resource(TransformationResults, prefix + "/results")
+
     DeploymentStatus.make_api(transformer_manager)
     api.add_resource(DeploymentStatus, prefix + "/deployment-status")
 
@@ -145,10 +160,14 @@ def add_routes(api, transformer_manager, rabbit_mq_adaptor,
     api.add_resource(AddFileToDataset,
                      '/servicex/internal/transformation/<string:dataset_id>/files')
 
-    FilesetComplete.make_api(lookup_result_processor, transformer_manager)
+    FilesetComplete.make_api(lookup_result_processor, transformer_manager, file_dispatcher)
     api.add_resource(FilesetComplete,
                      '/servicex/internal/transformation/<string:dataset_id>/complete')
 
-    TransformerFileComplete.make_api(transformer_manager)
+    TransformerFileComplete.make_api(transformer_manager, status_notifier)
     api.add_resource(TransformerFileComplete,
                      '/servicex/internal/transformation/<string:request_id>/file-complete')
+
+    TransformerFileCompleteBatch.make_api(transformer_manager, status_notifier)
+    api.add_resource(TransformerFileCompleteBatch,
+                     '/servicex/internal/transformation/<string:request_id>/file-complete-batch')
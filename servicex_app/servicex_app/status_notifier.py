@@ -0,0 +1,93 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class StatusNotifier:
+    """
+    In-process publish/subscribe of request status changes. Every notification
+    bumps a per-request version number; waiters block until the version moves
+    past the one they have seen. Only threads of the same process are woken,
+    so waiters should still re-check the database on a timeout to catch
+    changes recorded by other processes.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions: dict[str, int] = {}
+        self._waiters = 0
+
+    @contextmanager
+    def waiter(self, max_waiters: int) -> Iterator[bool]:
+        """
+        Reserve a place among at most max_waiters concurrent waiters of this
+        process, so waiters can't tie up every thread of the worker
+        :param max_waiters: Maximum number of concurrent waiters
+        :return: Context yielding False, without reserving a place, if they are all taken
+        """
+        with self._condition:
+            admitted = self._waiters < max_waiters
+            if admitted:
+                self._waiters += 1
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                with self._condition:
+                    self._waiters -= 1
+
+    def version(self, request_id: str) -> int:
+        with self._condition:
+            return self._versions.get(request_id, 0)
+
+    def notify(self, request_id: str) -> None:
+        with self._condition:
+            self._versions[request_id] = self._versions.get(request_id, 0) + 1
+            self._condition.notify_all()
+
+    def wait(self, request_id: str, version: int, timeout: Optional[float]) -> int:
+        """
+        Wait for a notification newer than the given version
+        :param request_id: Request to wait on
+        :param version: The last version seen by the caller
+        :param timeout: Maximum number of seconds to wait
+        :return: The current version, which is unchanged if the wait timed out
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._versions.get(request_id, 0) != version, timeout)
+            return self._versions.get(request_id, 0)
+
+    def forget(self, request_id: str) -> None:
+        """
+        Drop the bookkeeping of a finished request, waking any remaining waiters
+        """
+        with self._condition:
+            if self._versions.pop(request_id, None) is not None:
+                self._condition.notify_all()
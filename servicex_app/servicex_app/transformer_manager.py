@@ -26,18 +26,29 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import base64
+import hashlib
 import kubernetes
 import os
 from flask import current_app
+from io import BytesIO
 from kubernetes import client
 from kubernetes.client.rest import ApiException
 from typing import Optional
+from zipfile import ZipFile
 
-from servicex_app.models import TransformRequest
+from servicex_app.models import GeneratedCode, TransformRequest
 
 
 class TransformerManager:
     POSIX_VOLUME_MOUNT = "/posix_volume"
+    COMPILE_CACHE_MOUNT = "/compile-cache"
+    REPORT_SPOOL_MOUNT = "/report-spool"
+
+    # Each warm pool pod waits for its request on a queue of its own
+    POOL_QUEUE_PREFIX = "transformer-pool-"
+
+    # Generated code ConfigMaps shared by the requests with the same code
+    SHARED_CONFIGMAP_PREFIX = "generated-source-"
 
     # This is the number of seconds tha thte transformer has to finish uploading
     # objects to the object store before it is terminated.
@@ -68,13 +79,16 @@ class TransformerManager:
 
         request_rec.workers = min(max(1, request_rec.files), request_rec.workers)
 
+        self.restore_shared_configmap(generated_code_cm, namespace)
+        warm = self.bind_warm_transformers(config, request_rec)
+
         current_app.logger.info(
             f"Launching {request_rec.workers} transformers.",
-            extra={'requestId': request_rec.request_id})
+            extra={'requestId': request_rec.request_id, 'warm': warm})
 
         self.launch_transformer_jobs(
             image=request_rec.image, request_id=request_rec.request_id,
-            workers=request_rec.workers,
+            workers=max(0, request_rec.workers - warm),
             rabbitmq_uri=rabbitmq_uri,
             namespace=namespace,
             x509_secret=x509_secret,
@@ -85,10 +99,240 @@ class TransformerManager:
             transformer_command=request_rec.transformer_command
         )
 
+    @staticmethod
+    def pool_name(image: str) -> str:
+        """
+        Image names aren't valid Kubernetes names, so the warm pool of an image
+        is named after its hash
+        """
+        return TransformerManager.POOL_QUEUE_PREFIX + \
+            hashlib.sha256(image.encode('utf-8')).hexdigest()[:12]
+
+    def ensure_warm_pools(self, config: dict):
+        """
+        Create or update the Deployment of idle transformers for each of the
+        images configured for the warm pool
+        """
+        api_v1 = client.AppsV1Api()
+        namespace = config['TRANSFORMER_NAMESPACE']
+        for image in config.get('TRANSFORMER_WARM_POOL_IMAGES', []):
+            pool = self.create_pool_object(image, config['TRANSFORMER_RABBIT_MQ_URL'],
+                                           config['TRANSFORMER_X509_SECRET'],
+                                           config['TRANSFORMER_WARM_POOL_SIZE'])
+            try:
+                api_v1.create_namespaced_deployment(body=pool, namespace=namespace)
+            except ApiException as e:
+                if e.status != 409:
+                    raise
+                api_v1.replace_namespaced_deployment(name=pool.metadata.name,
+                                                     namespace=namespace, body=pool)
+            current_app.logger.info("Warm pool ready.", extra={
+                'image': image, 'pool': pool.metadata.name})
+
+    def bind_warm_transformers(self, config: dict, request_rec: TransformRequest) -> int:
+        """
+        Hand idle pods from the warm pool of the request's image over to the
+        request. A pod is taken out of its pool by relabelling it, which makes
+        the pool's ReplicaSet start a replacement, and is then sent the
+        request and its generated code on its control queue.
+
+        :return: Number of pods bound to the request
+        """
+        if request_rec.image not in config.get('TRANSFORMER_WARM_POOL_IMAGES', []) or \
+                request_rec.result_destination != 'object-store' or \
+                not request_rec.generated_code_cm:
+            return 0
+
+        namespace = config['TRANSFORMER_NAMESPACE']
+        api_core = client.CoreV1Api()
+        try:
+            pods = api_core.list_namespaced_pod(
+                namespace,
+                label_selector=f"servicex/pool={self.pool_name(request_rec.image)}")
+            configmap = api_core.read_namespaced_config_map(
+                name=request_rec.generated_code_cm, namespace=namespace)
+        except ApiException:
+            current_app.logger.exception("Unable to look up warm transformers", extra={
+                'requestId': request_rec.request_id})
+            return 0
+
+        binding = {
+            'request-id': request_rec.request_id,
+            'result-destination': request_rec.result_destination,
+            'result-format': request_rec.result_format,
+            'transformer-language': request_rec.transformer_language,
+            'transformer-command': request_rec.transformer_command,
+            'generated-code': configmap.binary_data or {}
+        }
+
+        bound = 0
+        for pod in pods.items:
+            if bound == request_rec.workers:
+                break
+            if pod.status.phase != 'Running' or pod.metadata.deletion_timestamp:
+                continue
+
+            # The resource version makes the patch fail if another request
+            # claimed the pod first
+            try:
+                api_core.patch_namespaced_pod(pod.metadata.name, namespace, {
+                    'metadata': {
+                        'resourceVersion': pod.metadata.resource_version,
+                        'labels': {
+                            'servicex/pool': None,
+                            'servicex/request-id': request_rec.request_id
+                        }
+                    }
+                })
+            except ApiException as e:
+                if e.status != 409:
+                    current_app.logger.exception("Unable to claim warm transformer", extra={
+                        'requestId': request_rec.request_id, 'pod': pod.metadata.name})
+                continue
+
+            with self.celery_app.connection_for_write() as connection:
+                queue = connection.SimpleQueue(
+                    self.POOL_QUEUE_PREFIX + pod.metadata.name,
+                    queue_opts={'durable': False, 'auto_delete': True})
+                queue.put(binding)
+                queue.close()
+            bound += 1
+
+        return bound
+
     @staticmethod
     def create_job_object(request_id, image, rabbitmq_uri, workers,
                           result_destination, result_format, x509_secret,
                           generated_code_cm, transformer_language, transformer_command):
+        volumes, volume_mounts = TransformerManager._transformer_volumes(x509_secret)
+
+        if generated_code_cm:
+            volumes.append(client.V1Volume(
+                name='generated-code',
+                config_map=client.V1ConfigMapVolumeSource(
+                    name=generated_code_cm)
+            )
+            )
+            volume_mounts.append(
+                client.V1VolumeMount(mount_path="/generated", name='generated-code'))
+
+        env = TransformerManager._transformer_env(image, result_destination)
+
+        if result_destination == 'volume':
+            TransformerManager.create_posix_volume(volumes, volume_mounts)
+
+        output_path = current_app.config['TRANSFORMER_SIDECAR_VOLUME_PATH']
+        science_command = TransformerManager._science_command_prefix(x509_secret)
+
+        sidecar_command = "PYTHONPATH=/servicex/transformer_sidecar:$PYTHONPATH " + \
+            "python /servicex/transformer_sidecar/transformer.py " + \
+            " --shared-dir /servicex/output " + \
+            " --request-id " + request_id + \
+            " --rabbit-uri " + rabbitmq_uri + \
+            " --result-destination " + result_destination + \
+            " --result-format " + result_format
+
+        watch_path = os.path.join(current_app.config['TRANSFORMER_SIDECAR_VOLUME_PATH'],
+                                  request_id)
+        science_command += "cp /generated/transformer_capabilities.json {op} && ".format(
+                               op=output_path) + \
+                           TransformerManager._watch_command(
+                               "{TL} {TC} {WP}".format(TL=transformer_language,
+                                                       TC=transformer_command,
+                                                       WP=watch_path))
+
+        sidecar_command += TransformerManager._sidecar_options()
+
+        if result_destination == 'volume':
+            sidecar_command += " --output-dir " + os.path.join(
+                TransformerManager.POSIX_VOLUME_MOUNT,
+                current_app.config['TRANSFORMER_PERSISTENCE_SUBDIR'])
+
+        template = TransformerManager._pod_template(
+            {'app': "transformer-" + request_id}, image, volumes, volume_mounts, env,
+            science_command, sidecar_command)
+
+        # Create the specification of deployment
+        selector = client.V1LabelSelector(
+            match_labels={
+                "app": "transformer-" + request_id
+            })
+
+        # If we are using Autoscaler then always start with one replica
+        if current_app.config['TRANSFORMER_AUTOSCALE_ENABLED']:
+            replicas = current_app.config.get('TRANSFORMER_MIN_REPLICAS', 1)
+        else:
+            replicas = workers
+        spec = client.V1DeploymentSpec(
+            template=template,
+            selector=selector,
+            replicas=replicas
+        )
+
+        deployment = client.V1Deployment(
+            api_version="apps/v1",
+            kind="Deployment",
+            metadata=client.V1ObjectMeta(name="transformer-" + request_id),
+            spec=spec
+        )
+
+        return deployment
+
+    @staticmethod
+    def create_pool_object(image, rabbitmq_uri, x509_secret, replicas):
+        """
+        Deployment of idle transformer pods for a science image. The sidecar
+        waits for a request on a control queue of its own, and writes the
+        generated code it is sent to the /generated volume it shares with the
+        science container, which waits for it before starting the transformer.
+        Pool pods only ever deliver results to the object store.
+        """
+        pool_name = TransformerManager.pool_name(image)
+        volumes, volume_mounts = TransformerManager._transformer_volumes(x509_secret)
+        volumes.append(client.V1Volume(
+            name='generated-code',
+            empty_dir=client.V1EmptyDirVolumeSource()))
+        volume_mounts.append(
+            client.V1VolumeMount(mount_path="/generated", name='generated-code'))
+
+        env = TransformerManager._transformer_env(image, 'object-store')
+
+        output_path = current_app.config['TRANSFORMER_SIDECAR_VOLUME_PATH']
+        science_command = TransformerManager._science_command_prefix(x509_secret)
+        science_command += "until [ -f {op}/bind.env ]; do sleep 0.1; done && " \
+                           ". {op}/bind.env && " \
+                           "cp /generated/transformer_capabilities.json {op} && ".format(
+                               op=output_path) + \
+                           TransformerManager._watch_command(
+                               "\"$TRANSFORMER_LANGUAGE\" \"$TRANSFORMER_COMMAND\" "
+                               "{op}/$REQUEST_ID".format(op=output_path))
+
+        sidecar_command = "PYTHONPATH=/servicex/transformer_sidecar:$PYTHONPATH " + \
+            "python /servicex/transformer_sidecar/transformer.py " + \
+            " --shared-dir /servicex/output " + \
+            " --rabbit-uri " + rabbitmq_uri + \
+            " --pool-queue " + TransformerManager.POOL_QUEUE_PREFIX + "$POD_NAME"
+        sidecar_command += TransformerManager._sidecar_options()
+
+        template = TransformerManager._pod_template(
+            {'servicex/pool': pool_name}, image, volumes, volume_mounts, env,
+            science_command, sidecar_command)
+
+        spec = client.V1DeploymentSpec(
+            template=template,
+            selector=client.V1LabelSelector(match_labels={'servicex/pool': pool_name}),
+            replicas=replicas
+        )
+
+        return client.V1Deployment(
+            api_version="apps/v1",
+            kind="Deployment",
+            metadata=client.V1ObjectMeta(name=pool_name, annotations={'servicex/image': image}),
+            spec=spec
+        )
+
+    @staticmethod
+    def _transformer_volumes(x509_secret):
         volume_mounts = []
         volumes = []
 
@@ -117,16 +361,6 @@ class TransformerManager:
                 secret=client.V1SecretVolumeSource(secret_name=x509_secret)
             ))
 
-        if generated_code_cm:
-            volumes.append(client.V1Volume(
-                name='generated-code',
-                config_map=client.V1ConfigMapVolumeSource(
-                    name=generated_code_cm)
-            )
-            )
-            volume_mounts.append(
-                client.V1VolumeMount(mount_path="/generated", name='generated-code'))
-
         if "TRANSFORMER_LOCAL_PATH" in current_app.config:
             path = current_app.config['TRANSFORMER_LOCAL_PATH']
             volumes.append(client.V1Volume(
@@ -135,9 +369,52 @@ class TransformerManager:
             volume_mounts.append(
                 client.V1VolumeMount(mount_path="/data", name='rootfiles'))
 
+        # Share compiled transformers between pods running the same generated
+        # code in the same science image
+        if current_app.config.get('TRANSFORMER_COMPILE_CACHE_CLAIM'):
+            volumes.append(
+                client.V1Volume(
+                    name='compile-cache',
+                    persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                        claim_name=current_app.config['TRANSFORMER_COMPILE_CACHE_CLAIM']
+                    )
+                )
+            )
+            volume_mounts.append(
+                client.V1VolumeMount(mount_path=TransformerManager.COMPILE_CACHE_MOUNT,
+                                     name='compile-cache'))
+
+        # Spool unreported completed files where they outlive the pod
+        if current_app.config.get('TRANSFORMER_REPORT_SPOOL_CLAIM'):
+            volumes.append(
+                client.V1Volume(
+                    name='report-spool',
+                    persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                        claim_name=current_app.config['TRANSFORMER_REPORT_SPOOL_CLAIM']
+                    )
+                )
+            )
+            volume_mounts.append(
+                client.V1VolumeMount(mount_path=TransformerManager.REPORT_SPOOL_MOUNT,
+                                     name='report-spool'))
+
+        return volumes, volume_mounts
+
+    @staticmethod
+    def _transformer_env(image, result_destination):
         # Compute Environment Vars
         env = [client.V1EnvVar(name="BASH_ENV", value="/servicex/.bashrc")]
 
+        if current_app.config.get('TRANSFORMER_COMPILE_CACHE_CLAIM'):
+            env += [
+                client.V1EnvVar("COMPILE_CACHE_DIR",
+                                value=TransformerManager.COMPILE_CACHE_MOUNT),
+                client.V1EnvVar("SCIENCE_IMAGE", value=image),
+                client.V1EnvVar("COMPILE_CACHE_MAX_ENTRIES",
+                                value=str(current_app.config.get(
+                                    'TRANSFORMER_COMPILE_CACHE_MAX_ENTRIES', 32)))
+            ]
+
         # provide pods with level and logging server info
         env += [
             client.V1EnvVar("LOG_LEVEL", value=os.environ.get('LOG_LEVEL', 'INFO').upper()),
@@ -181,38 +458,66 @@ class TransformerManager:
             if 'MINIO_ENCRYPT' in current_app.config:
                 env += [client.V1EnvVar(name='MINIO_ENCRYPT',
                                         value=str(current_app.config['MINIO_ENCRYPT']))]
+        return env
 
-        if result_destination == 'volume':
-            TransformerManager.create_posix_volume(volumes, volume_mounts)
-
+    @staticmethod
+    def _science_command_prefix(x509_secret):
         science_command = " "
         if x509_secret:
             science_command = "until [ -f /servicex/output/scripts/proxy-exporter.sh ];" \
                               "do sleep 5;done &&" \
                               " /servicex/output/scripts/proxy-exporter.sh & sleep 5 && "
+        return science_command
 
-        sidecar_command = "PYTHONPATH=/servicex/transformer_sidecar:$PYTHONPATH " + \
-            "python /servicex/transformer_sidecar/transformer.py " + \
-            " --shared-dir /servicex/output " + \
-            " --request-id " + request_id + \
-            " --rabbit-uri " + rabbitmq_uri + \
-            " --result-destination " + result_destination + \
-            " --result-format " + result_format
-
-        watch_path = os.path.join(current_app.config['TRANSFORMER_SIDECAR_VOLUME_PATH'],
-                                  request_id)
-        science_command += "cp /generated/transformer_capabilities.json {op} && " \
-                           "PYTHONPATH=/generated:$PYTHONPATH " \
-                           "bash {op}/scripts/watch.sh ".format(op=output_path) + \
-                           "{TL} ".format(TL=transformer_language) + \
-                           "{TC} ".format(TC=transformer_command) + \
-                           watch_path
+    @staticmethod
+    def _watch_command(watch_args):
+        """
+        Run the watcher in the science container, once for every transform slot
+        the sidecar serves. Images with python 3.6 or later get watch.py, which
+        speaks the framed protocol, the others fall back to watch.sh.
+        """
+        watcher = "$(python3 -c 'import sys; sys.exit(sys.version_info < (3, 6))' " \
+                  "2> /dev/null && echo python3 {op}/scripts/watch.py " \
+                  "|| echo bash {op}/scripts/watch.sh)".format(
+                      op=current_app.config['TRANSFORMER_SIDECAR_VOLUME_PATH'])
+        watch = "PYTHONPATH=/generated:$PYTHONPATH {watcher} {args}".format(
+            watcher=watcher, args=watch_args)
+
+        slots = current_app.config.get('TRANSFORMER_SLOTS', 1)
+        if slots > 1:
+            return "for slot in $(seq {slots}); do {watch} & done; wait".format(
+                slots=slots, watch=watch)
+        return watch
 
-        if result_destination == 'volume':
-            sidecar_command += " --output-dir " + os.path.join(
-                TransformerManager.POSIX_VOLUME_MOUNT,
-                current_app.config['TRANSFORMER_PERSISTENCE_SUBDIR'])
+    @staticmethod
+    def _sidecar_options():
+        args = ""
+        # Serve several watch.sh workers of the science container at once
+        if current_app.config.get('TRANSFORMER_SLOTS', 1) > 1:
+            args += " --slots " + str(current_app.config['TRANSFORMER_SLOTS'])
+
+        # Optionally upload parquet output while the transformer writes it
+        if current_app.config.get('TRANSFORMER_STREAM_UPLOADS'):
+            args += " --stream-uploads"
+
+        # Optionally stage upcoming files of a batch while the current one is transformed
+        if current_app.config.get('TRANSFORMER_PREFETCH_BYTES'):
+            args += " --prefetch-bytes " + str(current_app.config['TRANSFORMER_PREFETCH_BYTES'])
+
+        # Optionally have the sidecar report completed files to the app in batches
+        if current_app.config.get('TRANSFORMER_REPORT_BATCH_SIZE'):
+            args += " --report-batch-size " + \
+                str(current_app.config['TRANSFORMER_REPORT_BATCH_SIZE'])
+        if current_app.config.get('TRANSFORMER_REPORT_FLUSH_INTERVAL'):
+            args += " --report-flush-interval " + \
+                str(current_app.config['TRANSFORMER_REPORT_FLUSH_INTERVAL'])
+        if current_app.config.get('TRANSFORMER_REPORT_SPOOL_CLAIM'):
+            args += " --report-spool-dir " + TransformerManager.REPORT_SPOOL_MOUNT
+        return args
 
+    @staticmethod
+    def _pod_template(labels, image, volumes, volume_mounts, env,
+                      science_command, sidecar_command):
         resources = client.V1ResourceRequirements(
             limits={"cpu": current_app.config['TRANSFORMER_CPU_LIMIT']}
         )
@@ -242,8 +547,8 @@ class TransformerManager:
         )
 
         # Create and Configure a spec section
-        template = client.V1PodTemplateSpec(
-            metadata=client.V1ObjectMeta(labels={'app': "transformer-" + request_id}),
+        return client.V1PodTemplateSpec(
+            metadata=client.V1ObjectMeta(labels=labels),
             spec=client.V1PodSpec(
                 restart_policy="Always",
                 termination_grace_period_seconds=TransformerManager.POD_TERMINATION_GRACE_PERIOD,
@@ -251,32 +556,6 @@ class TransformerManager:
                 containers=[sidecar, science_container],  # Containers are started in this order
                 volumes=volumes))
 
-        # Create the specification of deployment
-        selector = client.V1LabelSelector(
-            match_labels={
-                "app": "transformer-" + request_id
-            })
-
-        # If we are using Autoscaler then always start with one replica
-        if current_app.config['TRANSFORMER_AUTOSCALE_ENABLED']:
-            replicas = current_app.config.get('TRANSFORMER_MIN_REPLICAS', 1)
-        else:
-            replicas = workers
-        spec = client.V1DeploymentSpec(
-            template=template,
-            selector=selector,
-            replicas=replicas
-        )
-
-        deployment = client.V1Deployment(
-            api_version="apps/v1",
-            kind="Deployment",
-            metadata=client.V1ObjectMeta(name="transformer-" + request_id),
-            spec=spec
-        )
-
-        return deployment
-
     @staticmethod
     def create_posix_volume(volumes, volume_mounts):
         if 'TRANSFORMER_PERSISTENCE_PROVIDED_CLAIM' not in current_app.config or \
@@ -368,7 +647,7 @@ class TransformerManager:
 
         self._create_job(api_v1, job, namespace)
 
-        if current_app.config['TRANSFORMER_AUTOSCALE_ENABLED']:
+        if self.cpu_autoscaler_enabled():
             autoscaler_api = kubernetes.client.AutoscalingV1Api()
             hpa = self.create_hpa_object(request_id)
             self._create_hpa(autoscaler_api, hpa, namespace)
@@ -376,7 +655,7 @@ class TransformerManager:
     @classmethod
     def shutdown_transformer_job(cls, request_id, namespace):
         try:
-            if current_app.config['TRANSFORMER_AUTOSCALE_ENABLED']:
+            if cls.cpu_autoscaler_enabled():
                 autoscaler_api = kubernetes.client.AutoscalingV1Api()
                 autoscaler_api.delete_namespaced_horizontal_pod_autoscaler(
                     name="transformer-" + request_id,
@@ -387,10 +666,11 @@ class TransformerManager:
                                          "requestId": request_id})
 
         try:
-            api_core = client.CoreV1Api()
-            configmap_name = "{}-generated-source".format(request_id)
-            api_core.delete_namespaced_config_map(name=configmap_name,
-                                                  namespace=namespace)
+            configmap_name = cls.generated_source_to_delete(request_id)
+            if configmap_name:
+                api_core = client.CoreV1Api()
+                api_core.delete_namespaced_config_map(name=configmap_name,
+                                                      namespace=namespace)
         except ApiException:
             current_app.logger.exception("Exception during Job ConfigMap cleanup", extra={
                                          "requestId": request_id})
@@ -405,6 +685,14 @@ class TransformerManager:
             current_app.logger.exception("Exception during Job Deployment Shut Down", extra={
                                          "requestId": request_id})
 
+        # Pods taken from a warm pool don't belong to the request's deployment
+        try:
+            client.CoreV1Api().delete_collection_namespaced_pod(
+                namespace, label_selector=f"servicex/request-id={request_id}")
+        except ApiException:
+            current_app.logger.exception("Exception during warm transformer Shut Down",
+                                         extra={"requestId": request_id})
+
         # delete RabbitMQ queue
         try:
             current_app.logger.info(f"Stopping workers connected to transformer-{request_id}")
@@ -415,6 +703,48 @@ class TransformerManager:
                 "exception": e
             })
 
+    @staticmethod
+    def cpu_autoscaler_enabled() -> bool:
+        """
+        Transformers are scaled by a CPU utilisation HPA, unless the queue
+        depth scaler is doing the scaling
+        """
+        return current_app.config['TRANSFORMER_AUTOSCALE_ENABLED'] and \
+            current_app.config.get('TRANSFORMER_AUTOSCALE_METRIC', 'cpu') == 'cpu'
+
+    @staticmethod
+    def get_transformer_replicas(request_id: str, namespace: str) -> Optional[int]:
+        try:
+            scale = client.AppsV1Api().read_namespaced_deployment_scale(
+                name="transformer-" + request_id, namespace=namespace)
+            return scale.spec.replicas
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+
+    @staticmethod
+    def get_transformer_replica_counts(request_id: str,
+                                       namespace: str) -> Optional[tuple[int, int]]:
+        """
+        The number of replicas of the request's Deployment and how many of
+        them are ready, or None if there is no Deployment
+        """
+        try:
+            deployment = client.AppsV1Api().read_namespaced_deployment_status(
+                name="transformer-" + request_id, namespace=namespace)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+        return deployment.spec.replicas or 0, deployment.status.ready_replicas or 0
+
+    @staticmethod
+    def scale_transformer_job(request_id: str, namespace: str, replicas: int):
+        client.AppsV1Api().patch_namespaced_deployment_scale(
+            name="transformer-" + request_id, namespace=namespace,
+            body={'spec': {'replicas': replicas}})
+
     @staticmethod
     def get_deployment_status(
         request_id: str
@@ -429,9 +759,81 @@ class TransformerManager:
         deployment: kubernetes.client.AppsV1beta1Deployment = results.items[0]
         return deployment.status
 
+    @staticmethod
+    def generated_source_to_delete(request_id: str) -> Optional[str]:
+        """
+        Name of the generated code ConfigMap to delete along with the request's
+        transformers. ConfigMaps shared through the code generation cache are
+        reference counted by the requests still running that mount them, so
+        only the last of those deletes it.
+        """
+        transform_request = TransformRequest.lookup(request_id)
+        if transform_request is None or not transform_request.generated_code_cm:
+            return "{}-generated-source".format(request_id)
+
+        configmap_name = transform_request.generated_code_cm
+        if TransformRequest.count_active_using_configmap(configmap_name, request_id):
+            current_app.logger.info("Generated code ConfigMap still in use", extra={
+                "requestId": request_id, "configmap": configmap_name})
+            return None
+        return configmap_name
+
     @staticmethod
     def create_configmap_from_zip(zipfile, request_id, namespace):
         configmap_name = "{}-generated-source".format(request_id)
+        TransformerManager._create_configmap(zipfile, configmap_name, namespace)
+        return configmap_name
+
+    @staticmethod
+    def create_shared_configmap_from_zip(zipfile, source_hash, namespace):
+        """
+        Create a ConfigMap named after the hash of the generated code, that any
+        request with the same generated code can mount. It is fine for the
+        ConfigMap to already exist, since its contents are the same.
+        """
+        configmap_name = TransformerManager.SHARED_CONFIGMAP_PREFIX + source_hash[:32]
+        TransformerManager._create_configmap_if_missing(zipfile, configmap_name, namespace)
+        return configmap_name
+
+    @staticmethod
+    def restore_shared_configmap(configmap_name, namespace):
+        """
+        Recreate a shared generated code ConfigMap from the archive kept by the
+        code generation cache. The last request using it may have deleted it
+        since this request found it, so this is done just before creating a
+        Deployment that mounts it. Usually the ConfigMap still exists.
+        """
+        if not configmap_name or \
+                not configmap_name.startswith(TransformerManager.SHARED_CONFIGMAP_PREFIX):
+            return
+
+        source_zip = GeneratedCode.source_zip_for(configmap_name)
+        if source_zip is None:
+            return
+        TransformerManager._create_configmap_if_missing(ZipFile(BytesIO(source_zip)),
+                                                        configmap_name, namespace)
+
+    @staticmethod
+    def _create_configmap_if_missing(zipfile, configmap_name, namespace):
+        try:
+            TransformerManager._create_configmap(zipfile, configmap_name, namespace)
+        except ApiException as e:
+            if e.status != 409:
+                raise
+
+    @staticmethod
+    def configmap_exists(configmap_name, namespace) -> bool:
+        try:
+            client.CoreV1Api().read_namespaced_config_map(name=configmap_name,
+                                                          namespace=namespace)
+            return True
+        except ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+
+    @staticmethod
+    def _create_configmap(zipfile, configmap_name, namespace):
         data = {
             file.filename:
                 base64.b64encode(zipfile.open(file).read()).decode("ascii") for file in
@@ -455,4 +857,3 @@ class TransformerManager:
         api_instance.create_namespaced_config_map(
             namespace=namespace,
             body=configmap)
-        return configmap_name
@@ -0,0 +1,233 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import math
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Optional
+
+from celery import Celery
+from flask import Flask
+
+from servicex_app.models import Lease, TransformRequest, TransformStatus
+from servicex_app.transformer_manager import TransformerManager
+
+
+class TransformerScaler:
+    """
+    Scale the transformer Deployment of each active request on the number of
+    files it has left and the rate its transformers are completing them. CPU
+    utilisation says little about I/O bound transformers, which sit idle
+    waiting on reads while thousands of files are queued.
+
+    Every interval the scaler aims for enough transformers to get through the
+    request's remaining files within drain_seconds at the observed rate per
+    ready transformer, stepping at most max_step replicas at a time between
+    min_replicas and max_replicas. Files are counted from the request rather
+    than the queue, since one message can carry a batch of files. It doesn't
+    grow the Deployment further while some of its pods are not ready yet.
+
+    Once the queue is empty the Deployment shrinks to the files still being
+    transformed, down to zero when the request has none left. It grows again
+    if more files are queued. Requests still looking up their files keep
+    min_replicas ready for the files that are yet to be queued.
+
+    Every App worker creates a scaler, but only the one holding the scaler
+    lease scales the transformers.
+    """
+    ACTIVE = [TransformStatus.lookup, TransformStatus.running]
+    LEASE = 'transformer-scaler'
+
+    def __init__(self, app: Flask, celery_app: Celery, transformer_manager: TransformerManager,
+                 min_replicas: int = 1, max_replicas: int = 20, max_step: int = 4,
+                 drain_seconds: float = 300, rate_window: float = 120, interval: float = 15,
+                 holder: Optional[str] = None):
+        self.app = app
+        self.celery_app = celery_app
+        self.transformer_manager = transformer_manager
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.max_step = max_step
+        self.drain_seconds = drain_seconds
+        self.rate_window = rate_window
+        self.interval = interval
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+
+        # Recent (time, files done) observations of each active request
+        self._progress: dict[str, deque] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='transformer-scaler',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    if self.lead():
+                        self.scale_all()
+                except Exception:
+                    self.app.logger.exception("Transformer scaler pass failed")
+
+    def lead(self) -> bool:
+        """
+        Take or renew the scaler lease. It outlasts a few missed passes so
+        that it only moves to another worker if this one stops.
+        :return: True if this scaler should scale the transformers
+        """
+        if Lease.acquire(self.LEASE, self.holder, timedelta(seconds=3 * self.interval)):
+            return True
+
+        # Another worker is scaling, so our observations will be stale by
+        # the time the lease comes back to us
+        self._progress.clear()
+        return False
+
+    def scale_all(self, now: Optional[float] = None):
+        now = now if now is not None else time.monotonic()
+        requests = TransformRequest.query.filter(TransformRequest.status.in_(self.ACTIVE)).all()
+        for request in requests:
+            try:
+                self.scale(request, now)
+            except Exception:
+                self.app.logger.exception("Failed to scale transformers",
+                                          extra={'requestId': request.request_id})
+
+        active = {request.request_id for request in requests}
+        for request_id in list(self._progress):
+            if request_id not in active:
+                del self._progress[request_id]
+
+    def scale(self, request: TransformRequest, now: float) -> Optional[int]:
+        """
+        Patch the request's Deployment to the desired number of replicas
+        :return: The new replica count, or None if it was left alone
+        """
+        namespace = self.app.config['TRANSFORMER_NAMESPACE']
+        rate = self.completion_rate(request.request_id,
+                                    request.files_completed + request.files_failed, now)
+
+        queued = self.queue_depth(request.request_id)
+        counts = self.transformer_manager.get_transformer_replica_counts(request.request_id,
+                                                                         namespace)
+        if queued is None or counts is None:
+            return None
+
+        current, ready = counts
+        desired = self.desired_replicas(current, queued, request.files_remaining, rate,
+                                        looking_up=request.status == TransformStatus.lookup,
+                                        ready=ready)
+        if desired == current:
+            return None
+
+        self.app.logger.info("Scaling transformers", extra={
+            'requestId': request.request_id, 'queued': queued, 'rate': rate,
+            'files_remaining': request.files_remaining, 'replicas': current,
+            'ready': ready, 'desired': desired})
+        self.transformer_manager.scale_transformer_job(request.request_id, namespace, desired)
+        return desired
+
+    def completion_rate(self, request_id: str, files_done: int, now: float) -> float:
+        """
+        Files per second completed by the request's transformers over the
+        rate window
+        """
+        progress = self._progress.setdefault(request_id, deque())
+        progress.append((now, files_done))
+        while len(progress) > 2 and now - progress[0][0] > self.rate_window:
+            progress.popleft()
+
+        then, files_done_then = progress[0]
+        if now <= then:
+            return 0.0
+        return (files_done - files_done_then) / (now - then)
+
+    def desired_replicas(self, current: int, queued: int, files_remaining: Optional[int],
+                         rate: float, looking_up: bool = False,
+                         ready: Optional[int] = None) -> int:
+        """
+        :param current: Replicas of the Deployment
+        :param queued: Messages waiting in the request's queue, each one file or
+            a batch of files
+        :param files_remaining: Files of the request not transformed yet
+        :param rate: Files per second completed by the request's transformers
+        :param looking_up: Whether the lookup is still finding files
+        :param ready: Replicas that are ready, all of them if not given
+        """
+        ready = current if ready is None else ready
+        if queued == 0:
+            # Drained, so only keep the transformers that are still busy, and
+            # while the lookup is still finding files, enough to start on the
+            # next ones as soon as they are queued
+            if files_remaining is None:
+                return current
+            floor = self.min_replicas if looking_up else 0
+            return max(floor, min(current, files_remaining))
+
+        # A message may carry a batch of files, so go by the files the request has left
+        waiting = files_remaining if files_remaining is not None else queued
+        if rate > 0 and ready > 0:
+            rate_per_replica = rate / ready
+            desired = math.ceil(waiting / (rate_per_replica * self.drain_seconds))
+        else:
+            # Nothing completed yet to judge the throughput by
+            desired = current + self.max_step
+
+        # No point in more transformers than files left to transform
+        if files_remaining is not None:
+            desired = min(desired, files_remaining)
+
+        desired = max(self.min_replicas, min(self.max_replicas, desired))
+        if desired > current and ready < current:
+            # Wait for the pods that are still starting before adding more
+            return current
+        return max(current - self.max_step, min(current + self.max_step, desired))
+
+    def queue_depth(self, request_id: str) -> Optional[int]:
+        """
+        Number of messages waiting in the request's queue, not counting the ones
+        transformers are working on. None if the queue doesn't exist yet.
+        """
+        try:
+            with self.celery_app.connection_for_read() as connection:
+                _, messages, _ = connection.default_channel.queue_declare(
+                    queue=f"transformer-{request_id}", passive=True)
+                return messages
+        except Exception:
+            return None
@@ -75,6 +75,8 @@ class ResourceTestBase:
             'MINIO_ACCESS_KEY': 'miniouser',
             'MINIO_SECRET_KEY': 'leftfoot1',
             'ENABLE_AUTH': False,
+            'FILE_DISPATCH_WORKERS': 0,
+            'FILE_DISPATCH_RECOVERY_INTERVAL': 0,
             'JWT_ADMIN': 'admin@example.com',
             'JWT_PASS': 'pass',
             'JWT_SECRET_KEY': 'schtum',
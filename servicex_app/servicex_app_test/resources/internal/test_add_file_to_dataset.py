@@ -95,7 +95,12 @@ class TestAddFileToDataset(ResourceTestBase):
             dataset_file_list = mock_add_files.call_args[0][0]
             running_transform_list = mock_add_files.call_args[0][1]
             assert len(dataset_file_list) == 1
-            assert dataset_file_list[0].paths == "/foo/bar1.root,/foo/bar2.root"
+            assert dataset_file_list[0] == {
+                'paths': "/foo/bar1.root,/foo/bar2.root",
+                'adler32': '12345',
+                'file_size': 1024,
+                'file_events': 500
+            }
             assert len(running_transform_list) == 2
 
     def test_put_new_file_bulk(self, mocker, mock_transformer_lookup, mock_dataset_manager_from_id):
@@ -125,8 +130,8 @@ class TestAddFileToDataset(ResourceTestBase):
         dataset_file_list = mock_add_files.call_args[0][0]
         running_transform_list = mock_add_files.call_args[0][1]
         assert len(dataset_file_list) == 2
-        assert dataset_file_list[0].paths == "/foo/bar1.root,/foo/bar2.root"
-        assert dataset_file_list[1].paths == "/foo1/bar1.root,/foo1/bar2.root"
+        assert dataset_file_list[0]['paths'] == "/foo/bar1.root,/foo/bar2.root"
+        assert dataset_file_list[1]['paths'] == "/foo1/bar1.root,/foo1/bar2.root"
         assert len(running_transform_list) == 2
         assert running_transform_list[0].request_id == "first_request"
         assert running_transform_list[1].request_id == "second_request"
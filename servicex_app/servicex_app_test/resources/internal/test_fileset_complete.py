@@ -86,7 +86,8 @@ class TestFilesetComplete(ResourceTestBase):
 
         mock_lookup_pending.assert_called_once_with(1234)
         mock_lookup_running.assert_called_once_with(1234)
-        mock_publish_files.assert_called_once_with(pending_request, mock_processor)
+        mock_publish_files.assert_called_once_with(pending_request, mock_processor,
+                                                   commit_progress=True, resume=False)
         assert pending_request.status == TransformStatus.running
         assert lookup_request.status == TransformStatus.running
 
@@ -25,12 +25,14 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime, timezone
 from unittest.mock import patch, PropertyMock
 
 import psycopg2
 import pytest
 
-from servicex_app.models import DatasetFile, TransformationResult, TransformRequest
+from servicex_app.models import DatasetFile, TransformationResult, TransformRequest, \
+    RequestCounts, TransformStatus
 from servicex_app.transformer_manager import TransformerManager
 from servicex_app_test.resource_test_base import ResourceTestBase
 
@@ -55,7 +57,7 @@ class TestTransformFileComplete(ResourceTestBase):
 
     @pytest.fixture
     def mock_files_remaining(self, mocker):
-        with patch('servicex_app.models.TransformRequest.files_remaining',
+        with patch('servicex_app.models.RequestCounts.files_remaining',
                    new_callable=PropertyMock) as mock_remaining:
             mock_remaining.return_value = 1
             yield mock_remaining
@@ -64,13 +66,8 @@ class TestTransformFileComplete(ResourceTestBase):
     def mock_file_transformed_successfully(self, mocker):
         return mocker.patch.object(
             TransformRequest,
-            "file_transformed_successfully")
-
-    @pytest.fixture
-    def mock_file_transformed_unsuccessfully(self, mocker):
-        return mocker.patch.object(
-            TransformRequest,
-            "file_transformed_unsuccessfully")
+            "files_transformed",
+            return_value=RequestCounts(files=1, files_completed=1, files_failed=0))
 
     @pytest.fixture
     def test_client(self, mock_transformer_manager):
@@ -102,7 +99,7 @@ class TestTransformFileComplete(ResourceTestBase):
         assert response.status_code == 200
         assert fake_transform_request.finish_time is None
         mock_transform_request_lookup.assert_called_with('1234')
-        mock_file_transformed_successfully.assert_called_with("1234")
+        mock_file_transformed_successfully.assert_called_with("BR549", 1, 0)
         mock_files_remaining.assert_called()
         mock_transformer_manager.shutdown_transformer_job.assert_not_called()
 
@@ -121,7 +118,7 @@ class TestTransformFileComplete(ResourceTestBase):
         assert response.status_code == 200
         assert fake_transform_request.finish_time is None
         mock_transform_request_lookup.assert_called_with('1234')
-        mock_file_transformed_successfully.assert_called_with("1234")
+        mock_file_transformed_successfully.assert_called_with("BR549", 1, 0)
         mock_files_remaining.assert_called()
 
         mock_transformer_manager.shutdown_transformer_job.assert_not_called()
@@ -138,7 +135,7 @@ class TestTransformFileComplete(ResourceTestBase):
         mock_files_remaining.return_value = 0
 
         mocker.patch.object(DatasetFile, "get_by_id")
-        mocker.patch.object(TransformationResult, "save_to_db")
+        mocker.patch.object(TransformationResult, "bulk_insert")
         mocker.patch.object(TransformRequest, "save_to_db")
 
         response = test_client.put('/servicex/internal/transformation/BR549/file-complete',
@@ -147,7 +144,7 @@ class TestTransformFileComplete(ResourceTestBase):
         assert response.status_code == 200
         assert fake_transform_request.finish_time is not None
         mock_transform_request_lookup.assert_called_with('BR549')
-        mock_file_transformed_successfully.assert_called_with("BR549")
+        mock_file_transformed_successfully.assert_called_with("BR549", 1, 0)
         mock_files_remaining.assert_called()
         mock_transformer_manager.shutdown_transformer_job.assert_called_with('BR549',
                                                                              'my-ws')
@@ -202,7 +199,7 @@ class TestTransformFileComplete(ResourceTestBase):
 
         mock_file_transformed_successfully.side_effect = [
                                     psycopg2.OperationalError('server closed the connection unexpectedly'),
-                                    None]
+                                    RequestCounts(files=1, files_completed=1, files_failed=0)]
 
         response = test_client.put('/servicex/internal/transformation/1234/file-complete',
                                    json=file_complete_response)
@@ -225,7 +222,7 @@ class TestTransformFileComplete(ResourceTestBase):
                                                   file_complete_response,
                                                   test_client):
 
-        mock_save_db = mocker.patch.object(TransformationResult, "save_to_db",
+        mock_save_db = mocker.patch.object(TransformationResult, "bulk_insert",
                                            side_effect=[
                                                psycopg2.OperationalError('server closed the connection unexpectedly'),
                                                None
@@ -255,3 +252,33 @@ class TestTransformFileComplete(ResourceTestBase):
                                    json=file_complete_response)
         assert response.status_code == 200
         assert fake_transform_request.save_to_db.call_count == 2
+
+    @staticmethod
+    def _save_request(files: int) -> None:
+        TransformRequest(
+            request_id='BR549',
+            did='123-456-789',
+            did_id=1234,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=TransformStatus.running,
+            files=files
+        ).save_to_db()
+
+    def test_put_duplicate_report(self, mock_transformer_manager, file_complete_response,
+                                  test_client):
+        with test_client.application.app_context():
+            self._save_request(files=2)
+            for _ in range(2):
+                response = test_client.put(
+                    '/servicex/internal/transformation/BR549/file-complete',
+                    json=file_complete_response)
+                assert response.status_code == 200
+
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_completed == 1
+            assert len(transform_req.results) == 1
+            assert transform_req.statistics['total-events'] == 10000
+            assert transform_req.status == TransformStatus.running
+            mock_transformer_manager.shutdown_transformer_job.assert_not_called()
@@ -0,0 +1,197 @@
+# Copyright (c) 2019, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+from datetime import datetime, timezone
+
+import psycopg2
+import pytest
+
+from servicex_app.models import TransformationResult, TransformRequest, TransformStatus, db
+from servicex_app.transformer_manager import TransformerManager
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestTransformFileCompleteBatch(ResourceTestBase):
+
+    @pytest.fixture
+    def mock_transformer_manager(self, mocker):
+        manager = mocker.MagicMock(TransformerManager)
+        manager.shutdown_transformer_job = mocker.Mock()
+        return manager
+
+    @pytest.fixture
+    def test_client(self, mock_transformer_manager):
+        return self._test_client(transformation_manager=mock_transformer_manager)
+
+    @staticmethod
+    def _save_request(files: int) -> None:
+        TransformRequest(
+            request_id='BR549',
+            did='123-456-789',
+            did_id=1234,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=TransformStatus.running,
+            files=files
+        ).save_to_db()
+
+    @staticmethod
+    def _file_complete_record(file_id: int, status: str = 'success') -> dict:
+        return {
+            'file-path': f'/foo/bar{file_id}.root',
+            'file-id': file_id,
+            'status': status,
+            'total-time': 100,
+            'total-events': 10000,
+            'total-bytes': 325683,
+            'avg-rate': 30.2
+        }
+
+    def test_put_batch(self, test_client, mock_transformer_manager):
+        with test_client.application.app_context():
+            self._save_request(files=3)
+            response = test_client.put(
+                '/servicex/internal/transformation/BR549/file-complete-batch',
+                json=[self._file_complete_record(1),
+                      self._file_complete_record(2, status='failure')])
+            assert response.status_code == 200
+
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_completed == 1
+            assert transform_req.files_failed == 1
+            assert transform_req.status == TransformStatus.running
+
+            results = transform_req.results
+            assert len(results) == 2
+            assert {r.file_id for r in results} == {1, 2}
+            assert {r.transform_status for r in results} == {'success', 'failure'}
+
+            stats = transform_req.statistics
+            assert stats['total-time'] == 200
+            assert stats['total-bytes'] == 2 * 325683
+            assert stats['total-events'] == 20000
+            mock_transformer_manager.shutdown_transformer_job.assert_not_called()
+
+    def test_put_batch_completes_request(self, test_client, mock_transformer_manager):
+        with test_client.application.app_context():
+            self._save_request(files=2)
+            response = test_client.put(
+                '/servicex/internal/transformation/BR549/file-complete-batch',
+                json=[self._file_complete_record(1), self._file_complete_record(2)])
+            assert response.status_code == 200
+
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_remaining == 0
+            assert transform_req.status == TransformStatus.complete
+            assert transform_req.finish_time is not None
+            mock_transformer_manager.shutdown_transformer_job.assert_called_with('BR549',
+                                                                                 'my-ws')
+
+    def test_put_batch_twice(self, test_client, mock_transformer_manager):
+        with test_client.application.app_context():
+            self._save_request(files=3)
+            batch = [self._file_complete_record(1), self._file_complete_record(2)]
+            for _ in range(2):
+                response = test_client.put(
+                    '/servicex/internal/transformation/BR549/file-complete-batch',
+                    json=batch)
+                assert response.status_code == 200
+
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_completed == 2
+            assert len(transform_req.results) == 2
+            assert transform_req.statistics['total-events'] == 20000
+            assert transform_req.status == TransformStatus.running
+            mock_transformer_manager.shutdown_transformer_job.assert_not_called()
+
+    def test_put_overlapping_batch_completes_request(self, test_client,
+                                                     mock_transformer_manager):
+        with test_client.application.app_context():
+            self._save_request(files=3)
+            test_client.put('/servicex/internal/transformation/BR549/file-complete-batch',
+                            json=[self._file_complete_record(1),
+                                  self._file_complete_record(2)])
+
+            # A replay of file 2 along with the last file
+            response = test_client.put(
+                '/servicex/internal/transformation/BR549/file-complete-batch',
+                json=[self._file_complete_record(2),
+                      self._file_complete_record(3),
+                      self._file_complete_record(3)])
+            assert response.status_code == 200
+
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_completed == 3
+            assert transform_req.files_remaining == 0
+            assert transform_req.status == TransformStatus.complete
+            mock_transformer_manager.shutdown_transformer_job.assert_called_once_with('BR549',
+                                                                                      'my-ws')
+
+    def test_put_single_record(self, test_client):
+        with test_client.application.app_context():
+            self._save_request(files=3)
+            response = test_client.put(
+                '/servicex/internal/transformation/BR549/file-complete-batch',
+                json=self._file_complete_record(1))
+            assert response.status_code == 200
+            assert TransformRequest.lookup('BR549').files_completed == 1
+
+    def test_put_batch_unknown_request_id(self, test_client, mock_transformer_manager):
+        with test_client.application.app_context():
+            response = test_client.put(
+                '/servicex/internal/transformation/BR549/file-complete-batch',
+                json=[self._file_complete_record(1)])
+            assert response.status_code == 404
+            mock_transformer_manager.shutdown_transformer_job.assert_not_called()
+
+    def test_database_error_is_rolled_back(self, mocker, test_client):
+        with test_client.application.app_context():
+            self._save_request(files=3)
+
+            bulk_insert = TransformationResult.bulk_insert
+            calls = []
+
+            def flaky_bulk_insert(records):
+                calls.append(records)
+                if len(calls) == 1:
+                    raise psycopg2.OperationalError('server closed the connection unexpectedly')
+                bulk_insert(records)
+
+            mocker.patch.object(TransformationResult, 'bulk_insert',
+                                side_effect=flaky_bulk_insert)
+
+            response = test_client.put(
+                '/servicex/internal/transformation/BR549/file-complete-batch',
+                json=[self._file_complete_record(1), self._file_complete_record(2)])
+            assert response.status_code == 200
+            assert len(calls) == 2
+
+            # The failed attempt must not have been counted
+            db.session.expire_all()
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_completed == 2
+            assert len(transform_req.results) == 2
@@ -25,48 +25,107 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime
+
 from flask import Response
-from pytest import fixture
+
+from servicex_app.models import TransformRequest, TransformStatus, db
 from servicex_app_test.resource_test_base import ResourceTestBase
 
 
 class TestAllTransformationRequest(ResourceTestBase):
     @staticmethod
-    def example_json():
-        return [{'request_id': '123'}, {'request_id': '456'}]
-
-    @fixture()
-    def mock_return_json(self, mocker):
-        import servicex_app
-        mock_return_json = mocker.patch.object(
-            servicex_app.models.TransformRequest, 'return_json',
-            return_value=self.example_json())
-        return mock_return_json
-
-    def test_get_all_auth_disabled(self, client, mock_return_json):
-        response: Response = client.get('/servicex/transformation')
-        assert response.status_code == 200
-        assert response.json == self.example_json()
-        mock_return_json.assert_called()
-
-    def test_get_all_auth_enabled(
-        self, mock_jwt_extended, mock_return_json, mock_requesting_user
-    ):
+    def _save_requests():
+        for i, status in enumerate([TransformStatus.complete, TransformStatus.running,
+                                    TransformStatus.fatal, TransformStatus.running]):
+            db.session.add(TransformRequest(
+                request_id=f'req-{i}',
+                title=f'Analysis {i % 2}',
+                did=f'rucio://dataset-{i % 2}',
+                did_id=i,
+                selection='(cool (is LISP))',
+                submit_time=datetime(2024, 1, i + 1, 12, 0, 0),
+                result_destination='object-store',
+                result_format='arrow',
+                status=status,
+                submitted_by=6 if i < 2 else 7,
+                files=10
+            ))
+        db.session.commit()
+
+    def test_get_all_auth_disabled(self, client):
+        with client.application.app_context():
+            self._save_requests()
+            expected = [r.to_json() for r in TransformRequest.query.order_by(TransformRequest.id)]
+            response: Response = client.get('/servicex/transformation')
+            assert response.status_code == 200
+            assert response.json == {'requests': expected, 'next-after': None}
+
+    def test_get_all_auth_enabled(self, mock_jwt_extended, mock_requesting_user):
         client = self._test_client(extra_config={'ENABLE_AUTH': True})
         with client.application.app_context():
+            self._save_requests()
             response = client.get('/servicex/transformation', headers=self.fake_header())
-        assert response.status_code == 200
-        assert response.json == self.example_json()
-        mock_return_json.assert_called()
+            assert response.status_code == 200
+            assert len(response.json['requests']) == 4
 
-    def test_get_by_user(
-        self, mock_jwt_extended, mock_requesting_user, mock_return_json
-    ):
+    def test_get_by_user(self, mock_jwt_extended, mock_requesting_user):
         user_id = mock_requesting_user.id
         client = self._test_client(extra_config={'ENABLE_AUTH': True})
         with client.application.app_context():
+            self._save_requests()
             response = client.get(
                 f'/servicex/transformation?submitted_by={user_id}', headers=self.fake_header())
-        assert response.status_code == 200
-        assert response.json == self.example_json()
-        mock_return_json.assert_called()
+            assert response.status_code == 200
+            assert [r['request_id'] for r in response.json['requests']] == ['req-0', 'req-1']
+
+    def test_filters(self, client):
+        with client.application.app_context():
+            self._save_requests()
+
+            def request_ids(query):
+                response = client.get(f'/servicex/transformation?{query}')
+                assert response.status_code == 200
+                return [r['request_id'] for r in response.json['requests']]
+
+            assert request_ids('status=running') == ['req-1', 'req-3']
+            assert request_ids('status=Complete,fatal') == ['req-0', 'req-2']
+            assert request_ids('submitted_after=2024-01-02T00:00:00Z'
+                               '&submitted_before=2024-01-04') == ['req-1', 'req-2']
+            assert request_ids('did=rucio://dataset-0') == ['req-0', 'req-2']
+            assert request_ids('title=analysis 1') == ['req-1', 'req-3']
+            assert request_ids('status=running&did=rucio://dataset-1') == ['req-1', 'req-3']
+
+    def test_unknown_status(self, client):
+        response = client.get('/servicex/transformation?status=bogus')
+        assert response.status_code == 400
+
+    def test_field_projection(self, client):
+        with client.application.app_context():
+            self._save_requests()
+            response = client.get('/servicex/transformation?fields=request_id,files-remaining'
+                                  '&status=complete')
+            assert response.json['requests'] == [{'request_id': 'req-0', 'files-remaining': 10}]
+
+    def test_unknown_field(self, client):
+        response = client.get('/servicex/transformation?fields=request_id,bogus')
+        assert response.status_code == 400
+        assert 'bogus' in response.json['message']
+
+    def test_keyset_pagination(self, client):
+        with client.application.app_context():
+            self._save_requests()
+            response = client.get('/servicex/transformation?fields=request_id&limit=3')
+            assert [r['request_id'] for r in response.json['requests']] == \
+                ['req-0', 'req-1', 'req-2']
+            next_after = response.json['next-after']
+            assert next_after is not None
+
+            response = client.get(
+                f'/servicex/transformation?fields=request_id&limit=3&after={next_after}')
+            assert [r['request_id'] for r in response.json['requests']] == ['req-3']
+            assert response.json['next-after'] is None
+
+    def test_invalid_limit(self, client):
+        response = client.get('/servicex/transformation?limit=0')
+        assert response.status_code == 400
@@ -0,0 +1,136 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
+from datetime import datetime, timezone
+
+from servicex_app.models import TransformRequest, TransformationResult, TransformStatus, db
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestTransformationResults(ResourceTestBase):
+    @staticmethod
+    def _save_request_with_results(num_results: int) -> None:
+        TransformRequest(
+            request_id='BR549',
+            did='123-456-789',
+            did_id=1234,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=TransformStatus.running,
+            files=num_results
+        ).save_to_db()
+        TransformationResult.bulk_insert([
+            {
+                'did': '123-456-789',
+                'file_id': i,
+                'request_id': 'BR549',
+                'file_path': f'/foo/bar{i}.root',
+                'transform_status': 'success' if i % 3 else 'failure',
+                'transform_time': 10,
+                'total_events': 100,
+                'total_bytes': 1000,
+                'avg_rate': 10.0
+            } for i in range(num_results)
+        ])
+        db.session.commit()
+
+    @staticmethod
+    def _records(response) -> list[dict]:
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_get_all_fields(self, client):
+        with client.application.app_context():
+            self._save_request_with_results(3)
+            response = client.get('/servicex/transformation/BR549/results')
+            assert response.status_code == 200
+            assert response.mimetype == 'application/x-ndjson'
+            records = self._records(response)
+            assert len(records) == 3
+            assert records[0] == {
+                'id': 1,
+                'request-id': 'BR549',
+                'did': '123-456-789',
+                'file-id': 0,
+                'file-path': '/foo/bar0.root',
+                'transform_status': 'failure',
+                'transform_time': 10,
+                'total-events': 100,
+                'total-bytes': 1000,
+                'avg-rate': 10.0,
+                'output-object': None
+            }
+
+    def test_keyset_pagination(self, client):
+        with client.application.app_context():
+            self._save_request_with_results(25)
+            ids = []
+            after = 0
+            while True:
+                response = client.get(
+                    f'/servicex/transformation/BR549/results?after={after}&limit=10')
+                page = self._records(response)
+                ids += [r['id'] for r in page]
+                if len(page) < 10:
+                    break
+                after = page[-1]['id']
+            assert ids == list(range(1, 26))
+
+    def test_field_projection(self, client):
+        with client.application.app_context():
+            self._save_request_with_results(2)
+            response = client.get(
+                '/servicex/transformation/BR549/results?fields=file-path,transform_status')
+            assert self._records(response) == [
+                {'id': 1, 'file-path': '/foo/bar0.root', 'transform_status': 'failure'},
+                {'id': 2, 'file-path': '/foo/bar1.root', 'transform_status': 'success'}
+            ]
+
+    def test_status_filter(self, client):
+        with client.application.app_context():
+            self._save_request_with_results(9)
+            response = client.get(
+                '/servicex/transformation/BR549/results?status=failure&fields=file-id')
+            assert [r['file-id'] for r in self._records(response)] == [0, 3, 6]
+
+    def test_unknown_field(self, client):
+        with client.application.app_context():
+            self._save_request_with_results(1)
+            response = client.get('/servicex/transformation/BR549/results?fields=foo')
+            assert response.status_code == 400
+            assert 'foo' in response.json['message']
+
+    def test_invalid_limit(self, client):
+        with client.application.app_context():
+            self._save_request_with_results(1)
+            response = client.get('/servicex/transformation/BR549/results?limit=0')
+            assert response.status_code == 400
+
+    def test_not_found(self, client):
+        response = client.get('/servicex/transformation/BR549/results')
+        assert response.status_code == 404
@@ -0,0 +1,135 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import time
+from datetime import datetime, timezone
+
+from pytest import fixture
+
+from servicex_app.models import TransformRequest, TransformStatus
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestTransformStatusStream(ResourceTestBase):
+    @fixture
+    def client(self):
+        return self._test_client(extra_config={'STATUS_STREAM_MAX_WAITERS': 4})
+
+    @staticmethod
+    def _save_request(status=TransformStatus.running) -> None:
+        TransformRequest(
+            request_id='BR549',
+            did='123-456-789',
+            did_id=1234,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=status,
+            files=2
+        ).save_to_db()
+
+    def test_get_without_cursor(self, client):
+        with client.application.app_context():
+            self._save_request()
+            response = client.get('/servicex/transformation/BR549/status/stream')
+            assert response.status_code == 200
+            assert response.json['status'] == 'Running'
+            assert response.json['files-remaining'] == 2
+            assert response.json['cursor'] == 'running:2:0:0'
+
+    def test_get_times_out_without_change(self, client):
+        with client.application.app_context():
+            self._save_request()
+            start = time.monotonic()
+            response = client.get('/servicex/transformation/BR549/status/stream'
+                                  '?since=running:2:0:0&timeout=0.2')
+            assert response.status_code == 200
+            assert response.json['cursor'] == 'running:2:0:0'
+            assert time.monotonic() - start >= 0.2
+
+    def test_get_changed_since_cursor(self, client):
+        with client.application.app_context():
+            self._save_request()
+            TransformRequest.file_transformed_successfully('BR549')
+            response = client.get('/servicex/transformation/BR549/status/stream'
+                                  '?since=running:2:0:0&timeout=10')
+            assert response.status_code == 200
+            assert response.json['files-completed'] == 1
+            assert response.json['cursor'] == 'running:2:1:0'
+
+    def test_get_files_added_since_cursor(self, client):
+        with client.application.app_context():
+            self._save_request()
+            TransformRequest.add_a_file('BR549')
+            response = client.get('/servicex/transformation/BR549/status/stream'
+                                  '?since=running:2:0:0&timeout=10')
+            assert response.status_code == 200
+            assert response.json['cursor'] == 'running:3:0:0'
+
+    def test_get_too_many_waiters(self, client):
+        with client.application.app_context():
+            self._save_request()
+            client.application.config['STATUS_STREAM_MAX_WAITERS'] = 0
+            start = time.monotonic()
+            response = client.get('/servicex/transformation/BR549/status/stream'
+                                  '?since=running:2:0:0&timeout=10')
+            assert response.status_code == 200
+            assert response.json['cursor'] == 'running:2:0:0'
+            assert response.headers['Retry-After'] == '2'
+            assert time.monotonic() - start < 10
+
+    def test_get_complete_returns_immediately(self, client):
+        with client.application.app_context():
+            self._save_request(status=TransformStatus.complete)
+            response = client.get('/servicex/transformation/BR549/status/stream'
+                                  '?since=complete:2:0:0&timeout=10')
+            assert response.status_code == 200
+            assert response.json['status'] == 'Complete'
+
+    def test_get_status_404(self, client):
+        response = client.get('/servicex/transformation/BR549/status/stream')
+        assert response.status_code == 404
+
+    def test_file_complete_notifies(self, client):
+        with client.application.app_context():
+            from servicex_app.resources.internal.transformer_file_complete import \
+                TransformerFileComplete
+            self._save_request()
+            notifier = TransformerFileComplete.status_notifier
+            version = notifier.version('BR549')
+            response = client.put('/servicex/internal/transformation/BR549/file-complete',
+                                  json={
+                                      'file-path': '/foo/bar.root',
+                                      'file-id': 1,
+                                      'status': 'success',
+                                      'total-time': 10,
+                                      'total-events': 100,
+                                      'total-bytes': 1000,
+                                      'avg-rate': 10.0
+                                  })
+            assert response.status_code == 200
+            assert notifier.version('BR549') == version + 1
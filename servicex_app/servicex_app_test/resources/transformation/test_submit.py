@@ -25,6 +25,7 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import threading
 from datetime import datetime, timezone
 from unittest.mock import ANY
 
@@ -36,6 +37,9 @@ from servicex_app.code_gen_adapter import CodeGenAdapter
 from servicex_app.dataset_manager import DatasetManager
 from servicex_app.models import Dataset
 from servicex_app.models import TransformRequest, DatasetStatus, TransformStatus
+from servicex_app.object_store_manager import ObjectStoreManager
+from servicex_app.resources.transformation.submit import SubmitTransformationRequest
+from servicex_app.result_cache import ResultCache
 from servicex_app.transformer_manager import TransformerManager
 from servicex_app_test.resource_test_base import ResourceTestBase
 
@@ -130,6 +134,32 @@ class TestSubmitTransformationRequest(ResourceTestBase):
         response = client.post('/servicex/transformation', json=request)
         assert response.status_code == 400
 
+    def test_submit_transformation_bad_dispatch_order(self, client):
+        request = self._generate_transformation_request()
+        request['dispatch-order'] = 'foo'
+        response = client.post('/servicex/transformation', json=request)
+        assert response.status_code == 400
+
+    def test_submit_transformation_dispatch_order(self, mock_rabbit_adaptor,
+                                                  mock_dataset_manager_from_did,
+                                                  mock_codegen,
+                                                  mock_app_version,
+                                                  mock_celery_app):
+        client = self._test_client(rabbit_adaptor=mock_rabbit_adaptor,
+                                   code_gen_service=mock_codegen,
+                                   celery_app=mock_celery_app)
+
+        with client.application.app_context():
+            request = self._generate_transformation_request()
+            request['dispatch-order'] = 'largest-first'
+
+            response = client.post('/servicex/transformation',
+                                   json=request,
+                                   headers=self.fake_header())
+            assert response.status_code == 200
+            saved_obj = TransformRequest.lookup(response.json['request_id'])
+            assert saved_obj.dispatch_order == 'largest-first'
+
     def test_submit_transformation_bad_did_scheme(self, client):
         request = self._generate_transformation_request(did='foobar://my-did')
         response = client.post('/servicex/transformation', json=request)
@@ -234,6 +264,7 @@ class TestSubmitTransformationRequest(ResourceTestBase):
             mock_dataset_manager_from_did.return_value.is_lookup_required = False
             mock_dataset_manager_from_did.return_value.is_complete = True
             mock_dataset_manager_from_did.return_value.dataset.id = 256
+            mock_dataset_manager_from_did.return_value.file_count = 3
 
             response = client.post('/servicex/transformation',
                                    json=request,
@@ -252,8 +283,9 @@ class TestSubmitTransformationRequest(ResourceTestBase):
                                                              logger=ANY)
             assert mock_dataset_manager_from_did.call_args[0][0].full_did == 'rucio://123-45-678'
             mock_dataset_manager_from_did.return_value.submit_lookup_request.assert_not_called()
+            assert saved_obj.files == 3
             mock_dataset_manager_from_did.return_value.publish_files.assert_called_with(
-                ANY, mock_processor)
+                ANY, mock_processor, commit_progress=True, resume=False)
 
     def test_submit_transformation_incomplete_existing_dataset(self, mocker,
                                                                mock_rabbit_adaptor,
@@ -343,13 +375,14 @@ class TestSubmitTransformationRequest(ResourceTestBase):
             request['file-list'] = file_list
 
             mock_dataset_manager_from_files.return_value.is_lookup_required = False
+            mock_dataset_manager_from_files.return_value.file_count = 2
 
             response = client.post('/servicex/transformation',
                                    json=request, headers=self.fake_header())
             assert response.status_code == 200
             mock_dataset_manager_from_files.return_value.submit_lookup_request.assert_not_called()
             mock_dataset_manager_from_files.return_value.publish_files.assert_called_with(
-                ANY, mock_processor)
+                ANY, mock_processor, commit_progress=True, resume=False)
 
             request_id = response.json['request_id']
             submitted_request = TransformRequest.lookup(request_id)
@@ -362,6 +395,106 @@ class TestSubmitTransformationRequest(ResourceTestBase):
                 start_transformers \
                 .assert_called_with(ANY, submitted_request)
 
+    def test_submit_transformation_reuses_identical_request(self, mocker,
+                                                            mock_dataset_manager_from_files,
+                                                            mock_transform_manager,
+                                                            mock_codegen,
+                                                            file_list,
+                                                            mock_app_version):
+        mock_processor = mocker.MagicMock(LookupResultProcessor)
+        mock_object_store = mocker.MagicMock(ObjectStoreManager)
+        reused = TransformRequest(request_id='earlier')
+        mock_find = mocker.patch.object(ResultCache, 'find_reusable_request', return_value=reused)
+        cfg = {
+            'TRANSFORMER_MANAGER_ENABLED': True,
+            'TRANSFORMER_X509_SECRET': 'my-x509-secret',
+            'OBJECT_STORE_ENABLED': True,
+            'RESULT_CACHE_ENABLED': True
+        }
+
+        client = self._test_client(extra_config=cfg,
+                                   lookup_result_processor=mock_processor,
+                                   transformation_manager=mock_transform_manager,
+                                   object_store=mock_object_store,
+                                   code_gen_service=mock_codegen)
+
+        def serve_all_from_cache(transform_request, processor, commit_progress, resume):
+            transform_request.status = TransformStatus.complete
+
+        with client.application.app_context():
+            request = self._generate_transformation_request()
+            request['did'] = None
+            request['file-list'] = file_list
+
+            mock_dataset_manager_from_files.return_value.is_lookup_required = False
+            mock_dataset_manager_from_files.return_value.file_count = 2
+            mock_dataset_manager_from_files.return_value.publish_files.side_effect = \
+                serve_all_from_cache
+
+            response = client.post('/servicex/transformation',
+                                   json=request, headers=self.fake_header())
+            assert response.status_code == 200
+
+            mock_find.assert_called_once()
+            mock_dataset_manager_from_files.return_value.publish_files.assert_called_once_with(
+                ANY, mock_processor, commit_progress=True, resume=False)
+            mock_transform_manager.start_transformers.assert_not_called()
+
+    def test_submit_transformation_reuse_copies_in_background(self, mocker,
+                                                              mock_dataset_manager_from_files,
+                                                              mock_transform_manager,
+                                                              mock_codegen,
+                                                              file_list,
+                                                              mock_app_version):
+        mock_object_store = mocker.MagicMock(ObjectStoreManager)
+        mocker.patch.object(ResultCache, 'find_reusable_request',
+                            return_value=TransformRequest(request_id='earlier'))
+        mocker.patch('servicex_app.file_dispatcher.Dataset')
+        mock_dispatch_dm = mocker.patch('servicex_app.file_dispatcher.DatasetManager')
+        cfg = {
+            'TRANSFORMER_MANAGER_ENABLED': True,
+            'TRANSFORMER_X509_SECRET': 'my-x509-secret',
+            'OBJECT_STORE_ENABLED': True,
+            'RESULT_CACHE_ENABLED': True,
+            'FILE_DISPATCH_WORKERS': 1
+        }
+
+        client = self._test_client(extra_config=cfg,
+                                   transformation_manager=mock_transform_manager,
+                                   object_store=mock_object_store,
+                                   code_gen_service=mock_codegen)
+
+        copying = threading.Event()
+        release = threading.Event()
+
+        def copy_cached_outputs(transform_request, processor, commit_progress, resume):
+            copying.set()
+            release.wait(timeout=30)
+            transform_request.status = TransformStatus.complete
+
+        mock_dispatch_dm.return_value.publish_files.side_effect = copy_cached_outputs
+
+        with client.application.app_context():
+            request = self._generate_transformation_request()
+            request['did'] = None
+            request['file-list'] = file_list
+
+            mock_dataset_manager_from_files.return_value.is_lookup_required = False
+            mock_dataset_manager_from_files.return_value.file_count = 2
+
+            response = client.post('/servicex/transformation',
+                                   json=request, headers=self.fake_header())
+
+            # The outputs are still being copied when submit returns
+            assert response.status_code == 200
+            assert copying.wait(timeout=30)
+            assert not release.is_set()
+            mock_dataset_manager_from_files.return_value.publish_files.assert_not_called()
+            release.set()
+
+            SubmitTransformationRequest.file_dispatcher.executor.shutdown(wait=True)
+            mock_transform_manager.start_transformers.assert_not_called()
+
     def test_submit_transformation_request_bad_image(
         self, mocker, mock_docker_repo_adapter,
             mock_dataset_manager_from_did, mock_codegen
@@ -45,3 +45,12 @@ def test_did_finder_route():
     assert (route_task('did_finder_rucio.lookup_dataset',
                        None, None, None) ==
             {'queue': 'did_finder_rucio'})
+
+
+def test_transformer_batch_route():
+    route = route_task('transformer_sidecar.transform_files',
+                       None,
+                       {"request_id": "2f748056-9db3-47f0-b51e-3ec46b8a284a"},
+                       None)
+
+    assert route['queue'].name == 'transformer-2f748056-9db3-47f0-b51e-3ec46b8a284a'
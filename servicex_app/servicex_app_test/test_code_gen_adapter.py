@@ -114,3 +114,26 @@ class TestCodeGenAdapter:
         with pytest.raises(ValueError) as eek:
             service.generate_code_for_selection(self._generate_test_request(), "servicex", "foo")
         assert str(eek.value) == 'foo, code generator unavailable for use'
+
+    def test_generated_code_hash(self):
+        from io import BytesIO
+        from zipfile import ZipFile
+
+        def make_zip(files):
+            buffer = BytesIO()
+            with ZipFile(buffer, 'w') as z:
+                for name, content in files:
+                    z.writestr(name, content)
+            return ZipFile(buffer)
+
+        code = make_zip([("generated_transformer.py", "a"), ("transform_single_file.py", "b")])
+        same_code = make_zip([("transform_single_file.py", "b"), ("generated_transformer.py", "a")])
+        other_code = make_zip([("generated_transformer.py", "c"), ("transform_single_file.py", "b")])
+
+        source_hash = CodeGenAdapter.source_hash(code)
+        assert source_hash == CodeGenAdapter.source_hash(same_code)
+        assert source_hash != CodeGenAdapter.source_hash(other_code)
+
+        code_hash = CodeGenAdapter.generated_code_hash(source_hash, "image:1", "python", "run")
+        assert code_hash == CodeGenAdapter.generated_code_hash(source_hash, "image:1", "python", "run")
+        assert code_hash != CodeGenAdapter.generated_code_hash(source_hash, "image:2", "python", "run")
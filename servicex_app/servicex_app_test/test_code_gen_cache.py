@@ -0,0 +1,154 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime, timedelta
+
+from servicex_app.code_gen_adapter import CodeGenAdapter
+from servicex_app.code_gen_cache import CodeGenCache, CodeGenResult
+from servicex_app.models import GeneratedCode, TransformRequest, db
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestCodeGenCache(ResourceTestBase):
+    result = CodeGenResult(configmap='generated-source-abc', source_hash='abc',
+                           transformer_image='sslhep/servicex_func_adl_uproot_transformer:1.0',
+                           transformer_language='python',
+                           transformer_command='/generated/transform_single_file.py')
+
+    def test_get_put(self, client):
+        with client.application.app_context():
+            cache = CodeGenCache()
+            key = cache.key('uproot', 'sslhep/servicex_code_gen_func_adl_uproot:1.0', '(call Select)')
+            assert cache.get(key) is None
+
+            cache.put(key, self.result)
+            assert cache.get(key) == self.result
+            assert cache.get(cache.key('uproot', 'sslhep/servicex_code_gen_func_adl_uproot:1.0',
+                                       '(call Where)')) is None
+
+    def test_persistent(self, client):
+        with client.application.app_context():
+            key = CodeGenCache.key('uproot', 'sslhep/servicex_code_gen_func_adl_uproot:1.0',
+                                   '(call Select)')
+            CodeGenCache().put(key, self.result)
+            db.session.commit()
+
+            # A different worker only finds it in the database
+            assert CodeGenCache().get(key) == self.result
+
+    def test_put_replaces(self, client):
+        with client.application.app_context():
+            cache = CodeGenCache()
+            key = cache.key('uproot', 'img', '(call Select)')
+            cache.put(key, self.result)
+            cache.put(key, self.result._replace(configmap='generated-source-def'))
+            db.session.commit()
+            assert GeneratedCode.query.count() == 1
+            assert CodeGenCache().get(key).configmap == 'generated-source-def'
+
+    def test_lru_eviction(self, client):
+        with client.application.app_context():
+            cache = CodeGenCache(max_entries=2)
+            keys = [cache.key('uproot', 'img', f'selection {i}') for i in range(3)]
+            for key in keys:
+                cache.put(key, self.result)
+            assert list(cache.entries) == keys[1:]
+
+            # Evicted entries are still in the database
+            assert cache.get(keys[0]) == self.result
+
+    def test_expired(self, client):
+        with client.application.app_context():
+            cache = CodeGenCache(ttl=timedelta(hours=1))
+            key = cache.key('uproot', 'img', '(call Select)')
+            cache.put(key, self.result)
+            cache.entries[key] = (datetime.utcnow() - timedelta(hours=2), self.result)
+            assert cache.get(key) is None
+            assert GeneratedCode.query.count() == 0
+
+    def _mock_code_gen_response(self, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_post = mocker.patch('requests.post', return_value=mock_response)
+
+        mock_parts = mocker.MagicMock()
+        mock_parts.parts = [mocker.MagicMock(text="my-transformer:test"),
+                            mocker.MagicMock(text="python"),
+                            mocker.MagicMock(text="transform.py"),
+                            mocker.MagicMock(content=b"generated code")]
+        mocker.patch('servicex_app.code_gen_adapter.decoder.MultipartDecoder.from_response',
+                     return_value=mock_parts)
+        mocker.patch("zipfile.ZipFile")
+        mocker.patch("io.BytesIO")
+        return mock_post
+
+    @staticmethod
+    def _request(request_id):
+        request = TransformRequest()
+        request.request_id = request_id
+        request.selection = "(call Select)"
+        request.code_gen_image = "sslhep/servicex_code_gen_func_adl_uproot:1.0"
+        return request
+
+    def test_adapter_cache_hit(self, mocker, client):
+        with client.application.app_context():
+            mock_post = self._mock_code_gen_response(mocker)
+            mock_transformer_manager = mocker.MagicMock()
+            mock_transformer_manager.create_shared_configmap_from_zip.return_value = \
+                'generated-source-abc'
+            mock_transformer_manager.configmap_exists.return_value = True
+
+            code_gen = CodeGenAdapter({'uproot': 'http://localhost:8000'},
+                                      mock_transformer_manager, CodeGenCache())
+            first_request = self._request("462-33")
+            first = code_gen.generate_code_for_selection(first_request, "servicex", "uproot")
+            second_request = self._request("462-34")
+            second = code_gen.generate_code_for_selection(second_request, "servicex", "uproot")
+
+            assert first == second == ('generated-source-abc', "my-transformer:test",
+                                       "python", "transform.py")
+            assert second_request.code_hash == first_request.code_hash
+            mock_post.assert_called_once()
+            mock_transformer_manager.create_shared_configmap_from_zip.assert_called_once()
+            mock_transformer_manager.create_configmap_from_zip.assert_not_called()
+            assert GeneratedCode.source_zip_for('generated-source-abc') == b"generated code"
+
+    def test_adapter_configmap_gone(self, mocker, client):
+        with client.application.app_context():
+            mock_post = self._mock_code_gen_response(mocker)
+            mock_transformer_manager = mocker.MagicMock()
+            mock_transformer_manager.create_shared_configmap_from_zip.return_value = \
+                'generated-source-abc'
+            mock_transformer_manager.configmap_exists.return_value = False
+
+            code_gen = CodeGenAdapter({'uproot': 'http://localhost:8000'},
+                                      mock_transformer_manager, CodeGenCache())
+            code_gen.generate_code_for_selection(self._request("462-33"), "servicex", "uproot")
+            code_gen.generate_code_for_selection(self._request("462-34"), "servicex", "uproot")
+
+            assert mock_post.call_count == 2
+            assert mock_transformer_manager.create_shared_configmap_from_zip.call_count == 2
@@ -31,7 +31,7 @@ import pytest
 from pytest import fixture
 from servicex_app.dataset_manager import DatasetManager
 from servicex_app.did_parser import DIDParser
-from servicex_app.lookup_result_processor import LookupResultProcessor
+from servicex_app.lookup_result_processor import LookupResultProcessor, DISPATCH_LARGEST_FIRST
 from servicex_app.models import Dataset, DatasetFile, TransformRequest, DatasetStatus
 from servicex_app.models import db
 from servicex_app_test.resource_test_base import ResourceTestBase
@@ -201,7 +201,24 @@ class TestDatasetManager(ResourceTestBase):
             file_list = ["root://eospublic.cern.ch/1.root", "root://eospublic.cern.ch/2.root"]
 
             d = DatasetManager.from_file_list(file_list, logger=client.application.logger, db=db)
-            assert d.file_paths == file_list
+            assert list(d.file_paths) == file_list
+            assert d.dataset.n_files == 2
+
+    def test_file_count(self, mocker, client):
+        with client.application.app_context():
+            file_list = ["root://eospublic.cern.ch/1.root", "root://eospublic.cern.ch/2.root"]
+            d = DatasetManager.from_file_list(file_list, logger=client.application.logger, db=db)
+            count = mocker.spy(DatasetFile, 'count_for_dataset')
+
+            # A complete lookup recorded the number of files
+            assert d.file_count == 2
+            count.assert_not_called()
+
+            # Files are still being added while the lookup runs
+            d.dataset.lookup_status = DatasetStatus.looking
+            d.dataset.n_files = 0
+            assert d.file_count == 2
+            count.assert_called_once_with(d.dataset.id)
 
     def test_dataset_name_file_list(self, client):
         with client.application.app_context():
@@ -266,7 +283,45 @@ class TestDatasetManager(ResourceTestBase):
             d = DatasetManager.from_file_list(file_list, logger=client.application.logger, db=db)
             d.publish_files(request=transform_request, lookup_result_processor=mock_processor)
             assert transform_request.files == 2
-            mock_processor.add_files_to_processing_queue.assert_called_with(transform_request, files=d.dataset.files)
+            mock_processor.add_files_to_processing_queue.assert_called_once()
+            files = mock_processor.add_files_to_processing_queue.call_args[1]['files']
+            assert [(f.id, f.paths) for f in files] == [(f.id, f.paths) for f in d.dataset.files]
+
+    def test_publish_files_in_chunks(self, mocker, client):
+        with client.application.app_context():
+            mocker.patch.object(DatasetManager, 'PUBLISH_CHUNK_SIZE', 2)
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            file_list = [f"root://eospublic.cern.ch/{i}.root" for i in range(5)]
+            transform_request = TransformRequest()
+            transform_request.request_id = "462-33"
+
+            d = DatasetManager.from_file_list(file_list, logger=client.application.logger, db=db)
+            d.publish_files(request=transform_request, lookup_result_processor=mock_processor)
+            assert transform_request.files == 5
+
+            chunks = [c[1]['files'] for c in mock_processor.add_files_to_processing_queue.call_args_list]
+            assert [len(c) for c in chunks] == [2, 2, 1]
+            assert [f.paths for c in chunks for f in c] == file_list
+
+    def test_publish_files_largest_first(self, mocker, client):
+        with client.application.app_context():
+            mocker.patch.object(DatasetManager, 'PUBLISH_CHUNK_SIZE', 2)
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            mock_processor.dispatch_order_for.return_value = DISPATCH_LARGEST_FIRST
+            file_list = [f"root://eospublic.cern.ch/{i}.root" for i in range(5)]
+            transform_request = TransformRequest()
+            transform_request.request_id = "462-33"
+
+            d = DatasetManager.from_file_list(file_list, logger=client.application.logger, db=db)
+            for f, size in zip(d.dataset.files, [10, 30, None, 30, 20]):
+                f.file_size = size
+            db.session.commit()
+
+            d.publish_files(request=transform_request, lookup_result_processor=mock_processor)
+
+            chunks = [c[1]['files'] for c in mock_processor.add_files_to_processing_queue.call_args_list]
+            assert [len(c) for c in chunks] == [2, 2, 1]
+            assert [f.paths for c in chunks for f in c] == [file_list[i] for i in [1, 3, 4, 0, 2]]
 
     def test_add_files(self, mocker, client):
         with client.application.app_context():
@@ -287,13 +342,26 @@ class TestDatasetManager(ResourceTestBase):
             second_request.did_id = d.id
 
             d.add_files(files=[
-                DatasetFile(
-                    paths="root://eospublic.cern.ch/3.root",
-                    adler32="xxx",
-                    file_events=0,
-                    file_size=0
-                )
+                {
+                    'paths': "root://eospublic.cern.ch/3.root",
+                    'adler32': "xxx",
+                    'file_events': 0,
+                    'file_size': 0
+                },
+                {
+                    'paths': "root://eospublic.cern.ch/4.root",
+                    'adler32': "xxx",
+                    'file_events': 0,
+                    'file_size': 0
+                }
             ], requests=[first_request, second_request], lookup_result_processor=mock_processor)
 
-            assert first_request.files == 3
-            assert second_request.files == 3
+            assert first_request.files == 4
+            assert second_request.files == 4
+
+            new_files = mock_processor.add_files_to_processing_queue.call_args[1]['files']
+            assert [f.paths for f in new_files] == [
+                "root://eospublic.cern.ch/3.root", "root://eospublic.cern.ch/4.root"
+            ]
+            assert [DatasetFile.get_by_id(f.id).dataset_id for f in new_files] == [d.id, d.id]
+            assert len(Dataset.find_by_id(d.id).files) == 4
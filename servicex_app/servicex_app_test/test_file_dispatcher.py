@@ -0,0 +1,195 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime, timedelta, timezone
+
+from servicex_app.dataset_manager import DatasetManager
+from servicex_app.file_dispatcher import FileDispatcher
+from servicex_app.lookup_result_processor import LookupResultProcessor
+from servicex_app.models import TransformRequest, TransformStatus, db
+from servicex_app.transformer_manager import TransformerManager
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestFileDispatcher(ResourceTestBase):
+    @staticmethod
+    def _save_request(dataset_id: int) -> TransformRequest:
+        request = TransformRequest(
+            request_id='BR549',
+            did='123-456-789',
+            did_id=dataset_id,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=TransformStatus.running
+        )
+        request.save_to_db()
+        return request
+
+    def test_publish_inline(self, mocker, client):
+        with client.application.app_context():
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            mock_dataset_manager = mocker.MagicMock(spec=DatasetManager)
+            request = self._generate_transform_request()
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=0)
+            assert dispatcher.publish_files(mock_dataset_manager, request) is None
+            mock_dataset_manager.publish_files.assert_called_once_with(
+                request, mock_processor, commit_progress=True, resume=False)
+
+    def test_publish_starts_transformers(self, mocker, client):
+        with client.application.app_context():
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            mock_dataset_manager = mocker.MagicMock(spec=DatasetManager)
+            mock_manager = mocker.MagicMock(spec=TransformerManager)
+            request = self._generate_transform_request()
+            request.status = TransformStatus.running
+            client.application.config['TRANSFORMER_MANAGER_ENABLED'] = True
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=0,
+                                        transformer_manager=mock_manager)
+            dispatcher.publish_files(mock_dataset_manager, request, start_transformers=True)
+            mock_manager.start_transformers.assert_called_once_with(
+                client.application.config, request)
+
+    def test_publish_served_from_cache_starts_no_transformers(self, mocker, client):
+        with client.application.app_context():
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            mock_dataset_manager = mocker.MagicMock(spec=DatasetManager)
+            mock_dataset_manager.publish_files.side_effect = \
+                lambda request, processor, commit_progress, resume: \
+                setattr(request, 'status', TransformStatus.complete)
+            mock_manager = mocker.MagicMock(spec=TransformerManager)
+            request = self._generate_transform_request()
+            request.status = TransformStatus.running
+            client.application.config['TRANSFORMER_MANAGER_ENABLED'] = True
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=0,
+                                        transformer_manager=mock_manager)
+            dispatcher.publish_files(mock_dataset_manager, request, start_transformers=True)
+            mock_manager.start_transformers.assert_not_called()
+
+    def test_publish_in_background(self, mocker, client):
+        with client.application.app_context():
+            mocker.patch.object(DatasetManager, 'PUBLISH_CHUNK_SIZE', 2)
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            file_list = [f"root://eospublic.cern.ch/{i}.root" for i in range(5)]
+            dataset_manager = DatasetManager.from_file_list(
+                file_list, logger=client.application.logger, db=db)
+            request = self._save_request(dataset_manager.id)
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=1)
+            dispatcher.publish_files(dataset_manager, request).result(timeout=30)
+
+            assert mock_processor.add_files_to_processing_queue.call_count == 3
+            db.session.expire_all()
+            saved = TransformRequest.lookup('BR549')
+            assert saved.files == 5
+            assert saved.files_dispatched == 5
+            assert saved.status == TransformStatus.running
+
+    def test_publish_failure_marks_request_fatal(self, mocker, client):
+        with client.application.app_context():
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            mock_processor.add_files_to_processing_queue.side_effect = Exception('No broker')
+            dataset_manager = DatasetManager.from_file_list(
+                ["root://eospublic.cern.ch/1.root"], logger=client.application.logger, db=db)
+            request = self._save_request(dataset_manager.id)
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=1)
+            dispatcher.publish_files(dataset_manager, request).result(timeout=30)
+
+            db.session.expire_all()
+            saved = TransformRequest.lookup('BR549')
+            assert saved.status == TransformStatus.fatal
+            assert saved.failure_description == 'Failed to publish files: No broker'
+
+    def test_recover_stalled_dispatch(self, mocker, client):
+        with client.application.app_context():
+            mocker.patch.object(DatasetManager, 'PUBLISH_CHUNK_SIZE', 2)
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            mock_processor.dispatch_order_for.return_value = 'as-found'
+            mock_manager = mocker.MagicMock(spec=TransformerManager)
+            file_list = [f"root://eospublic.cern.ch/{i}.root" for i in range(5)]
+            dataset_manager = DatasetManager.from_file_list(
+                file_list, logger=client.application.logger, db=db)
+            files = list(dataset_manager.dataset.files)
+
+            # The app worker publishing the files went away after the first chunk
+            request = self._save_request(dataset_manager.id)
+            request.files = 5
+            request.files_dispatched = 2
+            request.dispatch_heartbeat = datetime.now(tz=timezone.utc) - timedelta(hours=1)
+            db.session.commit()
+            client.application.config['TRANSFORMER_MANAGER_ENABLED'] = True
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=0,
+                                        transformer_manager=mock_manager, stall_seconds=600)
+            assert dispatcher.recover_stalled() == 1
+
+            published = [f.id for c in mock_processor.add_files_to_processing_queue.call_args_list
+                         for f in c.kwargs['files']]
+            assert published == [f.id for f in files[2:]]
+
+            db.session.expire_all()
+            saved = TransformRequest.lookup('BR549')
+            assert saved.files_dispatched == 5
+            mock_manager.get_transformer_replicas.assert_called_once()
+            mock_manager.start_transformers.assert_not_called()
+
+            # Finished, so there is nothing left to recover
+            assert dispatcher.recover_stalled() == 0
+
+    def test_recover_ignores_active_dispatch(self, mocker, client):
+        with client.application.app_context():
+            mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+            request = self._save_request(dataset_id=1)
+            request.files = 5
+            request.files_dispatched = 2
+            request.dispatch_heartbeat = datetime.now(tz=timezone.utc)
+            db.session.commit()
+
+            dispatcher = FileDispatcher(client.application, mock_processor, max_workers=0,
+                                        stall_seconds=600)
+            assert dispatcher.recover_stalled() == 0
+            mock_processor.add_files_to_processing_queue.assert_not_called()
+
+    def test_one_recovery_thread_per_process(self, mocker, client):
+        mock_processor = mocker.MagicMock(spec=LookupResultProcessor)
+        first = FileDispatcher(client.application, mock_processor, max_workers=0)
+        second = FileDispatcher(client.application, mock_processor, max_workers=0)
+        try:
+            assert first.start_recovery(60)
+            assert not second.start_recovery(60)
+        finally:
+            first.stop_recovery()
+
+        # Another one may start once it has stopped
+        try:
+            assert second.start_recovery(60)
+        finally:
+            second.stop_recovery()
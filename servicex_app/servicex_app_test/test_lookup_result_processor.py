@@ -25,7 +25,10 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
-from servicex_app.lookup_result_processor import LookupResultProcessor
+import pytest
+
+from servicex_app.lookup_result_processor import LookupResultProcessor, \
+    DISPATCH_AS_FOUND, DISPATCH_LARGEST_FIRST, DISPATCH_INTERLEAVE_SITES
 from servicex_app_test.resource_test_base import ResourceTestBase
 
 
@@ -54,5 +57,117 @@ class TestLookupResultProcessor(ResourceTestBase):
                         "http://cern.analysis.ch:5000/servicex/internal/transformation/BR549",
                     'result_destination': 'object-store',
                     "result_format": "arrow"
-                }
+                },
+                producer=mock_celery_app.producer_or_acquire.return_value.__enter__.return_value
             )
+
+    def test_add_files_to_processing_queue_batched(self, mocker, mock_celery_app):
+        processor = LookupResultProcessor(mock_celery_app,
+                                          "http://cern.analysis.ch:5000/",
+                                          target_bytes_per_task=250000)
+
+        request = self._generate_transform_request()
+        request.result_destination = 'object-store'
+
+        files = []
+        for file_id in range(3):
+            file_record = self._generate_datafile()
+            file_record.id = file_id
+            files.append(file_record)
+
+        client = self._test_client()
+        with client.application.app_context():
+            processor.add_files_to_processing_queue(request, files)
+
+            producer = mock_celery_app.producer_or_acquire.return_value.__enter__.return_value
+            assert mock_celery_app.send_task.call_count == 2
+            mock_celery_app.send_task.assert_any_call(
+                'transformer_sidecar.transform_files',
+                kwargs={
+                    "request_id": 'BR549',
+                    "files": [(0, ["/path1", "/path2"], 100000),
+                              (1, ["/path1", "/path2"], 100000)],
+                    "service_endpoint":
+                        "http://cern.analysis.ch:5000/servicex/internal/transformation/BR549",
+                    'result_destination': 'object-store',
+                    "result_format": "arrow"
+                },
+                producer=producer
+            )
+            assert mock_celery_app.send_task.call_args[1]['kwargs']['files'] == \
+                [(2, ["/path1", "/path2"], 100000)]
+
+    def test_batch_files(self, mock_celery_app):
+        processor = LookupResultProcessor(mock_celery_app, "http://cern.analysis.ch:5000/",
+                                          target_bytes_per_task=100)
+
+        files = []
+        for file_id, size in enumerate([40, 50, 20, 500, None, 10]):
+            file_record = self._generate_datafile()
+            file_record.id = file_id
+            file_record.file_size = size
+            files.append(file_record)
+
+        batches = [[f.id for f in batch] for batch in processor.batch_files(files)]
+        assert batches == [[0, 1], [2], [3], [4], [5]]
+
+    def _files(self, paths_and_sizes):
+        files = []
+        for file_id, (paths, size) in enumerate(paths_and_sizes):
+            file_record = self._generate_datafile()
+            file_record.id = file_id
+            file_record.paths = paths
+            file_record.file_size = size
+            files.append(file_record)
+        return files
+
+    def test_order_files_largest_first(self):
+        files = self._files([("/a", 10), ("/b", None), ("/c", 30), ("/d", 20)])
+        ordered = LookupResultProcessor.order_files(files, DISPATCH_LARGEST_FIRST)
+        assert [f.id for f in ordered] == [2, 3, 0, 1]
+
+    def test_order_files_largest_first_breaks_ties_on_events(self):
+        files = self._files([("/a", 10), ("/b", 10)])
+        files[1].file_events = 10000
+        ordered = LookupResultProcessor.order_files(files, DISPATCH_LARGEST_FIRST)
+        assert [f.id for f in ordered] == [1, 0]
+
+    def test_order_files_interleave_sites(self):
+        files = self._files([
+            ("root://site-a.org:1094//a1.root,root://site-b.org//a1.root", 1),
+            ("root://site-a.org:1094//a2.root", 1),
+            ("root://site-a.org:1094//a3.root", 1),
+            ("https://site-b.org/b1.root", 1),
+            ("root://site-c.org//c1.root", 1),
+            ("https://site-b.org/b2.root", 1),
+        ])
+        ordered = LookupResultProcessor.order_files(files, DISPATCH_INTERLEAVE_SITES)
+        assert [f.id for f in ordered] == [0, 3, 4, 1, 5, 2]
+
+    def test_order_files_as_found(self):
+        files = self._files([("/a", 10), ("/b", 30)])
+        ordered = LookupResultProcessor.order_files(files, DISPATCH_AS_FOUND)
+        assert [f.id for f in ordered] == [0, 1]
+
+    def test_request_dispatch_order_overrides_default(self, mock_celery_app):
+        processor = LookupResultProcessor(mock_celery_app, "http://cern.analysis.ch:5000/",
+                                          dispatch_order=DISPATCH_LARGEST_FIRST)
+        request = self._generate_transform_request()
+        files = self._files([("/a", 10), ("/b", 30)])
+
+        client = self._test_client()
+        with client.application.app_context():
+            processor.add_files_to_processing_queue(request, files)
+            assert [c[1]['kwargs']['file_id'] for c in mock_celery_app.send_task.call_args_list] == \
+                [1, 0]
+
+            mock_celery_app.send_task.reset_mock()
+            request.dispatch_order = DISPATCH_AS_FOUND
+            processor.add_files_to_processing_queue(request, files)
+            assert [c[1]['kwargs']['file_id'] for c in mock_celery_app.send_task.call_args_list] == \
+                [0, 1]
+
+    def test_unknown_dispatch_order(self, mock_celery_app):
+        with pytest.raises(ValueError):
+            LookupResultProcessor(mock_celery_app, "http://cern.analysis.ch:5000/",
+                                  dispatch_order="smallest-first")
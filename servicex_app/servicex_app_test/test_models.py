@@ -1,7 +1,9 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from pytest import fixture
-from servicex_app.models import TransformationResult, TransformRequest, UserModel
+from servicex_app.models import TransformationResult, TransformRequest, UserModel, \
+    TransformStatus, RequestCounts, db
+from servicex_app_test.resource_test_base import ResourceTestBase
 
 
 class TestTransformRequest:
@@ -60,3 +62,129 @@ class TestTransformRequest:
         request = TransformRequest()
         request.files = None
         assert request.files_remaining is None
+
+
+class TestTransformRequestCounters(ResourceTestBase):
+    @staticmethod
+    def _save_request(files: int) -> None:
+        TransformRequest(
+            request_id='BR549',
+            did='123-456-789',
+            did_id=1234,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=TransformStatus.running,
+            files=files
+        ).save_to_db()
+
+    @staticmethod
+    def _result(file_id: int) -> dict:
+        return {
+            'did': '123-456-789',
+            'file_id': file_id,
+            'request_id': 'BR549',
+            'file_path': f'/foo/bar{file_id}.root',
+            'transform_status': 'success'
+        }
+
+    def test_file_transformed_returns_new_counts(self, client):
+        with client.application.app_context():
+            self._save_request(files=2)
+            counts = TransformRequest.file_transformed_successfully('BR549')
+            assert counts == RequestCounts(files=2, files_completed=1, files_failed=0)
+            assert counts.files_remaining == 1
+
+            counts = TransformRequest.file_transformed_unsuccessfully('BR549')
+            assert counts == RequestCounts(files=2, files_completed=1, files_failed=1)
+            assert counts.files_remaining == 0
+
+            # A late duplicate report must not look like a second completion
+            counts = TransformRequest.file_transformed_successfully('BR549')
+            assert counts.files_remaining == -1
+
+            transform_req = TransformRequest.lookup('BR549')
+            assert transform_req.files_completed == 2
+            assert transform_req.files_failed == 1
+
+    def test_files_transformed_batch(self, client):
+        with client.application.app_context():
+            self._save_request(files=10)
+            counts = TransformRequest.files_transformed('BR549', succeeded=7, failed=3)
+            assert counts.files_remaining == 0
+
+    def test_request_counts_completed_by(self):
+        assert RequestCounts(files=2, files_completed=1, files_failed=1).completed_by(1)
+        assert not RequestCounts(files=2, files_completed=1, files_failed=0).completed_by(1)
+        # Completion is detected when the count crosses zero, not only when it lands on it
+        assert RequestCounts(files=2, files_completed=3, files_failed=0).completed_by(2)
+        assert not RequestCounts(files=2, files_completed=3, files_failed=0).completed_by(1)
+        assert not RequestCounts(files=2, files_completed=2, files_failed=0).completed_by(0)
+        assert not RequestCounts(files=0, files_completed=1, files_failed=0).completed_by(1)
+
+    def test_unrecorded_results(self, client):
+        with client.application.app_context():
+            self._save_request(files=3)
+            TransformationResult.bulk_insert([self._result(1)])
+            new_results = TransformationResult.unrecorded(
+                'BR549', [self._result(1), self._result(2), self._result(2), self._result(3)])
+            assert [r['file_id'] for r in new_results] == [2, 3]
+
+    def test_claim_dispatch(self, client):
+        with client.application.app_context():
+            self._save_request(files=3)
+            request = TransformRequest.lookup('BR549')
+            request.dispatch_heartbeat = datetime(2024, 1, 1)
+            db.session.commit()
+
+            assert TransformRequest.claim_dispatch('BR549', datetime(2024, 1, 1))
+            assert not TransformRequest.claim_dispatch('BR549', datetime(2024, 1, 1))
+
+    def test_files_transformed_unknown_request(self, client):
+        with client.application.app_context():
+            assert TransformRequest.files_transformed('BR549', succeeded=1, failed=0) is None
+
+    def test_statistics_no_results(self, client):
+        with client.application.app_context():
+            self._save_request(files=2)
+            assert TransformRequest.lookup('BR549').statistics is None
+
+    def test_add_result_statistics(self, client):
+        with client.application.app_context():
+            self._save_request(files=3)
+            TransformRequest.add_result_statistics('BR549', [
+                {'transform_time': 10, 'avg_rate': 2.0, 'total_bytes': 100, 'total_events': 20}
+            ])
+            TransformRequest.add_result_statistics('BR549', [
+                {'transform_time': 4, 'avg_rate': 1.0, 'total_bytes': 50, 'total_events': 5},
+                {'transform_time': 16, 'avg_rate': 3.0, 'total_bytes': 25, 'total_events': 5}
+            ])
+            db.session.commit()
+
+            assert TransformRequest.lookup('BR549').statistics == {
+                "min-time": 4,
+                "max-time": 16,
+                "avg-time": 10.0,
+                "total-time": 30,
+                "avg-rate": 2.0,
+                "total-bytes": 175,
+                "total-events": 30
+            }
+
+    def test_statistics_skip_missing_values(self, client):
+        with client.application.app_context():
+            self._save_request(files=3)
+            TransformRequest.add_result_statistics('BR549', [
+                {'transform_time': 10, 'avg_rate': 4.0, 'total_bytes': 100, 'total_events': 20},
+                {'transform_time': None, 'avg_rate': None, 'total_bytes': 0, 'total_events': 0},
+                {'transform_time': 20, 'avg_rate': None, 'total_bytes': 0, 'total_events': 0}
+            ])
+            db.session.commit()
+
+            # Like AVG(), the averages leave out results without a value
+            stats = TransformRequest.lookup('BR549').statistics
+            assert stats['avg-time'] == 15.0
+            assert stats['avg-rate'] == 4.0
+
+    def test_files_remaining_unknown(self):
+        assert RequestCounts(files=0, files_completed=0, files_failed=0).files_remaining is None
@@ -0,0 +1,136 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime, timezone
+
+from sqlalchemy import func, text
+
+from servicex_app.models import TransformRequest, TransformationResult, DatasetFile, \
+    TransformStatus, db
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestQueryPlans(ResourceTestBase):
+    """
+    Guard against regressions that turn the hot lookups back into table scans
+    """
+
+    @staticmethod
+    def _seed():
+        for i in range(20):
+            db.session.add(TransformRequest(
+                request_id=f'req-{i}',
+                did='123-456-789',
+                did_id=i % 4,
+                submit_time=datetime.now(tz=timezone.utc),
+                result_destination='object-store',
+                result_format='arrow',
+                status=TransformStatus.running if i % 2 else TransformStatus.lookup,
+                files=10
+            ))
+            for j in range(10):
+                db.session.add(TransformationResult(
+                    did='123-456-789',
+                    file_id=j,
+                    request_id=f'req-{i}',
+                    file_path=f'/foo/bar{j}.root',
+                    transform_status='success'
+                ))
+                db.session.add(DatasetFile(
+                    dataset_id=i,
+                    paths=f'/foo/bar{j}.root'
+                ))
+        db.session.commit()
+
+    @staticmethod
+    def _query_plan(query) -> str:
+        compiled = query.statement.compile(dialect=db.engine.dialect,
+                                           compile_kwargs={"literal_binds": True})
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        return "\n".join(row[-1] for row in rows)
+
+    def test_results_for_request(self, client):
+        with client.application.app_context():
+            self._seed()
+            plan = self._query_plan(
+                TransformationResult.query
+                .filter_by(request_id='req-3')
+                .order_by(TransformationResult.file_id.asc()))
+            assert 'ix_transform_result_request_id_file_id' in plan
+            assert 'TEMP B-TREE' not in plan
+
+    def test_results_keyset_page(self, client):
+        with client.application.app_context():
+            self._seed()
+            plan = self._query_plan(
+                TransformationResult.query
+                .filter(TransformationResult.request_id == 'req-3',
+                        TransformationResult.id > 5)
+                .order_by(TransformationResult.id)
+                .limit(10))
+            assert 'ix_transform_result_request_id_id' in plan
+            assert 'TEMP B-TREE' not in plan
+
+    def test_files_for_dataset(self, client):
+        with client.application.app_context():
+            self._seed()
+            plan = self._query_plan(DatasetFile.query.filter_by(dataset_id=3))
+            # Either of the indexes leading with dataset_id will do
+            assert 'USING INDEX ix_files_dataset_id_' in plan
+
+    def test_files_for_dataset_chunk(self, client):
+        with client.application.app_context():
+            self._seed()
+            plan = self._query_plan(
+                DatasetFile.query
+                .filter(DatasetFile.dataset_id == 3, DatasetFile.id > 5)
+                .order_by(DatasetFile.id)
+                .limit(10))
+            assert 'ix_files_dataset_id_id' in plan
+            assert 'TEMP B-TREE' not in plan
+
+    def test_files_for_dataset_chunk_largest_first(self, client):
+        with client.application.app_context():
+            self._seed()
+            size = func.coalesce(DatasetFile.file_size, 0)
+            plan = self._query_plan(
+                DatasetFile.query
+                .filter(DatasetFile.dataset_id == 3, size <= 100,
+                        (size < 100) | (DatasetFile.id > 5))
+                .order_by(size.desc(), DatasetFile.id)
+                .limit(10))
+            assert 'ix_files_dataset_id_size_id' in plan
+            assert 'TEMP B-TREE' not in plan
+
+    def test_requests_pending_on_dataset(self, client):
+        with client.application.app_context():
+            self._seed()
+            plan = self._query_plan(
+                TransformRequest.query.filter(
+                    (TransformRequest.status == TransformStatus.pending_lookup) &
+                    (TransformRequest.did_id == 3)))
+            assert 'ix_requests_did_id_status' in plan
@@ -0,0 +1,191 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from datetime import datetime, timezone
+
+from servicex_app.dataset_manager import DatasetManager
+from servicex_app.lookup_result_processor import LookupResultProcessor
+from servicex_app.models import TransformRequest, TransformationResult, TransformStatus, db
+from servicex_app.object_store_manager import ObjectStoreManager
+from servicex_app.result_cache import ResultCache
+from servicex_app.status_notifier import StatusNotifier
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class TestResultCache(ResourceTestBase):
+    @staticmethod
+    def _save_request(request_id: str, dataset_id: int, code_hash='abc123',
+                      result_format='parquet', files=0) -> TransformRequest:
+        request = TransformRequest(
+            request_id=request_id,
+            did='123-456-789',
+            did_id=dataset_id,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format=result_format,
+            status=TransformStatus.running,
+            code_hash=code_hash,
+            files=files
+        )
+        request.save_to_db()
+        return request
+
+    def _seed(self, client):
+        file_list = [f"root://eospublic.cern.ch/{i}.root" for i in range(3)]
+        dataset_manager = DatasetManager.from_file_list(
+            file_list, logger=client.application.logger, db=db)
+        files = list(dataset_manager.dataset.files)
+
+        self._save_request('old', dataset_manager.id, files=3)
+        for file_record, status in zip(files, ['success', 'success', 'failure']):
+            db.session.add(TransformationResult(
+                did='123-456-789',
+                file_id=file_record.id,
+                request_id='old',
+                file_path=file_record.paths,
+                transform_status=status,
+                transform_time=10,
+                total_events=100,
+                total_bytes=1000,
+                avg_rate=10.0,
+                output_object=f'{file_record.id}.parquet' if status == 'success' else None
+            ))
+        db.session.commit()
+        return dataset_manager, files
+
+    def test_serve(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            request = self._save_request('new', dataset_manager.id, files=3)
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+
+            remaining, counts = ResultCache(object_store).serve(request, files)
+
+            assert [f.id for f in remaining] == [files[2].id]
+            assert counts.files_completed == 2
+            assert counts.files_remaining == 1
+            object_store.copy_object.assert_any_call('new', f'{files[0].id}.parquet', 'old')
+            object_store.copy_object.assert_any_call('new', f'{files[1].id}.parquet', 'old')
+
+            results = TransformationResult.query.filter_by(request_id='new').all()
+            assert sorted(r.file_id for r in results) == [files[0].id, files[1].id]
+            assert all(r.transform_status == 'success' for r in results)
+            assert TransformRequest.lookup('new').statistics['total-time'] == 20
+
+    def test_serve_again(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            request = self._save_request('new', dataset_manager.id, files=3)
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+            cache = ResultCache(object_store)
+
+            cache.serve(request, files)
+            remaining, counts = cache.serve(request, files)
+
+            # A resumed dispatch serves the files again without counting them twice
+            assert [f.id for f in remaining] == [files[2].id]
+            assert counts.files_completed == 2
+            assert TransformationResult.query.filter_by(request_id='new').count() == 2
+
+    def test_serve_other_format(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            request = self._save_request('new', dataset_manager.id, files=3,
+                                         result_format='root-file')
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+
+            remaining, counts = ResultCache(object_store).serve(request, files)
+            assert remaining == files
+            assert counts is None
+            object_store.copy_object.assert_not_called()
+
+    def test_serve_missing_object(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            request = self._save_request('new', dataset_manager.id, files=3)
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+            object_store.copy_object.side_effect = [Exception("NoSuchBucket"), None]
+
+            remaining, counts = ResultCache(object_store).serve(request, files)
+            assert [f.id for f in remaining] == [files[0].id, files[2].id]
+            assert counts.files_completed == 1
+
+    def test_request_completed_from_cache(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            request = self._save_request('new', dataset_manager.id, files=2)
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+            transformer_manager = mocker.MagicMock()
+            mock_celery_app = mocker.MagicMock()
+            processor = LookupResultProcessor(
+                mock_celery_app, "http://cern.analysis.ch:5000/",
+                result_cache=ResultCache(object_store, transformer_manager))
+
+            processor.add_files_to_processing_queue(request, files[:2], use_cache=True)
+
+            mock_celery_app.send_task.assert_not_called()
+            assert TransformRequest.lookup('new').status == TransformStatus.complete
+            transformer_manager.shutdown_transformer_job.assert_called_once_with(
+                'new', client.application.config['TRANSFORMER_NAMESPACE'])
+
+    def test_request_completed_from_cache_notifies(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            request = self._save_request('new', dataset_manager.id, files=2)
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+            notifier = StatusNotifier()
+            cache = ResultCache(object_store, status_notifier=notifier)
+
+            cache.serve(request, files[:1])
+            assert notifier.version('new') == 1
+
+            # Completing the request drops its version, like a file complete report does
+            cache.serve(request, files[1:2])
+            assert TransformRequest.lookup('new').status == TransformStatus.complete
+            assert 'new' not in notifier._versions
+
+    def test_find_reusable_request(self, mocker, client):
+        with client.application.app_context():
+            dataset_manager, files = self._seed(client)
+            old = TransformRequest.lookup('old')
+            old.status = TransformStatus.complete
+            old.files_completed = 2
+            db.session.commit()
+            request = self._save_request('new', dataset_manager.id, files=2)
+            object_store = mocker.MagicMock(spec=ObjectStoreManager)
+            object_store.bucket_exists.return_value = True
+            cache = ResultCache(object_store)
+
+            assert cache.find_reusable_request(request).request_id == 'old'
+
+            object_store.bucket_exists.return_value = False
+            assert cache.find_reusable_request(request) is None
+
+            # Not every file of the dataset was transformed successfully
+            object_store.bucket_exists.return_value = True
+            request.files = 3
+            assert cache.find_reusable_request(request) is None
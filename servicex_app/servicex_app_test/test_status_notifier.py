@@ -0,0 +1,86 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import threading
+
+from servicex_app.status_notifier import StatusNotifier
+
+
+class TestStatusNotifier:
+    def test_notify_bumps_version(self):
+        notifier = StatusNotifier()
+        assert notifier.version('BR549') == 0
+        notifier.notify('BR549')
+        notifier.notify('BR549')
+        assert notifier.version('BR549') == 2
+        assert notifier.version('other') == 0
+
+    def test_wait_times_out(self):
+        notifier = StatusNotifier()
+        assert notifier.wait('BR549', 0, timeout=0.01) == 0
+
+    def test_wait_returns_on_newer_version(self):
+        notifier = StatusNotifier()
+        notifier.notify('BR549')
+        assert notifier.wait('BR549', 0, timeout=10) == 1
+
+    def test_wait_woken_by_other_thread(self):
+        notifier = StatusNotifier()
+        waiting = threading.Event()
+        result = []
+
+        def waiter():
+            waiting.set()
+            result.append(notifier.wait('BR549', 0, timeout=10))
+
+        t = threading.Thread(target=waiter)
+        t.start()
+        waiting.wait()
+        notifier.notify('BR549')
+        t.join(timeout=10)
+        assert result == [1]
+
+    def test_forget_wakes_waiters(self):
+        notifier = StatusNotifier()
+        notifier.notify('BR549')
+        result = []
+
+        t = threading.Thread(target=lambda: result.append(notifier.wait('BR549', 1, timeout=10)))
+        t.start()
+        notifier.forget('BR549')
+        t.join(timeout=10)
+        assert result == [0]
+        assert notifier.version('BR549') == 0
+
+    def test_waiter_limit(self):
+        notifier = StatusNotifier()
+        with notifier.waiter(1) as first:
+            assert first
+            with notifier.waiter(1) as second:
+                assert not second
+        with notifier.waiter(1) as again:
+            assert again
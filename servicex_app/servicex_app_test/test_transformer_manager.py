@@ -204,6 +204,101 @@ class TestTransformerManager(ResourceTestBase):
             assert called_deployment.spec.replicas == 17
             mock_autoscaling.create_namespaced_horizontal_pod_autoscaler.assert_not_called()
 
+    def test_launch_transformer_jobs_queue_depth_autoscaler(self, mocker):
+        import kubernetes
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_api = mocker.patch.object(kubernetes.client, 'AppsV1Api')
+        mocker.patch.object(kubernetes.client, 'CoreV1Api')
+
+        mock_autoscaling = mocker.Mock()
+        mocker.patch.object(kubernetes.client, 'AutoscalingV1Api',
+                            return_value=mock_autoscaling)
+
+        transformer = TransformerManager('external-kubernetes')
+        cfg = {
+            'OBJECT_STORE_ENABLED': True,
+            'MINIO_URL_TRANSFORMER': 'rolling-snail-minio:9000',
+            'MINIO_ACCESS_KEY': 'itsame',
+            'MINIO_SECRET_KEY': 'shhh',
+            'TRANSFORMER_AUTOSCALE_ENABLED': True,
+            'TRANSFORMER_AUTOSCALE_METRIC': 'queue-depth',
+            'TRANSFORMER_SCALER_INTERVAL': 3600,
+            'TRANSFORMER_MIN_REPLICAS': 2,
+            'TRANSFORMER_CPU_LIMIT': 1,
+            'TRANSFORMER_SIDECAR_VOLUME_PATH': '/servicex/output',
+            'TRANSFORMER_SIDECAR_IMAGE': 'pondd/servicex_yt_transformer:sidecar',
+            'TRANSFORMER_SIDECAR_PULL_POLICY': 'Always',
+            'TRANSFORMER_SCIENCE_IMAGE_PULL_POLICY': 'Always'
+        }
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+
+        client = self._test_client(
+            extra_config=cfg, transformation_manager=transformer
+        )
+
+        with client.application.app_context():
+            transformer.launch_transformer_jobs(
+                image='sslhep/servicex-transformer:pytest', request_id='1234', workers=17,
+                rabbitmq_uri='ampq://test.com', namespace='my-ns',
+                result_destination='object-store', result_format='arrow', x509_secret='x509',
+                generated_code_cm=None,
+                transformer_language="scala", transformer_command="echo"
+            )
+            called_deployment = mock_api.mock_calls[1][2]['body']
+            assert called_deployment.spec.replicas == 2
+
+            # The queue depth scaler takes the place of the CPU HPA
+            mock_autoscaling.create_namespaced_horizontal_pod_autoscaler.assert_not_called()
+
+            transformer.shutdown_transformer_job('1234', 'my-ns')
+            mock_autoscaling.delete_namespaced_horizontal_pod_autoscaler.assert_not_called()
+
+    def test_scale_transformer_job(self, mocker):
+        import kubernetes
+        from kubernetes.client.rest import ApiException
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_api = mocker.MagicMock(kubernetes.client.AppsV1Api)
+        mocker.patch.object(kubernetes.client, 'AppsV1Api', return_value=mock_api)
+        mock_api.read_namespaced_deployment_scale.return_value = SimpleNamespace(
+            spec=SimpleNamespace(replicas=3))
+
+        transformer = TransformerManager('external-kubernetes')
+        assert transformer.get_transformer_replicas('1234', 'my-ns') == 3
+        mock_api.read_namespaced_deployment_scale.assert_called_with(
+            name='transformer-1234', namespace='my-ns')
+
+        transformer.scale_transformer_job('1234', 'my-ns', 7)
+        mock_api.patch_namespaced_deployment_scale.assert_called_with(
+            name='transformer-1234', namespace='my-ns', body={'spec': {'replicas': 7}})
+
+        mock_api.read_namespaced_deployment_scale.side_effect = ApiException(status=404)
+        assert transformer.get_transformer_replicas('1234', 'my-ns') is None
+
+    def test_get_transformer_replica_counts(self, mocker):
+        import kubernetes
+        from kubernetes.client.rest import ApiException
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_api = mocker.MagicMock(kubernetes.client.AppsV1Api)
+        mocker.patch.object(kubernetes.client, 'AppsV1Api', return_value=mock_api)
+        mock_api.read_namespaced_deployment_status.return_value = SimpleNamespace(
+            spec=SimpleNamespace(replicas=5), status=SimpleNamespace(ready_replicas=2))
+
+        transformer = TransformerManager('external-kubernetes')
+        assert transformer.get_transformer_replica_counts('1234', 'my-ns') == (5, 2)
+        mock_api.read_namespaced_deployment_status.assert_called_with(
+            name='transformer-1234', namespace='my-ns')
+
+        # No pods ready yet
+        mock_api.read_namespaced_deployment_status.return_value = SimpleNamespace(
+            spec=SimpleNamespace(replicas=5), status=SimpleNamespace(ready_replicas=None))
+        assert transformer.get_transformer_replica_counts('1234', 'my-ns') == (5, 0)
+
+        mock_api.read_namespaced_deployment_status.side_effect = ApiException(status=404)
+        assert transformer.get_transformer_replica_counts('1234', 'my-ns') is None
+
     def test_launch_transformer_with_hostpath(self, mocker):
         import kubernetes
 
@@ -445,6 +540,279 @@ class TestTransformerManager(ResourceTestBase):
                                           container.volume_mounts))
             assert posix_vol_mount.mount_path == '/posix_volume'
 
+    def test_launch_transformer_jobs_with_compile_cache(self, mocker):
+        import kubernetes
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_kubernetes = mocker.patch.object(kubernetes.client, 'AppsV1Api')
+
+        transformer = TransformerManager('external-kubernetes')
+        my_config = {
+            'OBJECT_STORE_ENABLED': False,
+            'TRANSFORMER_COMPILE_CACHE_CLAIM': 'compile-pvc',
+            'TRANSFORMER_AUTOSCALE_ENABLED': False,
+            'TRANSFORMER_CPU_LIMIT': 1,
+            'TRANSFORMER_SIDECAR_VOLUME_PATH': '/servicex/output',
+            'TRANSFORMER_SIDECAR_IMAGE': 'pondd/servicex_yt_transformer:sidecar',
+            'TRANSFORMER_SIDECAR_PULL_POLICY': 'Always',
+            'TRANSFORMER_SCIENCE_IMAGE_PULL_POLICY': 'Always'
+        }
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+
+        client = self._test_client(
+            extra_config=my_config, transformation_manager=transformer
+        )
+
+        with client.application.app_context():
+            transformer.launch_transformer_jobs(
+                image='sslhep/servicex_func_adl_xaod_transformer:pytest', request_id='1234',
+                workers=17, rabbitmq_uri='ampq://test.com', namespace='my-ns',
+                result_destination='volume',
+                result_format='parquet', x509_secret='x509',
+                generated_code_cm=None,
+                transformer_language="bash", transformer_command="echo"
+            )
+            called_job = mock_kubernetes.mock_calls[1][2]['body']
+            container = called_job.spec.template.spec.containers[1]
+
+            cache_vol = next(filter(lambda v: v.name == 'compile-cache',
+                                    called_job.spec.template.spec.volumes))
+            assert cache_vol.persistent_volume_claim.claim_name == 'compile-pvc'
+
+            cache_mount = next(filter(lambda m: m.name == 'compile-cache',
+                                      container.volume_mounts))
+            assert cache_mount.mount_path == '/compile-cache'
+
+            env = {e.name: e.value for e in container.env}
+            assert env['COMPILE_CACHE_DIR'] == '/compile-cache'
+            assert env['SCIENCE_IMAGE'] == 'sslhep/servicex_func_adl_xaod_transformer:pytest'
+            assert env['COMPILE_CACHE_MAX_ENTRIES'] == '32'
+
+    def test_create_pool_object(self, mocker):
+        import kubernetes
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        transformer = TransformerManager('external-kubernetes')
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+        my_config = {
+            'TRANSFORMER_AUTOSCALE_ENABLED': False,
+            'TRANSFORMER_CPU_LIMIT': 1,
+            'TRANSFORMER_SIDECAR_VOLUME_PATH': '/servicex/output',
+            'TRANSFORMER_SIDECAR_IMAGE': 'pondd/servicex_yt_transformer:sidecar',
+            'TRANSFORMER_SIDECAR_PULL_POLICY': 'Always',
+            'TRANSFORMER_SCIENCE_IMAGE_PULL_POLICY': 'Always',
+            'MINIO_URL_TRANSFORMER': 'minio:9000',
+            'MINIO_ACCESS_KEY': 'miniouser',
+            'MINIO_SECRET_KEY': 'leftfoot1'
+        }
+
+        client = self._test_client(
+            extra_config=my_config, transformation_manager=transformer
+        )
+
+        with client.application.app_context():
+            pool = transformer.create_pool_object('sslhep/servicex_func_adl_uproot_transformer:v1',
+                                                  'ampq://test.com', None, 3)
+            pool_name = TransformerManager.pool_name(
+                'sslhep/servicex_func_adl_uproot_transformer:v1')
+            assert pool.metadata.name == pool_name
+            assert pool.spec.replicas == 3
+            assert pool.spec.selector.match_labels == {'servicex/pool': pool_name}
+            assert pool.spec.template.metadata.labels == {'servicex/pool': pool_name}
+
+            sidecar, science = pool.spec.template.spec.containers
+            assert _arg_value(sidecar.args, '--pool-queue') == 'transformer-pool-$POD_NAME'
+            assert '--request-id' not in sidecar.args[0]
+            assert 'until [ -f /servicex/output/bind.env ]' in science.args[0]
+            assert _env_value(science.env, 'MINIO_URL') == 'minio:9000'
+
+            generated = next(filter(lambda v: v.name == 'generated-code',
+                                    pool.spec.template.spec.volumes))
+            assert generated.empty_dir is not None
+
+    @staticmethod
+    def _pool_pod(name, phase='Running'):
+        return SimpleNamespace(
+            metadata=SimpleNamespace(name=name, resource_version='42',
+                                     deletion_timestamp=None),
+            status=SimpleNamespace(phase=phase))
+
+    def test_bind_warm_transformers(self, mocker):
+        import kubernetes
+        from kubernetes.client.rest import ApiException
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_core_api = mocker.MagicMock(kubernetes.client.CoreV1Api)
+        mocker.patch.object(kubernetes.client, 'CoreV1Api', return_value=mock_core_api)
+        mock_core_api.list_namespaced_pod.return_value = SimpleNamespace(items=[
+            self._pool_pod('pool-pod-1', phase='Pending'),
+            self._pool_pod('pool-pod-2'),
+            self._pool_pod('pool-pod-3'),
+            self._pool_pod('pool-pod-4')
+        ])
+        mock_core_api.read_namespaced_config_map.return_value = SimpleNamespace(
+            binary_data={'generated_transformer.py': 'aW1wb3J0IGZvbw=='})
+
+        # Another request claimed the first running pod before us
+        mock_core_api.patch_namespaced_pod.side_effect = [ApiException(status=409), None, None]
+
+        mock_celery = mocker.MagicMock()
+        transformer = TransformerManager('external-kubernetes')
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+        client = self._test_client(transformation_manager=transformer)
+        transformer.make_api(mock_celery)
+        queue = mock_celery.connection_for_write.return_value.__enter__.return_value.SimpleQueue
+
+        with client.application.app_context():
+            request = self._generate_transform_request()
+            request.image = 'sslhep/servicex_func_adl_uproot_transformer:v1'
+            request.generated_code_cm = 'generated-source-abc'
+            request.workers = 2
+            config = {
+                'TRANSFORMER_NAMESPACE': 'my-ns',
+                'TRANSFORMER_WARM_POOL_IMAGES': [request.image]
+            }
+
+            assert transformer.bind_warm_transformers(config, request) == 2
+
+            mock_core_api.list_namespaced_pod.assert_called_with(
+                'my-ns', label_selector='servicex/pool=' + TransformerManager.pool_name(
+                    request.image))
+            assert [c.args[0] for c in mock_core_api.patch_namespaced_pod.call_args_list] == \
+                ['pool-pod-2', 'pool-pod-3', 'pool-pod-4']
+            patch = mock_core_api.patch_namespaced_pod.call_args.args[2]
+            assert patch['metadata']['labels'] == {
+                'servicex/pool': None,
+                'servicex/request-id': 'BR549'
+            }
+            assert patch['metadata']['resourceVersion'] == '42'
+
+            assert [c.args[0] for c in queue.call_args_list] == \
+                ['transformer-pool-pool-pod-3', 'transformer-pool-pool-pod-4']
+            binding = queue.return_value.put.call_args.args[0]
+            assert binding['request-id'] == 'BR549'
+            assert binding['generated-code'] == {'generated_transformer.py': 'aW1wb3J0IGZvbw=='}
+
+    def test_bind_warm_transformers_no_pool(self, mocker):
+        import kubernetes
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_core_api = mocker.MagicMock(kubernetes.client.CoreV1Api)
+        mocker.patch.object(kubernetes.client, 'CoreV1Api', return_value=mock_core_api)
+
+        transformer = TransformerManager('external-kubernetes')
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+        client = self._test_client(transformation_manager=transformer)
+        with client.application.app_context():
+            request = self._generate_transform_request()
+            request.generated_code_cm = 'generated-source-abc'
+            config = {
+                'TRANSFORMER_NAMESPACE': 'my-ns',
+                'TRANSFORMER_WARM_POOL_IMAGES': ['some/other-image:v1']
+            }
+
+            assert transformer.bind_warm_transformers(config, request) == 0
+            mock_core_api.list_namespaced_pod.assert_not_called()
+
+    def test_launch_transformer_jobs_with_report_batching(self, mocker):
+        import kubernetes
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_kubernetes = mocker.patch.object(kubernetes.client, 'AppsV1Api')
+
+        transformer = TransformerManager('external-kubernetes')
+        my_config = {
+            'OBJECT_STORE_ENABLED': False,
+            'TRANSFORMER_AUTOSCALE_ENABLED': False,
+            'TRANSFORMER_CPU_LIMIT': 1,
+            'TRANSFORMER_SIDECAR_VOLUME_PATH': '/servicex/output',
+            'TRANSFORMER_SIDECAR_IMAGE': 'pondd/servicex_yt_transformer:sidecar',
+            'TRANSFORMER_SIDECAR_PULL_POLICY': 'Always',
+            'TRANSFORMER_SCIENCE_IMAGE_PULL_POLICY': 'Always',
+            'MINIO_URL_TRANSFORMER': 'rolling-snail-minio:9000',
+            'MINIO_ACCESS_KEY': 'itsame',
+            'MINIO_SECRET_KEY': 'shhh',
+            'TRANSFORMER_REPORT_BATCH_SIZE': 50,
+            'TRANSFORMER_REPORT_FLUSH_INTERVAL': 2.5,
+            'TRANSFORMER_PREFETCH_BYTES': 2000000000,
+            'TRANSFORMER_STREAM_UPLOADS': True,
+            'TRANSFORMER_REPORT_SPOOL_CLAIM': 'spool-pvc'
+        }
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+
+        client = self._test_client(
+            extra_config=my_config, transformation_manager=transformer
+        )
+
+        with client.application.app_context():
+            transformer.launch_transformer_jobs(
+                image='sslhep/servicex-transformer:pytest', request_id='1234', workers=17,
+                rabbitmq_uri='ampq://test.com', namespace='my-ns',
+                result_destination='object-store',
+                result_format='parquet', x509_secret=None,
+                generated_code_cm=None,
+                transformer_language="scala", transformer_command="echo"
+            )
+            called_job = mock_kubernetes.mock_calls[1][2]['body']
+            sidecar = called_job.spec.template.spec.containers[0]
+            assert _arg_value(sidecar.args, '--report-batch-size') == '50'
+            assert _arg_value(sidecar.args, '--report-flush-interval') == '2.5'
+            assert _arg_value(sidecar.args, '--prefetch-bytes') == '2000000000'
+            assert ' --stream-uploads' in sidecar.args[0]
+
+            # Unsent reports are spooled on a claim shared by the transformers
+            assert _arg_value(sidecar.args, '--report-spool-dir') == '/report-spool'
+            spool_vol = next(filter(lambda v: v.name == 'report-spool',
+                                    called_job.spec.template.spec.volumes))
+            assert spool_vol.persistent_volume_claim.claim_name == 'spool-pvc'
+            spool_mount = next(filter(lambda m: m.name == 'report-spool',
+                                      sidecar.volume_mounts))
+            assert spool_mount.mount_path == '/report-spool'
+
+    def test_launch_transformer_jobs_with_slots(self, mocker):
+        import kubernetes
+
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_kubernetes = mocker.patch.object(kubernetes.client, 'AppsV1Api')
+
+        transformer = TransformerManager('external-kubernetes')
+        my_config = {
+            'OBJECT_STORE_ENABLED': False,
+            'TRANSFORMER_AUTOSCALE_ENABLED': False,
+            'TRANSFORMER_CPU_LIMIT': 4,
+            'TRANSFORMER_SIDECAR_VOLUME_PATH': '/servicex/output',
+            'TRANSFORMER_SIDECAR_IMAGE': 'pondd/servicex_yt_transformer:sidecar',
+            'TRANSFORMER_SIDECAR_PULL_POLICY': 'Always',
+            'TRANSFORMER_SCIENCE_IMAGE_PULL_POLICY': 'Always',
+            'MINIO_URL_TRANSFORMER': 'rolling-snail-minio:9000',
+            'MINIO_ACCESS_KEY': 'itsame',
+            'MINIO_SECRET_KEY': 'shhh',
+            'TRANSFORMER_SLOTS': 4
+        }
+        transformer.persistent_volume_claim_exists = mocker.Mock(return_value=True)
+
+        client = self._test_client(
+            extra_config=my_config, transformation_manager=transformer
+        )
+
+        with client.application.app_context():
+            transformer.launch_transformer_jobs(
+                image='sslhep/servicex-transformer:pytest', request_id='1234', workers=17,
+                rabbitmq_uri='ampq://test.com', namespace='my-ns',
+                result_destination='object-store',
+                result_format='parquet', x509_secret=None,
+                generated_code_cm=None,
+                transformer_language="scala", transformer_command="echo"
+            )
+            called_job = mock_kubernetes.mock_calls[1][2]['body']
+            sidecar, science = called_job.spec.template.spec.containers
+            assert _arg_value(sidecar.args, '--slots') == '4'
+            assert "for slot in $(seq 4); do PYTHONPATH=/generated:$PYTHONPATH $(" \
+                   in science.args[0]
+            assert "python3 /servicex/output/scripts/watch.py " \
+                   "|| echo bash /servicex/output/scripts/watch.sh) " \
+                   "scala echo /servicex/output/1234 & done; wait" in science.args[0]
+
     def test_launch_transformer_jobs_with_posix_emptydir(self, mocker):
         import kubernetes
 
@@ -573,6 +941,8 @@ class TestTransformerManager(ResourceTestBase):
             mock_autoscaling.delete_namespaced_horizontal_pod_autoscaler.assert_called_with(
                 name='transformer-1234',
                 namespace='my-ns')
+            mock_core_api.delete_collection_namespaced_pod.assert_called_with(
+                'my-ns', label_selector='servicex/request-id=1234')
 
     def test_shutdown_transformer_jobs_no_autoscaler(self, mocker):
         import kubernetes
@@ -640,6 +1010,98 @@ class TestTransformerManager(ResourceTestBase):
         assert calls[1]['namespace'] == 'servicex'
         assert calls[1]['body'].metadata.name == 'my-request-generated-source'
 
+    def test_create_shared_configmap_from_zip(self, mocker):
+        import kubernetes
+        from kubernetes.client.rest import ApiException
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_api = mocker.MagicMock(kubernetes.client.CoreV1Api)
+        mocker.patch.object(kubernetes.client, 'CoreV1Api',
+                            return_value=mock_api)
+
+        transformer = TransformerManager('external-kubernetes')
+        mock_zip = mocker.MagicMock(zipfile.ZipFile)
+        mock_zip.filelist = []
+
+        name = transformer.create_shared_configmap_from_zip(mock_zip, "ab" * 32, "servicex")
+        assert name == 'generated-source-' + "ab" * 16
+        assert mock_api.create_namespaced_config_map.call_args[1]['body'].metadata.name == name
+
+        # Another request already created it
+        mock_api.create_namespaced_config_map.side_effect = ApiException(status=409)
+        assert transformer.create_shared_configmap_from_zip(mock_zip, "ab" * 32, "servicex") == name
+
+        mock_api.create_namespaced_config_map.side_effect = ApiException(status=403)
+        with pytest.raises(ApiException):
+            transformer.create_shared_configmap_from_zip(mock_zip, "ab" * 32, "servicex")
+
+    def test_shared_configmap_reference_counting(self, mocker):
+        from datetime import datetime, timezone
+        from servicex_app.models import TransformRequest, TransformStatus
+
+        client = self._test_client()
+        with client.application.app_context():
+            for request_id in ['first', 'second']:
+                TransformRequest(request_id=request_id, did='123-456-789', did_id=1,
+                                 submit_time=datetime.now(tz=timezone.utc),
+                                 result_destination='object-store', result_format='arrow',
+                                 generated_code_cm='generated-source-abc',
+                                 status=TransformStatus.running).save_to_db()
+
+            first = TransformRequest.lookup('first')
+            first.status = TransformStatus.complete
+            assert TransformerManager.generated_source_to_delete('first') is None
+
+            second = TransformRequest.lookup('second')
+            second.status = TransformStatus.complete
+            assert TransformerManager.generated_source_to_delete('second') == \
+                'generated-source-abc'
+
+            # Requests we know nothing about keep their own ConfigMap name
+            assert TransformerManager.generated_source_to_delete('1234') == \
+                '1234-generated-source'
+
+    def test_restore_shared_configmap(self, mocker):
+        import io
+        import kubernetes
+        from datetime import datetime
+        from kubernetes.client.rest import ApiException
+        from servicex_app.models import GeneratedCode, db
+        mocker.patch.object(kubernetes.config, 'load_kube_config')
+        mock_api = mocker.MagicMock(kubernetes.client.CoreV1Api)
+        mocker.patch.object(kubernetes.client, 'CoreV1Api', return_value=mock_api)
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_out:
+            zip_out.writestr('generated_transformer.py', 'print("hi")')
+
+        client = self._test_client()
+        with client.application.app_context():
+            db.session.add(GeneratedCode(codegen='uproot', code_gen_image='', selection_hash='1',
+                                         configmap='generated-source-abc', source_hash='abc',
+                                         transformer_image='my-image',
+                                         transformer_language='python',
+                                         transformer_command='transform.py',
+                                         created=datetime.utcnow(),
+                                         source_zip=archive.getvalue()))
+            db.session.commit()
+
+            # The last request using it deleted the ConfigMap
+            TransformerManager.restore_shared_configmap('generated-source-abc', 'servicex')
+            body = mock_api.create_namespaced_config_map.call_args[1]['body']
+            assert body.metadata.name == 'generated-source-abc'
+            assert base64.b64decode(body.binary_data['generated_transformer.py']) == \
+                b'print("hi")'
+
+            # It still exists
+            mock_api.create_namespaced_config_map.side_effect = ApiException(status=409)
+            TransformerManager.restore_shared_configmap('generated-source-abc', 'servicex')
+
+            # Per request ConfigMaps, and shared ones without a kept archive are left alone
+            mock_api.create_namespaced_config_map.reset_mock()
+            TransformerManager.restore_shared_configmap('1234-generated-source', 'servicex')
+            TransformerManager.restore_shared_configmap('generated-source-def', 'servicex')
+            mock_api.create_namespaced_config_map.assert_not_called()
+
     def test_get_deployment_status(self, mocker, mock_kubernetes):
         mock_api = mock_kubernetes.client.AppsV1Api.return_value
         mock_deployment_list = mocker.MagicMock(name="mock_deployment_list")
@@ -0,0 +1,214 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from servicex_app.models import Lease, TransformRequest, TransformStatus, db
+from servicex_app.transformer_scaler import TransformerScaler
+from servicex_app_test.resource_test_base import ResourceTestBase
+
+
+class FakeTransformerManager:
+    """
+    Stands in for the Kubernetes Deployments of the transformers
+    """
+    def __init__(self, replicas: dict[str, int], ready: Optional[dict[str, int]] = None):
+        self.replicas = replicas
+        self.ready = ready if ready is not None else {}
+
+    def get_transformer_replica_counts(self, request_id: str,
+                                       namespace: str) -> Optional[tuple[int, int]]:
+        if request_id not in self.replicas:
+            return None
+        replicas = self.replicas[request_id]
+        return replicas, self.ready.get(request_id, replicas)
+
+    def scale_transformer_job(self, request_id: str, namespace: str, replicas: int):
+        self.replicas[request_id] = replicas
+
+
+class FakeChannel:
+    def __init__(self, depths: dict[str, int]):
+        self.depths = depths
+
+    def queue_declare(self, queue: str, passive: bool):
+        if queue not in self.depths:
+            raise Exception(f"NOT_FOUND - no queue '{queue}'")
+        return queue, self.depths[queue], 1
+
+
+class FakeCelery:
+    """
+    Stands in for RabbitMQ, reporting the depth of the transformer queues
+    """
+    def __init__(self, depths: dict[str, int]):
+        self.channel = FakeChannel(depths)
+
+    @contextmanager
+    def connection_for_read(self):
+        class Connection:
+            default_channel = self.channel
+        yield Connection()
+
+
+class TestTransformerScaler(ResourceTestBase):
+    @staticmethod
+    def _save_request(request_id: str, files: int, completed: int = 0,
+                      status=TransformStatus.running) -> TransformRequest:
+        request = TransformRequest(
+            request_id=request_id,
+            did='123-456-789',
+            did_id=1,
+            submit_time=datetime.now(tz=timezone.utc),
+            result_destination='object-store',
+            result_format='arrow',
+            status=status,
+            files=files,
+            files_completed=completed,
+            files_failed=0
+        )
+        request.save_to_db()
+        return request
+
+    @staticmethod
+    def _scaler(app, depths, replicas, ready=None, **kwargs) -> TransformerScaler:
+        return TransformerScaler(app, FakeCelery(depths), FakeTransformerManager(replicas, ready),
+                                 min_replicas=1, max_replicas=20, max_step=4,
+                                 drain_seconds=100, rate_window=60, **kwargs)
+
+    def test_desired_replicas(self, client):
+        scaler = self._scaler(client.application, {}, {})
+
+        # Queue drains in time at the observed rate of 0.1 files/s per replica
+        assert scaler.desired_replicas(current=2, queued=20, files_remaining=20, rate=0.2) == 2
+        # Messages carrying batches of files, it's the files that take the time
+        assert scaler.desired_replicas(current=2, queued=5, files_remaining=60, rate=0.2) == 6
+        # Ramp up is limited to max_step
+        assert scaler.desired_replicas(current=2, queued=200, files_remaining=300, rate=0.2) == 6
+        # Never above max_replicas
+        assert scaler.desired_replicas(current=18, queued=900, files_remaining=990,
+                                       rate=1.8) == 20
+        # Never more replicas than files left
+        assert scaler.desired_replicas(current=1, queued=2, files_remaining=3, rate=0) == 3
+        # Slow down gradually while there is still work queued
+        assert scaler.desired_replicas(current=10, queued=1, files_remaining=11, rate=5) == 6
+        # Nothing completed yet, so grow by a step
+        assert scaler.desired_replicas(current=1, queued=50, files_remaining=50, rate=0) == 5
+        # Queue drained, keep only the transformers with a file in flight
+        assert scaler.desired_replicas(current=8, queued=0, files_remaining=3, rate=1) == 3
+        # And scale to zero once the request has no files left
+        assert scaler.desired_replicas(current=8, queued=0, files_remaining=0, rate=1) == 0
+        # Grow back from zero when more files are queued
+        assert scaler.desired_replicas(current=0, queued=10, files_remaining=10, rate=0) == 4
+        # Keep transformers ready while the lookup is still finding files
+        assert scaler.desired_replicas(current=3, queued=0, files_remaining=0, rate=0,
+                                       looking_up=True) == 1
+        assert scaler.desired_replicas(current=3, queued=0, files_remaining=2, rate=0,
+                                       looking_up=True) == 2
+
+    def test_desired_replicas_pending_pods(self, client):
+        scaler = self._scaler(client.application, {}, {})
+
+        # Don't grow any further until the pods already asked for are ready
+        assert scaler.desired_replicas(current=6, queued=200, files_remaining=300, rate=0.2,
+                                       ready=2) == 6
+        assert scaler.desired_replicas(current=6, queued=50, files_remaining=50, rate=0,
+                                       ready=0) == 6
+        # The rate is that of the ready transformers
+        assert scaler.desired_replicas(current=6, queued=20, files_remaining=20, rate=0.2,
+                                       ready=2) == 2
+        assert scaler.desired_replicas(current=6, queued=200, files_remaining=300, rate=0.2,
+                                       ready=6) == 10
+
+    def test_completion_rate(self, client):
+        scaler = self._scaler(client.application, {}, {})
+        assert scaler.completion_rate('BR549', 0, now=0) == 0
+        assert scaler.completion_rate('BR549', 10, now=10) == 1
+        assert scaler.completion_rate('BR549', 30, now=20) == 1.5
+
+        # Observations older than the window are dropped
+        assert scaler.completion_rate('BR549', 30, now=100) == 0
+        assert scaler.completion_rate('BR549', 40, now=110) == 1
+
+    def test_scale_all(self, client):
+        with client.application.app_context():
+            self._save_request('busy', files=1000)
+            self._save_request('drained', files=100, completed=98)
+            self._save_request('finished', files=10, completed=10,
+                               status=TransformStatus.complete)
+            self._save_request('starting', files=10, status=TransformStatus.lookup)
+            self._save_request('looking', files=2, completed=2, status=TransformStatus.lookup)
+
+            depths = {'transformer-busy': 900, 'transformer-drained': 0,
+                      'transformer-finished': 0, 'transformer-looking': 0}
+            replicas = {'busy': 2, 'drained': 5, 'finished': 3, 'starting': 1, 'looking': 3}
+            scaler = self._scaler(client.application, depths, replicas)
+
+            scaler.scale_all(now=0)
+            assert replicas == {'busy': 6, 'drained': 2, 'finished': 3, 'starting': 1,
+                                'looking': 1}
+
+            # The busy request completed 60 files in the last minute with 6
+            # replicas, so it needs 15 to get through 900 files in time
+            request = TransformRequest.lookup('busy')
+            request.files_completed = 60
+            db.session.commit()
+            depths['transformer-busy'] = 900
+            scaler.scale_all(now=60)
+            assert replicas['busy'] == 10
+            scaler.scale_all(now=75)
+            assert replicas['busy'] == 14
+
+            # Requests that are no longer active are forgotten
+            request.status = TransformStatus.complete
+            db.session.commit()
+            scaler.scale_all(now=90)
+            assert 'busy' not in scaler._progress
+
+    def test_lead(self, client):
+        with client.application.app_context():
+            leader = self._scaler(client.application, {}, {}, holder='app-1')
+            follower = self._scaler(client.application, {}, {}, holder='app-2')
+
+            assert leader.lead()
+            follower._progress['BR549'] = deque([(0, 0)])
+            assert not follower.lead()
+            assert not follower._progress
+
+            # The leader renews its lease on every pass
+            assert leader.lead()
+            assert not follower.lead()
+
+    def test_lease_expires(self, client):
+        with client.application.app_context():
+            assert Lease.acquire('scaler', 'app-1', timedelta(seconds=-1))
+            assert Lease.acquire('scaler', 'app-2', timedelta(seconds=60))
+            assert not Lease.acquire('scaler', 'app-1', timedelta(seconds=60))
+            assert db.session.get(Lease, 'scaler').holder == 'app-2'
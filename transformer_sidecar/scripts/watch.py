@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# This script is used in the science container to watch for new transform
+# requests from the sidecar. It speaks version 2 of the sidecar protocol,
+# where every message is a JSON document preceded by its length as a four
+# byte big-endian integer:
+#
+# watch sends a hello frame with the protocol version once it connects
+# sidecar sends a transform frame for each input file
+# watch runs the transformation, writing its output to the log file named
+#   in the request and picking the stats out of it as it goes, unless the
+#   transformer writes them to the stats file named in the request
+# watch sends back a result frame with the status, events, output bytes,
+#   timings and error class of the transform
+# sidecar sends a stop frame when there are no more files
+#
+# It takes the same arguments as watch.sh:
+# 1. A "language" used to execute the transform script. Usually bash or python
+# 2. The script to execute
+# 3. The directory to write the log to if the request doesn't name one
+# 4. Optionally the host the sidecar runs on
+#
+# Keep this compatible with the oldest python3 found in science images (3.6)
+import json
+import os
+import re
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+PROTOCOL_VERSION = 2
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+STATS = re.compile(r'Transform stats: Total Events: (\d+), resulting file size (\d+)')
+PROCESSED = re.compile(r'Processed (\d+) events')
+TIMES = re.compile(r'Detailed transformer times\. query_time:([\d.]+) '
+                   r'serialization: ([\d.]+) writing: ([\d.]+)')
+ERROR = re.compile(r'^([\w.]*(?:Error|Exception))\b:?\s*(.*)')
+
+
+def recv_exactly(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_frame(sock):
+    header = recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        return None
+    body = recv_exactly(sock, size)
+    if body is None:
+        return None
+    return json.loads(body.decode("utf8"))
+
+
+def send_frame(sock, message):
+    body = json.dumps(message).encode("utf8")
+    sock.sendall(FRAME_HEADER.pack(len(body)) + body)
+
+
+def scan(line, result):
+    match = STATS.search(line)
+    if match:
+        result["total-events"] = int(match.group(1))
+        result["output-bytes"] = int(match.group(2))
+
+    match = PROCESSED.search(line)
+    if match:
+        result["total-events"] = int(match.group(1))
+
+    match = TIMES.search(line)
+    if match:
+        result["timings"] = {
+            "query": float(match.group(1)),
+            "serialization": float(match.group(2)),
+            "writing": float(match.group(3)),
+        }
+
+    match = ERROR.match(line)
+    if match:
+        result["error-class"] = match.group(1).split(".")[-1]
+        result["error"] = line.strip()
+
+
+def transform(lang, cmd, request, default_log):
+    output_file = request["safeOutputFileName"]
+    log_file = request.get("logFile") or os.path.join(default_log, "abc.log")
+    stats_file = request.get("statsFile")
+    result = {"total-events": 0, "output-bytes": None}
+
+    env = dict(os.environ)
+    if stats_file:
+        env["SERVICEX_STATS_FILE"] = stats_file
+        if os.path.isfile(stats_file):
+            os.remove(stats_file)
+
+    print("Attempting {} -> {} with {} format".format(
+        request["downloadPath"], output_file, request["result-format"]), flush=True)
+    start = time.time()
+    with open(log_file, "w") as log:
+        proc = subprocess.Popen([lang, cmd, request["downloadPath"], output_file,
+                                 request["result-format"]],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                universal_newlines=True, errors="replace", env=env)
+        for line in proc.stdout:
+            sys.stdout.write(line)
+            log.write(line)
+            scan(line, result)
+        exit_code = proc.wait()
+
+    # Stats the transformer wrote itself beat those picked from its output
+    if stats_file and os.path.isfile(stats_file):
+        try:
+            with open(stats_file) as stats:
+                result.update(json.load(stats))
+        except ValueError:
+            pass
+
+    result["status"] = "success" if exit_code == 0 else "failure"
+    result["exit-code"] = exit_code
+    result["wall-time"] = round(time.time() - start, 3)
+    if result["output-bytes"] is None:
+        result["output-bytes"] = os.path.getsize(output_file) \
+            if os.path.isfile(output_file) else 0
+    if result["status"] == "success":
+        result.pop("error-class", None)
+        result.pop("error", None)
+    return result
+
+
+def main(argv):
+    lang, cmd, path = argv[1:4]
+    host = argv[4] if len(argv) > 4 and argv[4] else "localhost"
+
+    time.sleep(1)
+    print("connecting...", flush=True)
+    sock = socket.create_connection((host, 8081))
+    send_frame(sock, {"type": "hello", "protocol": PROTOCOL_VERSION})
+
+    while True:
+        request = recv_frame(sock)
+        if request is None or request.get("type") == "stop":
+            break
+
+        result = transform(lang, cmd, request, path)
+        print("Elapsed Time: {} s, {}".format(result["wall-time"], result["status"]),
+              flush=True)
+        send_frame(sock, result)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -51,9 +51,14 @@ while [[ $nc_PID ]] ; do
     download_path=$(echo $line | jq -r '.downloadPath')
     output_file=$(echo $line | jq -r '.safeOutputFileName')
     output_format=$(echo $line | jq -r '."result-format"')
+    # Each slot of the sidecar names its own log file, older sidecars don't
+    log_file=$(echo $line | jq -r '.logFile // empty')
+    log_file=${log_file:-$path/abc.log}
+    stats_file=$(echo $line | jq -r '.statsFile // empty')
 
     echo "Attempting $download_path -> $output_file with $output_format format"
-    $lang "$cmd" "$download_path" "$output_file" "$output_format" 2>&1 | tee $path/abc.log
+    SERVICEX_STATS_FILE="$stats_file" \
+      $lang "$cmd" "$download_path" "$output_file" "$output_format" 2>&1 | tee "$log_file"
 
     # sending status back
     if [ "${PIPESTATUS[0]}" == 0 ]; then
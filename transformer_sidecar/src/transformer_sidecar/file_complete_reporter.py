@@ -0,0 +1,250 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+import contextlib
+import json
+import logging
+import os
+import queue
+import signal
+import time
+from multiprocessing import Process
+from pathlib import Path
+from queue import Queue
+from typing import Optional
+
+from transformer_sidecar.servicex_adapter import ServiceXAdapter, FileCompleteRecord
+
+PLACE = {
+    "host_name": os.getenv("HOST_NAME", "unknown"),
+    "site": os.getenv("site", "unknown")
+}
+
+SPOOL_FILE_NAME = "file-complete-spool.jsonl"
+SPOOL_FILE_PATTERN = "file-complete-spool*.jsonl"
+
+
+class ReportQueueItem:
+    def __init__(self, service_endpoint: Optional[str],
+                 rec: Optional[FileCompleteRecord] = None):
+        self.service_endpoint = service_endpoint
+        self.rec = rec
+
+    def is_complete(self):
+        return not self.rec
+
+
+class FileCompleteReporter(Process):
+    """
+    Collects file complete records from the transformer and the object store
+    uploader and reports them to ServiceX in batches. A batch is sent when it
+    reaches batch_size records or when flush_interval seconds have passed,
+    whichever comes first.
+
+    Every record is appended to a spool file before it is acknowledged, and the
+    spool is rewritten after each flush with whatever could not be delivered.
+    A restarted sidecar replays the spool, so reports are not lost if the
+    container is restarted before they are sent.
+
+    The spool only outlives the pod if spool_dir is on a volume that does, such
+    as a claim shared by the transformers. Each pod then spools to a file of
+    its own and touches it every flush interval. Spools that haven't been
+    touched for orphan_seconds were left by pods that are gone, and are adopted
+    and delivered by whichever reporter finds them first. The app ignores
+    reports of files it has already recorded, so a spool that is adopted while
+    its pod is still delivering it only costs a few repeated reports.
+    """
+
+    def __init__(self, input_queue: Queue,
+                 logger: logging.Logger,
+                 spool_dir: str,
+                 batch_size: int,
+                 flush_interval: float,
+                 spool_name: str = SPOOL_FILE_NAME,
+                 orphan_seconds: Optional[float] = None):
+        super().__init__(target=self.service_work_queue)
+        self.input_queue = input_queue
+        self.logger = logger
+        self.spool_path = Path(spool_dir, spool_name)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.orphan_seconds = orphan_seconds if orphan_seconds is not None \
+            else max(60.0, 10 * flush_interval)
+
+        # Records waiting to be sent, grouped by the request's service endpoint
+        self.pending: dict[str, list[FileCompleteRecord]] = {}
+
+        # Keep one adapter (and its keep-alive connection pool) per endpoint
+        self.adapters: dict[str, ServiceXAdapter] = {}
+
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
+
+    def handle_sigterm(self, signum, frame):
+        # This method will be called when SIGTERM is received
+        self.logger.debug(
+            "SIGTERM received, but ignored",
+            extra={"place": PLACE, "pending": self.pending_count})
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(recs) for recs in self.pending.values())
+
+    def service_work_queue(self):
+        self.logger.debug("File complete reporter starting.", extra={"place": PLACE})
+        self.replay_spool()
+        self.adopt_orphaned_spools()
+        adopt_deadline = time.monotonic() + self.orphan_seconds
+
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.input_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            # When we receive the poison pill, send whatever we have and we're done.
+            if item is not None and item.is_complete():
+                self.flush()
+                self.logger.debug("File complete reporter done!",
+                                  extra={"place": PLACE, "pending": self.pending_count})
+                break
+
+            if item is not None:
+                self.add(item.service_endpoint, item.rec)
+
+            if self.pending_count >= self.batch_size or time.monotonic() >= deadline:
+                self.flush()
+                self.touch_spool()
+                deadline = time.monotonic() + self.flush_interval
+
+            if time.monotonic() >= adopt_deadline:
+                if self.adopt_orphaned_spools():
+                    self.flush()
+                adopt_deadline = time.monotonic() + self.orphan_seconds
+
+    def add(self, service_endpoint: str, rec: FileCompleteRecord):
+        with open(self.spool_path, "a") as spool:
+            spool.write(json.dumps({"service-endpoint": service_endpoint,
+                                    "record": rec.to_json()}) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        self.pending.setdefault(service_endpoint, []).append(rec)
+
+    def replay_spool(self):
+        if not self.spool_path.is_file():
+            return
+
+        self.read_spool(self.spool_path)
+        self.logger.info("Replaying spooled file complete records.",
+                         extra={"place": PLACE, "pending": self.pending_count})
+
+    def read_spool(self, path: Path):
+        with open(path) as spool:
+            for line in spool:
+                try:
+                    doc = json.loads(line)
+                    self.pending.setdefault(doc["service-endpoint"], []).append(
+                        FileCompleteRecord.from_json(doc["record"]))
+                except (ValueError, KeyError, AssertionError):
+                    # Most likely a partial line written as the container was killed
+                    self.logger.warning("Skipping unreadable spooled record",
+                                        extra={"place": PLACE, "line": line})
+
+    def touch_spool(self):
+        """
+        Show the spool still has a live reporter, so no other pod adopts it
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(self.spool_path)
+
+    def adopt_orphaned_spools(self) -> int:
+        """
+        Take over the spools left in the spool directory by reporters that are
+        gone. Each one is renamed to a name of our own first, so only one
+        reporter adopts it, and it is only removed once its records are in our
+        own spool.
+        :return: The number of records adopted
+        """
+        adopted = 0
+        now = time.time()
+        for path in self.spool_path.parent.glob(SPOOL_FILE_PATTERN):
+            if path == self.spool_path:
+                continue
+
+            if path.name.startswith(self.spool_path.stem + ".adopted-"):
+                # Adopted by this pod before its sidecar was restarted
+                claimed = path
+            else:
+                try:
+                    if now - path.stat().st_mtime < self.orphan_seconds:
+                        continue
+                    claimed = self.spool_path.with_suffix(f".adopted-{path.stem}.jsonl")
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    # Adopted by another reporter first
+                    continue
+
+            before = self.pending_count
+            self.read_spool(claimed)
+            adopted += self.pending_count - before
+            self.rewrite_spool()
+            os.remove(claimed)
+
+        if adopted:
+            self.logger.info("Adopted orphaned file complete records.",
+                             extra={"place": PLACE, "pending": adopted})
+        return adopted
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        for service_endpoint in list(self.pending.keys()):
+            adapter = self.adapters.get(service_endpoint)
+            if not adapter:
+                adapter = ServiceXAdapter(service_endpoint)
+                self.adapters[service_endpoint] = adapter
+
+            if adapter.put_file_complete_batch(self.pending[service_endpoint]):
+                del self.pending[service_endpoint]
+            else:
+                self.logger.warning("Failed to report file complete batch. Will retry.",
+                                    extra={"place": PLACE,
+                                           "pending": len(self.pending[service_endpoint])})
+
+        self.rewrite_spool()
+
+    def rewrite_spool(self):
+        # Write to a temp file and rename so the spool is never half written
+        temp_path = self.spool_path.with_suffix(".tmp")
+        with open(temp_path, "w") as spool:
+            for service_endpoint, recs in self.pending.items():
+                for rec in recs:
+                    spool.write(json.dumps({"service-endpoint": service_endpoint,
+                                            "record": rec.to_json()}) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        os.replace(temp_path, self.spool_path)
@@ -0,0 +1,174 @@
+# Copyright (c) 2022, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha1
+from typing import Optional
+
+import urllib3
+
+PLACE = {
+    "host_name": os.getenv("HOST_NAME", "unknown"),
+    "site": os.getenv("site", "unknown")
+}
+
+# Give up on staging a file that takes longer than this and read it remotely
+COPY_TIMEOUT = 30 * 60
+
+
+class FilePrefetcher:
+    """
+    Copies upcoming input files into a staging directory on the volume shared
+    with the science container, while the science container is busy with the
+    current file. The copies run one at a time, in the order the files were
+    submitted, and the staged files never add up to more than budget_bytes.
+
+    HTTP replicas are copied with urllib3 and root:// replicas with xrdcp, if
+    it is installed. Files that can't be staged are read remotely as before.
+    """
+
+    def __init__(self, staging_dir: str, budget_bytes: int, logger: logging.Logger):
+        self.staging_dir = staging_dir
+        self.budget_bytes = budget_bytes
+        self.logger = logger
+        self.xrdcp = shutil.which("xrdcp")
+
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._staged: dict[int, tuple[Future, int]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self._http: Optional[urllib3.PoolManager] = None
+
+        os.makedirs(staging_dir, exist_ok=True)
+
+    def can_stage(self, replica: str) -> bool:
+        if replica.startswith(("http://", "https://")):
+            return True
+        return bool(self.xrdcp) and replica.startswith("root://")
+
+    def prefetch(self, file_id: int, replicas: list[str], size: Optional[int]) -> bool:
+        """
+        Start staging the first replica of the file that can be copied, if it
+        fits in what is left of the budget.
+        :return: True if the file is being staged
+        """
+        replica = next((r for r in replicas if self.can_stage(r)), None)
+        if replica is None or not size:
+            return False
+
+        with self._lock:
+            if file_id in self._staged:
+                return True
+            if self._reserved + size > self.budget_bytes:
+                return False
+            self._reserved += size
+
+            local_path = os.path.join(self.staging_dir,
+                                      sha1(replica.encode("utf-8")).hexdigest())
+            future = self._executor.submit(self._stage, replica, local_path)
+            self._staged[file_id] = (future, size)
+        return True
+
+    def take(self, file_id: int) -> Optional[dict[str, str]]:
+        """
+        Wait for the staging of the file to finish.
+        :return: Replica to local path mapping of the staged copy, or None if
+            the file wasn't staged
+        """
+        with self._lock:
+            staged = self._staged.get(file_id)
+        if staged is None:
+            return None
+
+        try:
+            return staged[0].result()
+        except Exception as error:
+            self.logger.warning(f"Could not stage file, reading it remotely: {error}",
+                                extra={"file-id": file_id, "place": PLACE})
+            return None
+
+    def release(self, file_id: int) -> None:
+        """
+        Delete the staged copy of a file once it has been transformed and
+        return its share of the budget
+        """
+        with self._lock:
+            staged = self._staged.pop(file_id, None)
+            if staged is None:
+                return
+            self._reserved -= staged[1]
+
+        try:
+            for local_path in (staged[0].result() or {}).values():
+                os.remove(local_path)
+        except Exception:
+            pass
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+    def _stage(self, replica: str, local_path: str) -> dict[str, str]:
+        partial_path = local_path + ".part"
+        try:
+            if replica.startswith("root://"):
+                subprocess.run([self.xrdcp, "--silent", "--force", replica, partial_path],
+                               check=True, timeout=COPY_TIMEOUT)
+            else:
+                self._http_copy(replica, partial_path)
+            os.rename(partial_path, local_path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        self.logger.info("Staged file.", extra={"replica": replica, "place": PLACE})
+        return {replica: local_path}
+
+    def _http_copy(self, replica: str, local_path: str) -> None:
+        if self._http is None:
+            # Grid storage authenticates with the X509 proxy, if there is one
+            proxy = os.environ.get("X509_USER_PROXY")
+            proxy = proxy if proxy and os.path.isfile(proxy) else None
+            self._http = urllib3.PoolManager(
+                cert_file=proxy, key_file=proxy,
+                ca_cert_dir=os.environ.get("X509_CERT_DIR") if proxy else None,
+                timeout=urllib3.Timeout(connect=30, read=COPY_TIMEOUT))
+
+        response = self._http.request("GET", replica, preload_content=False)
+        try:
+            if response.status != 200:
+                raise IOError(f"HTTP {response.status} fetching {replica}")
+            with open(local_path, "wb") as f:
+                for chunk in response.stream(1024 * 1024):
+                    f.write(chunk)
+        finally:
+            response.release_conn()
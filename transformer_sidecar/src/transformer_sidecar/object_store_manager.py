@@ -67,3 +67,17 @@ class ObjectStoreManager:
             os.remove(path)
         except FileNotFoundError:
             pass
+
+    def upload_stream(self, bucket, object_name, stream, part_size):
+        """
+        Upload a stream of unknown length as a multipart upload, sending each
+        part as soon as it has been read. Errors are raised rather than logged
+        since there is no local copy of the data to fall back on.
+        """
+        result = self.minio_client.put_object(bucket_name=bucket,
+                                              object_name=object_name,
+                                              data=stream,
+                                              length=-1,
+                                              part_size=part_size)
+        self.logger.info("OSM > created object.", extra={
+                         "requestId": bucket, "object": result.object_name})
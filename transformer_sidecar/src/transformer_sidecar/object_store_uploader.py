@@ -34,6 +34,7 @@ from queue import Queue
 from typing import Optional
 
 from transformer_sidecar.object_store_manager import ObjectStoreManager
+from transformer_sidecar.file_complete_reporter import ReportQueueItem
 from transformer_sidecar.servicex_adapter import ServiceXAdapter, FileCompleteRecord
 
 PLACE = {
@@ -58,13 +59,15 @@ class ObjectStoreUploader(Process):
 
     def __init__(self, request_id: str, input_queue: Queue,
                  logger: logging.Logger,
-                 convert_root_to_parquet: bool):
+                 convert_root_to_parquet: bool,
+                 report_queue: Optional[Queue] = None):
 
         super().__init__(target=self.service_work_queue)
         self.request_id = request_id
         self.input_queue = input_queue
         self.logger = logger
         self.convert_root_to_parquet = convert_root_to_parquet
+        self.report_queue = report_queue
 
         signal.signal(signal.SIGTERM, self.handle_sigterm)
 
@@ -112,8 +115,13 @@ class ObjectStoreUploader(Process):
                                  extra={'requestId': self.request_id, "place": PLACE,
                                         "objectName": object_name,
                                         "elapsed": time.time()-t0})
+                item.rec.output_object = object_name
 
-                item.servicex.put_file_complete(item.rec)
+                if self.report_queue:
+                    self.report_queue.put(
+                        ReportQueueItem(item.servicex.server_endpoint, item.rec))
+                else:
+                    item.servicex.put_file_complete(item.rec)
 
     def convert_to_parquet(self, source_path: Path) -> Optional[Path]:
         """
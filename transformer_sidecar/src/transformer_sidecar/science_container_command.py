@@ -26,7 +26,18 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import json
+import queue
 import socket
+import struct
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Version 2 of the protocol frames every message as a JSON document preceded
+# by its length, and takes a single request and response per file. Version 1
+# is the line based GeT/success./confirmed. exchange still spoken by watch.sh
+PROTOCOL_VERSION = 2
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
 
 
 class ScienceContainerException(Exception):
@@ -34,7 +45,18 @@ class ScienceContainerException(Exception):
 
 
 class ScienceContainerCommand:
-    def __init__(self):
+    def __init__(self, conn=None, addr=None, index: int = 0, log_name: str = "abc.log"):
+        self.index = index
+        self.log_name = log_name
+        self.protocol: Optional[int] = None
+        self._pending_get = False
+
+        if conn:
+            # Connection accepted by a ScienceContainerPool, which owns the socket
+            self.serv = None
+            self.conn, self.addr = conn, addr
+            return
+
         # Open a socket to the science container
         self.serv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.serv.bind(("localhost", 8081))
@@ -70,7 +92,117 @@ class ScienceContainerCommand:
     def confirm(self):
         self.conn.send("confirmed.\n".encode())
 
+    def handshake(self):
+        """
+        Work out which protocol the science container speaks from the first
+        message it sends: watch.sh asks for a file with GeT, watch.py
+        introduces itself with a hello frame
+        """
+        if self.protocol:
+            return
+
+        header = self._recv_exactly(FRAME_HEADER.size)
+        if header == b"GeT\n":
+            self.protocol = 1
+            self._pending_get = True
+            return
+
+        hello = self._recv_frame_body(header)
+        if hello.get("protocol") != PROTOCOL_VERSION:
+            raise ScienceContainerException(
+                f"Unsupported science container protocol {hello.get('protocol')}")
+        self.protocol = PROTOCOL_VERSION
+
+    def transform(self, transform_request: dict) -> dict:
+        """
+        Have the science container transform a file and return its result. The
+        status is success or failure, and version 2 watchers add the events,
+        output bytes, timings and error class of the transform.
+        """
+        self.handshake()
+        if self.protocol == 1:
+            if not self._pending_get:
+                self.synch()
+            self._pending_get = False
+            self.send(transform_request)
+            response = self.await_response()
+            self.confirm()
+            return {"status": "success" if response == "success." else "failure"}
+
+        self.send_frame(dict(transform_request, type="transform"))
+        return self.recv_frame()
+
+    def send_frame(self, message: dict):
+        body = json.dumps(message).encode("utf8")
+        self.conn.sendall(FRAME_HEADER.pack(len(body)) + body)
+
+    def recv_frame(self) -> dict:
+        return self._recv_frame_body(self._recv_exactly(FRAME_HEADER.size))
+
+    def _recv_frame_body(self, header: bytes) -> dict:
+        (size,) = FRAME_HEADER.unpack(header)
+        if size > MAX_FRAME_SIZE:
+            raise ScienceContainerException(f"Science container sent a {size} byte frame")
+        return json.loads(self._recv_exactly(size).decode("utf8"))
+
+    def _recv_exactly(self, size: int) -> bytes:
+        # Messages may arrive split across any number of reads
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.conn.recv(size - len(buf))
+            if not chunk:
+                raise ScienceContainerException("Science container closed the connection")
+            buf.extend(chunk)
+        return bytes(buf)
+
     def close(self):
-        self.conn.send("stop.\n".encode())
+        if self.protocol == PROTOCOL_VERSION:
+            self.send_frame({"type": "stop"})
+        else:
+            self.conn.send("stop.\n".encode())
         self.conn.close()
+        if self.serv:
+            self.serv.close()
+
+
+class ScienceContainerPool:
+    """
+    The science container runs a watcher for each transform slot, and
+    each of them connects to the sidecar. Tasks borrow an idle slot for as long
+    as it takes to transform their file.
+    """
+    def __init__(self, slots: int = 1):
+        self.slots = []
+        self.idle = queue.Queue()
+
+        self.serv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.serv.bind(("localhost", 8081))
+        self.serv.listen(slots)
+        for index in range(slots):
+            conn, addr = self.serv.accept()
+
+            # Every slot gets a log of its own so concurrent transforms don't
+            # overwrite each other's stats
+            log_name = f"slot-{index}.log" if slots > 1 else "abc.log"
+            slot = ScienceContainerCommand(conn, addr, index=index, log_name=log_name)
+            self.slots.append(slot)
+            self.idle.put(slot)
+
+    @contextmanager
+    def acquire(self) -> Iterator[ScienceContainerCommand]:
+        slot = self.idle.get()
+        try:
+            yield slot
+        except ScienceContainerException:
+            # The watcher behind this slot is gone, don't hand it out again
+            raise
+        except BaseException:
+            self.idle.put(slot)
+            raise
+        else:
+            self.idle.put(slot)
+
+    def close(self):
+        for slot in self.slots:
+            slot.close()
         self.serv.close()
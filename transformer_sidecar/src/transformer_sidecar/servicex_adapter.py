@@ -26,7 +26,7 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import logging
-from typing import Any
+from typing import Any, Optional
 
 import requests
 import os
@@ -47,7 +47,8 @@ PLACE = {
 
 class FileCompleteRecord:
     def __init__(self, request_id: str, file_path: str, file_id: int, status: str,
-                 total_time: float, total_events: int, total_bytes: int):
+                 total_time: float, total_events: int, total_bytes: int,
+                 output_object: Optional[str] = None):
         assert request_id, "request_id is required"
         assert file_path, "file_path is required"
         assert file_id, "file_id is required"
@@ -62,6 +63,9 @@ class FileCompleteRecord:
         self.total_bytes = total_bytes
         self.avg_rate = total_events / total_time if total_time else 0
 
+        # Name of the uploaded output in the request's bucket, once it is known
+        self.output_object = output_object
+
     def to_json(self) -> dict[str, Any]:
         return {
             "requestId": self.request_id,
@@ -72,9 +76,21 @@ class FileCompleteRecord:
             "total-events": self.total_events,
             "total-bytes": self.total_bytes,
             "avg-rate": self.avg_rate,
+            "output-object": self.output_object,
             "place": PLACE
         }
 
+    @classmethod
+    def from_json(cls, doc: dict[str, Any]) -> 'FileCompleteRecord':
+        return cls(request_id=doc["requestId"],
+                   file_path=doc["file-path"],
+                   file_id=doc["file-id"],
+                   status=doc["status"],
+                   total_time=doc["total-time"],
+                   total_events=doc["total-events"],
+                   total_bytes=doc["total-bytes"],
+                   output_object=doc.get("output-object"))
+
 
 class ServiceXAdapter:
     def __init__(self, servicex_endpoint, logger=None):
@@ -109,3 +125,32 @@ class ServiceXAdapter:
                                       extra={'requestId': rec.request_id,
                                              "place": PLACE}
                                       )
+
+    def put_file_complete_batch(self, recs: list[FileCompleteRecord]) -> bool:
+        """
+        Report a batch of completed files for a single request in one call. The
+        app applies the whole batch in a single database transaction.
+        :return: False if the batch should be retried later
+        """
+        if self.server_endpoint and recs:
+            try:
+                response = retry_call(self.session.put,
+                                      fargs=[self.server_endpoint + "/file-complete-batch"],
+                                      fkwargs={"json": [rec.to_json() for rec in recs],
+                                               "timeout": (0.5, None)},
+                                      tries=MAX_RETRIES,
+                                      delay=RETRY_DELAY)
+                self.logger.info("Put file complete batch.",
+                                 extra={'requestId': recs[0].request_id,
+                                        "place": PLACE,
+                                        "num_files": len(recs)})
+                # Server side errors are usually a database that is temporarily
+                # unavailable. It's worth trying again later
+                return response.status_code < 500
+            except requests.exceptions.ConnectionError:
+                self.logger.exception("Connection Error in put_file_complete_batch",
+                                      extra={'requestId': recs[0].request_id,
+                                             "place": PLACE}
+                                      )
+                return False
+        return True
@@ -0,0 +1,110 @@
+# Copyright (c) 2022, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import contextlib
+import logging
+import os
+from pathlib import Path
+from threading import Thread
+
+from transformer_sidecar.object_store_manager import ObjectStoreManager
+
+# Every part is held in memory while it is uploaded, and the object store
+# won't take parts smaller than 5 MiB
+STREAM_PART_SIZE = 8 * 1024 * 1024
+
+
+class StreamingUploadAborted(Exception):
+    pass
+
+
+class StreamingUpload(Thread):
+    """
+    Upload a transformer output file to the object store while it is being
+    written. The output path is made a FIFO, which the transformer writes to
+    as if it were a regular file, and each part is uploaded as soon as it has
+    been read, so the output never lands on the sidecar volume.
+
+    The sidecar keeps a write end of the FIFO open itself, so the stream only
+    ends once the science container has reported back. If the transform failed
+    the upload is aborted rather than completed, and no partial output is ever
+    published.
+    """
+    def __init__(self, object_store: ObjectStoreManager, bucket: str,
+                 fifo_path: Path, logger: logging.Logger,
+                 part_size: int = STREAM_PART_SIZE):
+        super().__init__(daemon=True)
+        self.object_store = object_store
+        self.bucket = bucket
+        self.fifo_path = fifo_path
+        self.object_name = fifo_path.name
+        self.logger = logger
+        self.part_size = part_size
+
+        self.succeeded = False
+        self.bytes_uploaded = 0
+        self.error = None
+
+        # Opening the read end first means neither open blocks
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(fifo_path)
+        os.mkfifo(fifo_path)
+        self.fifo = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+        self.hold = os.open(fifo_path, os.O_WRONLY)
+        os.set_blocking(self.fifo, True)
+
+    def run(self):
+        try:
+            self.object_store.upload_stream(self.bucket, self.object_name, self,
+                                            self.part_size)
+        except Exception as error:
+            self.error = error
+        finally:
+            os.close(self.fifo)
+
+    def read(self, size: int = -1) -> bytes:
+        data = os.read(self.fifo, size if size > 0 else self.part_size)
+        if not data and not self.succeeded:
+            raise StreamingUploadAborted(f"Transform of {self.object_name} failed")
+        self.bytes_uploaded += len(data)
+        return data
+
+    def finish(self, succeeded: bool) -> bool:
+        """
+        Tell the upload whether the transform succeeded, and wait for it to
+        complete or be aborted. Returns True if the output is in the object store
+        """
+        self.succeeded = succeeded
+        os.close(self.hold)
+        self.join()
+        os.remove(self.fifo_path)
+
+        if succeeded and self.error:
+            self.logger.error(f"Streaming upload failed: {self.error}",
+                              extra={"requestId": self.bucket,
+                                     "objectName": self.object_name})
+        return succeeded and not self.error
@@ -26,9 +26,13 @@
 # CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
+import base64
+import contextlib
 import json
 import os
+import shlex
 import shutil
+import socket
 import sys
 import timeit
 from argparse import Namespace
@@ -43,7 +47,7 @@ import psutil as psutil
 import time
 from celery import Celery, shared_task
 
-from transformer_sidecar.science_container_command import ScienceContainerCommand, \
+from transformer_sidecar.science_container_command import ScienceContainerPool, \
     ScienceContainerException
 from transformer_sidecar.transformer_logging import initialize_logging
 from transformer_sidecar.transformer_stats import TransformerStats
@@ -52,6 +56,10 @@ from transformer_sidecar.transformer_stats.uproot_stats import UprootStats  # NO
 from transformer_sidecar.transformer_stats.raw_uproot_stats import RawUprootStats  # NOQA: 401
 from transformer_sidecar.object_store_manager import ObjectStoreManager
 from transformer_sidecar.object_store_uploader import ObjectStoreUploader, WorkQueueItem
+from transformer_sidecar.file_complete_reporter import FileCompleteReporter, ReportQueueItem, \
+    SPOOL_FILE_NAME
+from transformer_sidecar.file_prefetcher import FilePrefetcher
+from transformer_sidecar.streaming_uploader import StreamingUpload
 from transformer_sidecar.servicex_adapter import ServiceXAdapter, FileCompleteRecord
 from transformer_sidecar.transformer_argument_parser import TransformerArgumentParser
 
@@ -65,12 +73,24 @@ convert_root_to_parquet: bool = False
 upload_queue: Optional[Queue] = None
 uploader: Optional[ObjectStoreUploader] = None
 
-science_container: Optional[ScienceContainerCommand] = None
+report_queue: Optional[Queue] = None
+reporter: Optional[FileCompleteReporter] = None
+
+prefetcher: Optional[FilePrefetcher] = None
+
+stream_uploads: bool = False
+stream_store: Optional[ObjectStoreManager] = None
+
+science_container: Optional[ScienceContainerPool] = None
+slots: int = 1
 transformer_capabilities: dict = {}
 celery_app: Optional[Celery] = None
 
 request_id: str = ""
 
+# Binding of a warm pool transformer to a request, kept in the shared volume
+BINDING_FILE_NAME = "binding.json"
+
 # Use this to make sure we don't generate output file names that are crazy long
 MAX_PATH_LEN = 255
 
@@ -91,7 +111,8 @@ def transform_file(
         paths: list[str],
         service_endpoint,
         result_destination,
-        result_format):
+        result_format,
+        staged_paths: Optional[dict[str, str]] = None):
     """
     This is the main function for the transformer. It is called whenever a new message
     is available on the rabbit queue. These messages represent a single file to be
@@ -103,11 +124,20 @@ def transform_file(
     path in the output directory for the generated parquet or root file to be written.
 
     This control document is sent via a socket to the science image.
-    Once science image has done its job, it sends back a message over the socket.
+    Once science image has done its job, it sends back its result over the socket.
     The sidecar will then add the parquet/root file in the output directory to the
     S3 upload queue.
 
     We will examine this log file to see if the transform succeeded or failed
+
+    If the science container runs several transform slots, the file is sent to
+    whichever one is idle, and its log is written to a file for that slot.
+
+    staged_paths maps replicas that have already been copied to the shared
+    volume to their local copy, which the science container reads instead.
+
+    With streaming uploads, parquet output is uploaded to the object store as
+    the transformer writes it, instead of by the uploader once it is done.
     """
 
     global shared_dir
@@ -157,83 +187,126 @@ def transform_file(
     transform_success = False
     transformer_stats = TransformerStats()
     try:
-        # Loop through the replicas
-        for _file_path in _file_paths:
-            logger.info(
-                "trying to transform file",
-                extra={
-                    "requestId": request_id,
-                    "file-path": _file_path,
-                    "place": PLACE,
-                },
-            )
+        with science_container.acquire() as slot:
+            # Loop through the replicas
+            for _file_path in _file_paths:
+                logger.info(
+                    "trying to transform file",
+                    extra={
+                        "requestId": request_id,
+                        "file-path": _file_path,
+                        "place": PLACE,
+                    },
+                )
 
-            transform_request["file-path"] = _file_path
+                transform_request["file-path"] = _file_path
 
-            # Enrich the transform request to give more hints to the science container
-            transform_request["downloadPath"] = _file_path
+                # Enrich the transform request to give more hints to the science container
+                transform_request["downloadPath"] = \
+                    (staged_paths or {}).get(_file_path, _file_path)
 
-            # Decide an optional file extension for the results. If the output format is
-            # parquet then we add that as an extension, otherwise stick with the format
-            # of the input file.
-            result_extension = ".parquet" if result_format == "parquet" else ""
-            hashed_file_name = hash_path(
-                _file_path.replace("/", ":") + result_extension
-            )
-
-            # The transformer will write results here as they are generated. This
-            # directory isn't monitored.
-            if result_destination == "volume":
-                transform_request["safeOutputFileName"] = \
-                    os.path.join(posix_path, hashed_file_name)
-            else:
-                transform_request["safeOutputFileName"] = \
-                    os.path.join(scratch_path, hashed_file_name)
-
-            transform_request['result-format'] = result_format
-            science_container.synch()
-            science_container.send(transform_request)
-            science_container_response = science_container.await_response()
-
-            transform_request["status"] = science_container_response
-
-            # Grab the logs
-            transformer_stats = fill_stats_parser(
-                transformer_capabilities["stats-parser"],
-                Path(os.path.join(request_path, "abc.log")),
-            )
-            if science_container_response == "success.":
-                rec = FileCompleteRecord(
-                    request_id=request_id,
-                    file_path=_file_path,
-                    file_id=file_id,
-                    status="success",
-                    total_time=time.time() - total_time,
-                    total_events=transformer_stats.total_events,
-                    total_bytes=transformer_stats.file_size,
+                # Decide an optional file extension for the results. If the output format is
+                # parquet then we add that as an extension, otherwise stick with the format
+                # of the input file.
+                result_extension = ".parquet" if result_format == "parquet" else ""
+                hashed_file_name = hash_path(
+                    _file_path.replace("/", ":") + result_extension
                 )
 
-                if object_store:
-                    upload_queue.put(
-                        WorkQueueItem(
-                            Path(transform_request["safeOutputFileName"]), servicex, rec
-                        )
-                    )
+                # The transformer will write results here as they are generated. This
+                # directory isn't monitored.
+                if result_destination == "volume":
+                    transform_request["safeOutputFileName"] = \
+                        os.path.join(posix_path, hashed_file_name)
                 else:
-                    servicex.put_file_complete(rec)
-
-                transform_success = True
-                ts = {
-                    "requestId": request_id,
-                    "file-size": transformer_stats.file_size,
-                    "total-events": transformer_stats.total_events,
-                    "place": PLACE,
-                }
-                logger.info("Transformer stats.", extra=ts)
-                science_container.confirm()
-                break
+                    transform_request["safeOutputFileName"] = \
+                        os.path.join(scratch_path, hashed_file_name)
+
+                transform_request['result-format'] = result_format
+                transform_request["logFile"] = os.path.join(request_path, slot.log_name)
+
+                # Transformers that can write their stats as JSON do so here. Clear out
+                # the last file's so a failed transform isn't credited with them
+                transform_request["statsFile"] = os.path.splitext(
+                    transform_request["logFile"])[0] + ".stats.json"
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(transform_request["statsFile"])
+
+                upload = None
+                if stream_uploads and object_store and result_format == "parquet":
+                    upload = StreamingUpload(
+                        streaming_object_store(), request_id,
+                        Path(transform_request["safeOutputFileName"]), logger)
+                    upload.start()
+
+                try:
+                    result = slot.transform(transform_request)
+                except BaseException:
+                    if upload:
+                        upload.finish(False)
+                    raise
+
+                # Output that didn't make it to the object store is as good as lost
+                if upload and not upload.finish(result["status"] == "success"):
+                    result["status"] = "failure"
+
+                transform_request["status"] = result["status"]
+
+                # Newer watchers report the stats along with the result, otherwise
+                # read the transformer's stats document. Only scan the logs for
+                # transformers that don't write one, or to explain a failure.
+                transformer_stats = None
+                if result["status"] == "success":
+                    if "total-events" in result:
+                        transformer_stats = TransformerStats.from_result(result)
+                    else:
+                        transformer_stats = TransformerStats.from_stats_file(
+                            Path(transform_request["statsFile"]))
+                if not transformer_stats:
+                    transformer_stats = fill_stats_parser(
+                        transformer_capabilities["stats-parser"],
+                        Path(transform_request["logFile"]),
+                    )
+                if result["status"] == "success":
+                    rec = FileCompleteRecord(
+                        request_id=request_id,
+                        file_path=_file_path,
+                        file_id=file_id,
+                        status="success",
+                        total_time=time.time() - total_time,
+                        total_events=transformer_stats.total_events,
+                        total_bytes=transformer_stats.file_size,
+                    )
 
-            science_container.confirm()
+                    if upload:
+                        # The stats can't tell the size of a FIFO
+                        rec.output_object = upload.object_name
+                        rec.total_bytes = upload.bytes_uploaded
+                        report_file_complete(servicex, rec)
+                    elif object_store:
+                        upload_queue.put(
+                            WorkQueueItem(
+                                Path(transform_request["safeOutputFileName"]), servicex, rec
+                            )
+                        )
+                    else:
+                        report_file_complete(servicex, rec)
+
+                    transform_success = True
+                    ts = {
+                        "requestId": request_id,
+                        "file-size": transformer_stats.file_size,
+                        "total-events": transformer_stats.total_events,
+                        "slot": slot.index,
+                        "place": PLACE,
+                    }
+                    if "timings" in result:
+                        ts["timings"] = result["timings"]
+                    logger.info("Transformer stats.", extra=ts)
+                    break
+
+                if "error-class" in result:
+                    transformer_stats.error_class = result["error-class"]
 
         # If none of the replicas resulted in a successful transform then we have
         # a hard failure with this file.
@@ -244,6 +317,7 @@ def transform_file(
                 "file-id": file_id,
                 "place": PLACE,
                 "log_body": transformer_stats.log_body,
+                "error-class": transformer_stats.error_class,
             }
             logger.error(f"Hard Failure: {transformer_stats.error_info}", extra=hf)
 
@@ -257,7 +331,7 @@ def transform_file(
                 total_events=0,
                 total_bytes=0,
             )
-            servicex.put_file_complete(rec)
+            report_file_complete(servicex, rec)
 
         stop_process_info = get_process_info()
         elapsed_times = TimeTuple(
@@ -280,6 +354,9 @@ def transform_file(
 
     except ScienceContainerException:
         logger.exception("Science container not responding. Shutting down this transformer.")
+        if slots > 1:
+            # Tasks run in worker threads here, where sys.exit only ends the thread
+            os._exit(0)
         sys.exit(0)
     except Exception as error:
         logger.exception(f"Received exception doing transform: {error}")
@@ -292,6 +369,75 @@ def transform_file(
             total_events=0,
             total_bytes=0,
         )
+        report_file_complete(servicex, rec)
+
+
+@shared_task(acks_late=True)
+def transform_files(
+        request_id,
+        files: list[tuple[int, list[str]]],
+        service_endpoint,
+        result_destination,
+        result_format):
+    """
+    Transform a batch of small files delivered in a single message. The request
+    metadata is sent once for the whole batch, and each file is transformed and
+    reported exactly as if it had arrived in its own transform_file message.
+
+    The message is only acknowledged once the whole batch is done, so if the
+    transformer dies part way through, the batch is redelivered in full and the
+    files already reported are transformed again. ServiceX only records the
+    first result of each file, so the repeated reports are ignored.
+
+    If prefetching is enabled, the files after the current one are copied to
+    the shared volume, within the staging budget, while it is transformed.
+    Files are given as (file_id, paths) or (file_id, paths, file_size).
+    """
+    logger.info(
+        "got batch of transform requests.",
+        extra={
+            "requestId": request_id,
+            "num-files": len(files),
+            "place": PLACE,
+        },
+    )
+    for index, (file_id, paths, *_) in enumerate(files):
+        staged_paths = None
+        if prefetcher:
+            staged_paths = prefetcher.take(file_id)
+
+            # Stage whichever of the following files fit in the budget
+            for next_id, next_paths, *size in files[index + 1:]:
+                replicas = prepend_xcache(prioritize_replicas(next_paths))
+                prefetcher.prefetch(next_id, replicas, size[0] if size else None)
+
+        try:
+            transform_file(request_id, file_id, paths, service_endpoint,
+                           result_destination, result_format, staged_paths=staged_paths)
+        finally:
+            if prefetcher:
+                prefetcher.release(file_id)
+
+
+def streaming_object_store() -> ObjectStoreManager:
+    """
+    Object store client for streaming uploads. Created on first use in the
+    process that runs the tasks, since it isn't safe to share across a fork
+    """
+    global stream_store
+    if not stream_store:
+        stream_store = ObjectStoreManager()
+    return stream_store
+
+
+def report_file_complete(servicex: ServiceXAdapter, rec: FileCompleteRecord) -> None:
+    """
+    Send the file complete record to ServiceX, either via the batching reporter
+    if it is running, or directly
+    """
+    if report_queue:
+        report_queue.put(ReportQueueItem(servicex.server_endpoint, rec))
+    else:
         servicex.put_file_complete(rec)
 
 
@@ -326,16 +472,94 @@ def read_capabilities_file() -> dict[str, str]:
         os.path.join(shared_dir, "transformer_capabilities.json")
     )
     while not capabilities_file_path.is_file():
-        time.sleep(1)
+        time.sleep(0.1)
 
     with open(capabilities_file_path) as capabilities_file:
         return json.load(capabilities_file)
 
 
+def copy_scripts(shared_dir: str) -> None:
+    os.makedirs(shared_dir, exist_ok=True)
+
+    # create scripts dir for access by science container
+    scripts_path = os.path.join(shared_dir, "scripts")
+    os.makedirs(scripts_path, exist_ok=True)
+    shutil.copy("scripts/watch.sh", scripts_path)
+    shutil.copy("scripts/watch.py", scripts_path)
+    shutil.copy("scripts/proxy-exporter.sh", scripts_path)
+
+
+def wait_for_binding(args: Union[Namespace, SimpleNamespace]) -> None:
+    """
+    A warm pool transformer is started before there is a request for it. Wait
+    on its pool queue for ServiceX to bind it to a request.
+
+    The binding is kept in the shared volume, which outlives the containers of
+    the pod, before the message is acknowledged. A sidecar that restarts after
+    being bound takes the binding from there rather than going back to the
+    pool queue.
+    """
+    copy_scripts(args.shared_dir)
+
+    binding_file = os.path.join(args.shared_dir, BINDING_FILE_NAME)
+    if os.path.isfile(binding_file):
+        with open(binding_file) as f:
+            binding = json.load(f)
+        logger.info("Resuming binding.", extra={"requestId": binding["request-id"],
+                                                "place": PLACE})
+        apply_binding(args, binding)
+        return
+
+    logger.info("Waiting for a request.", extra={"queue": args.pool_queue, "place": PLACE})
+    with kombu.Connection(args.rabbit_uri) as connection:
+        queue = connection.SimpleQueue(
+            args.pool_queue, queue_opts={"durable": False, "auto_delete": True})
+        message = queue.get(block=True)
+        binding = message.payload
+        with open(binding_file + ".tmp", "w") as f:
+            json.dump(binding, f)
+        os.rename(binding_file + ".tmp", binding_file)
+        message.ack()
+        queue.close()
+
+    apply_binding(args, binding)
+
+
+def apply_binding(args: Union[Namespace, SimpleNamespace], binding: dict) -> None:
+    """
+    Take on the request in the binding: write out its generated code and tell
+    the science container, which is waiting for bind.env, how to run it
+    """
+    args.request_id = binding["request-id"]
+    args.result_destination = binding["result-destination"]
+    args.result_format = binding["result-format"]
+
+    os.makedirs(args.generated_dir, exist_ok=True)
+    for name, content in binding["generated-code"].items():
+        with open(os.path.join(args.generated_dir, os.path.basename(name)), "wb") as f:
+            f.write(base64.b64decode(content))
+
+    # Spare init waiting for the science container to copy this over
+    capabilities = os.path.join(args.generated_dir, "transformer_capabilities.json")
+    if os.path.isfile(capabilities):
+        shutil.copy(capabilities, args.shared_dir)
+
+    # Publish with a rename so the science container never reads half of it
+    bind_env = os.path.join(args.shared_dir, "bind.env")
+    with open(bind_env + ".tmp", "w") as f:
+        f.write(f"REQUEST_ID={shlex.quote(args.request_id)}\n")
+        f.write(f"TRANSFORMER_LANGUAGE={shlex.quote(binding['transformer-language'])}\n")
+        f.write(f"TRANSFORMER_COMMAND={shlex.quote(binding['transformer-command'])}\n")
+    os.rename(bind_env + ".tmp", bind_env)
+
+    logger.info("Bound to request.", extra={"requestId": args.request_id, "place": PLACE})
+
+
 def init(args: Union[Namespace, SimpleNamespace], app: Celery) -> None:
     global convert_root_to_parquet, startup_time, upload_queue, \
         object_store, posix_path, science_container, uploader, \
-        shared_dir, transformer_capabilities, request_id, celery_app
+        shared_dir, transformer_capabilities, request_id, celery_app, \
+        report_queue, reporter, prefetcher, slots, stream_uploads
 
     shared_dir = args.shared_dir
     request_id = args.request_id
@@ -348,13 +572,7 @@ def init(args: Union[Namespace, SimpleNamespace], app: Celery) -> None:
         object_store = None
         posix_path = args.output_dir
 
-    os.makedirs(shared_dir, exist_ok=True)
-
-    # create scripts dir for access by science container
-    scripts_path = os.path.join(shared_dir, "scripts")
-    os.makedirs(scripts_path, exist_ok=True)
-    shutil.copy("scripts/watch.sh", scripts_path)
-    shutil.copy("scripts/proxy-exporter.sh", scripts_path)
+    copy_scripts(shared_dir)
 
     transformer_capabilities = read_capabilities_file()
 
@@ -376,8 +594,48 @@ def init(args: Union[Namespace, SimpleNamespace], app: Celery) -> None:
         },
     )
 
-    science_container = ScienceContainerCommand()
-    logger.debug("Connected to science container", extra={"place": PLACE})
+    slots = args.slots
+    science_container = ScienceContainerPool(slots)
+    logger.debug("Connected to science container", extra={"slots": slots, "place": PLACE})
+
+    stream_uploads = args.stream_uploads
+    if stream_uploads and convert_root_to_parquet:
+        logger.info("Transformer writes ROOT files, which can't be streamed to the "
+                    "object store.", extra={"place": PLACE})
+
+    if args.prefetch_bytes > 0:
+        prefetcher = FilePrefetcher(staging_dir=os.path.join(shared_dir, "staging"),
+                                    budget_bytes=args.prefetch_bytes,
+                                    logger=logger)
+    else:
+        prefetcher = None
+
+    if args.report_batch_size > 1:
+        # Create a queue to collect file complete records to be reported in batches
+        report_queue = Queue()
+
+        # A spool dir shared between pods holds a spool file for each of them
+        if args.report_spool_dir:
+            spool_dir = args.report_spool_dir
+            pod_name = os.getenv("POD_NAME", socket.gethostname())
+            spool_name = f"file-complete-spool-{pod_name}.jsonl"
+        else:
+            spool_dir = shared_dir
+            spool_name = SPOOL_FILE_NAME
+
+        reporter = FileCompleteReporter(
+            input_queue=report_queue,
+            logger=logger,
+            spool_dir=spool_dir,
+            batch_size=args.report_batch_size,
+            flush_interval=args.report_flush_interval,
+            spool_name=spool_name,
+        )
+
+        reporter.start()
+    else:
+        report_queue = None
+        reporter = None
 
     if object_store:
         # Create a queue to communicate with the ObjectStore uploader
@@ -388,14 +646,20 @@ def init(args: Union[Namespace, SimpleNamespace], app: Celery) -> None:
             input_queue=upload_queue,
             logger=logger,
             convert_root_to_parquet=convert_root_to_parquet,
+            report_queue=report_queue,
         )
 
         uploader.start()
 
+    # Process as many files at once as the science container has slots. The
+    # slots are connections held by this process, so several of them can
+    # only be shared by worker threads.
+    worker_argv = ["worker", f"--concurrency={slots}"]
+    if slots > 1:
+        worker_argv.append("--pool=threads")
+
     app.worker_main(
-        argv=[
-            "worker",
-            "--concurrency=1",  # Don't allow multiple files to be processed at once
+        argv=worker_argv + [
             "--without-mingle",
             "--without-gossip",
             "--without-heartbeat",
@@ -500,6 +764,9 @@ if __name__ == "__main__":  # pragma: no cover
 
     parser = TransformerArgumentParser(description="ServiceX Transformer")
     _args = parser.parse_args()
+    if _args.pool_queue:
+        wait_for_binding(_args)
+
     app = Celery("transformer_sidecar", broker=_args.rabbit_uri)
     app.conf.task_queues = [
         kombu.Queue(name=f"transformer-{_args.request_id}",
@@ -518,6 +785,14 @@ if __name__ == "__main__":  # pragma: no cover
     )
     science_container.close()
 
+    if prefetcher:
+        prefetcher.shutdown()
+
     upload_queue.put(WorkQueueItem(None, None))
     uploader.join()  # Wait for the uploader to finish completely
+
+    # The uploader may have queued up more reports, so stop the reporter last
+    if reporter:
+        report_queue.put(ReportQueueItem(None))
+        reporter.join()
     exit(0)
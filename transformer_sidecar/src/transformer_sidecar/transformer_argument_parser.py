@@ -65,6 +65,50 @@ class TransformerArgumentParser(argparse.ArgumentParser):
         self.add_argument('--request-id', dest='request_id', action='store',
                           default=None, help='Request ID to read from queue')
 
+        self.add_argument('--report-batch-size', dest='report_batch_size',
+                          action='store', default=1, type=int,
+                          help='Number of file complete reports to send to ServiceX '
+                               'in a single call. 1 reports each file immediately')
+
+        self.add_argument('--report-flush-interval', dest='report_flush_interval',
+                          action='store', default=5.0, type=float,
+                          help='Max seconds to hold file complete reports before '
+                               'sending them to ServiceX')
+
+        self.add_argument('--report-spool-dir', dest='report_spool_dir',
+                          action='store', default=None,
+                          help='Directory shared by the transformers to spool file '
+                               'complete reports in, so reports of a pod that is lost '
+                               'are delivered by another. Defaults to the shared dir, '
+                               'which only survives sidecar restarts')
+
+        self.add_argument('--prefetch-bytes', dest='prefetch_bytes',
+                          action='store', default=0, type=int,
+                          help='Copy upcoming files of a batch to the shared volume '
+                               'while the current one is transformed, staging at most '
+                               'this many bytes. 0 disables prefetching')
+
+        self.add_argument('--stream-uploads', dest='stream_uploads',
+                          action='store_true', default=False,
+                          help='Upload parquet output to the object store while the '
+                               'transformer writes it, through a FIFO in place of the '
+                               'output file')
+
+        self.add_argument('--slots', dest='slots', action='store',
+                          default=1, type=int,
+                          help='Number of watch.sh workers the science container runs. '
+                               'That many files are transformed at once')
+
+        self.add_argument('--pool-queue', dest='pool_queue', action='store',
+                          default=None,
+                          help='Start as an idle warm pool transformer, waiting on '
+                               'this queue to be bound to a request')
+
+        self.add_argument('--generated-dir', dest='generated_dir', action='store',
+                          default='/generated',
+                          help='Directory to write the generated code of the request '
+                               'a warm pool transformer is bound to')
+
     @classmethod
     def extract_attr_list(cls, attr_names):
         return list(map(lambda b: b.strip(), attr_names.split(",")))
@@ -25,6 +25,7 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
 from pathlib import Path
 from typing import Optional
 
@@ -35,8 +36,33 @@ class TransformerStats:
             with open(log_path, encoding="utf8", errors='ignore') as log:
                 self.log_body = log.read()
         else:
-            print("File does not exist:", log_path)
+            if log_path:
+                print("File does not exist:", log_path)
             self.log_body = ""
         self.total_events = 0
         self.file_size = 0
         self.error_info = "Unable to determine error cause. Please consult log files"
+        self.error_class = None
+
+    @staticmethod
+    def from_result(result: dict) -> "TransformerStats":
+        """
+        Stats the science container sent back with its result, so there is no
+        log to read
+        """
+        stats = TransformerStats()
+        stats.total_events = result.get("total-events") or 0
+        stats.file_size = result.get("output-bytes") or 0
+        stats.error_class = result.get("error-class")
+        return stats
+
+    @staticmethod
+    def from_stats_file(stats_path: Path) -> Optional["TransformerStats"]:
+        """
+        Read the JSON stats document the transformer wrote, if it wrote one
+        """
+        try:
+            with open(stats_path) as stats_file:
+                return TransformerStats.from_result(json.load(stats_file))
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,192 @@
+# Copyright (c) 2024, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from queue import Queue
+
+import pytest
+
+from transformer_sidecar.file_complete_reporter import FileCompleteReporter, \
+    ReportQueueItem, SPOOL_FILE_NAME
+from transformer_sidecar.servicex_adapter import FileCompleteRecord
+
+ENDPOINT = "http://servicex/servicex/internal/transformation/123-456"
+
+
+@pytest.fixture
+def spool_dir():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
+
+@pytest.fixture
+def mock_servicex_adapter(mocker):
+    adapter = mocker.patch('transformer_sidecar.file_complete_reporter.ServiceXAdapter')
+    adapter.return_value.put_file_complete_batch.return_value = True
+    return adapter
+
+
+def file_complete_record(file_id: int) -> FileCompleteRecord:
+    return FileCompleteRecord(request_id="123-456",
+                              file_id=file_id,
+                              file_path=f"foo/bar/test{file_id}.root",
+                              status="success",
+                              total_time=1234,
+                              total_events=1234,
+                              total_bytes=1234)
+
+
+def make_reporter(queue: Queue, spool_dir: str, batch_size=2, flush_interval=60.0,
+                  **kwargs):
+    return FileCompleteReporter(input_queue=queue,
+                                logger=logging.getLogger(),
+                                spool_dir=spool_dir,
+                                batch_size=batch_size,
+                                flush_interval=flush_interval,
+                                **kwargs)
+
+
+def sent_file_ids(mock_servicex_adapter) -> list[list[int]]:
+    return [[rec.file_id for rec in call[0][0]] for call in
+            mock_servicex_adapter.return_value.put_file_complete_batch.call_args_list]
+
+
+def test_batches_by_size(mock_servicex_adapter, spool_dir):
+    queue = Queue()
+    reporter = make_reporter(queue, spool_dir, batch_size=2)
+
+    # The uploader uses a multiprocessing.Process, so we just call the method directly
+    # with the queue filled with the records and a termination signal.
+    for file_id in range(1, 6):
+        queue.put(ReportQueueItem(ENDPOINT, file_complete_record(file_id)))
+    queue.put(ReportQueueItem(None))
+    reporter.service_work_queue()
+
+    mock_servicex_adapter.assert_called_once_with(ENDPOINT)
+    assert sent_file_ids(mock_servicex_adapter) == [[1, 2], [3, 4], [5]]
+
+    # Everything was delivered, so nothing is left in the spool
+    assert Path(spool_dir, SPOOL_FILE_NAME).read_text() == ""
+
+
+def test_flush_on_interval(mock_servicex_adapter, spool_dir):
+    queue = Queue()
+    reporter = make_reporter(queue, spool_dir, batch_size=100, flush_interval=0.0)
+
+    queue.put(ReportQueueItem(ENDPOINT, file_complete_record(1)))
+    queue.put(ReportQueueItem(ENDPOINT, file_complete_record(2)))
+    queue.put(ReportQueueItem(None))
+    reporter.service_work_queue()
+
+    assert sent_file_ids(mock_servicex_adapter) == [[1], [2]]
+
+
+def test_failed_batch_is_spooled(mock_servicex_adapter, spool_dir):
+    mock_servicex_adapter.return_value.put_file_complete_batch.return_value = False
+
+    queue = Queue()
+    reporter = make_reporter(queue, spool_dir, batch_size=2)
+    queue.put(ReportQueueItem(ENDPOINT, file_complete_record(1)))
+    queue.put(ReportQueueItem(ENDPOINT, file_complete_record(2)))
+    queue.put(ReportQueueItem(None))
+    reporter.service_work_queue()
+
+    spool = Path(spool_dir, SPOOL_FILE_NAME).read_text().splitlines()
+    assert len(spool) == 2
+
+    # A restarted reporter picks up where the last one left off
+    mock_servicex_adapter.return_value.put_file_complete_batch.return_value = True
+    mock_servicex_adapter.return_value.put_file_complete_batch.reset_mock()
+
+    queue = Queue()
+    reporter = make_reporter(queue, spool_dir, batch_size=2)
+    queue.put(ReportQueueItem(None))
+    reporter.service_work_queue()
+
+    assert sent_file_ids(mock_servicex_adapter) == [[1, 2]]
+    assert Path(spool_dir, SPOOL_FILE_NAME).read_text() == ""
+
+
+def test_replay_skips_partial_record(mock_servicex_adapter, spool_dir):
+    queue = Queue()
+    reporter = make_reporter(queue, spool_dir)
+    reporter.add(ENDPOINT, file_complete_record(1))
+    with open(Path(spool_dir, SPOOL_FILE_NAME), "a") as spool:
+        spool.write('{"service-endpoint": "http://serv')
+
+    reporter = make_reporter(queue, spool_dir)
+    reporter.replay_spool()
+    assert [rec.file_id for rec in reporter.pending[ENDPOINT]] == [1]
+
+
+def test_adopt_orphaned_spool(mock_servicex_adapter, spool_dir):
+    mock_servicex_adapter.return_value.put_file_complete_batch.return_value = False
+
+    # A pod spooled two reports it couldn't deliver and then went away
+    queue = Queue()
+    lost = make_reporter(queue, spool_dir, spool_name="file-complete-spool-pod-a.jsonl")
+    queue.put(ReportQueueItem(ENDPOINT, file_complete_record(1)))
+    queue.put(ReportQueueItem(ENDPOINT, file_complete_record(2)))
+    queue.put(ReportQueueItem(None))
+    lost.service_work_queue()
+
+    # A live pod's spool is left alone
+    live = make_reporter(Queue(), spool_dir, spool_name="file-complete-spool-pod-b.jsonl")
+    live.add(ENDPOINT, file_complete_record(3))
+
+    lost_spool = Path(spool_dir, "file-complete-spool-pod-a.jsonl")
+    stale = time.time() - 600
+    os.utime(lost_spool, (stale, stale))
+
+    mock_servicex_adapter.return_value.put_file_complete_batch.return_value = True
+    mock_servicex_adapter.return_value.put_file_complete_batch.reset_mock()
+
+    queue = Queue()
+    reporter = make_reporter(queue, spool_dir, spool_name="file-complete-spool-pod-c.jsonl",
+                             orphan_seconds=300)
+    queue.put(ReportQueueItem(None))
+    reporter.service_work_queue()
+
+    assert sent_file_ids(mock_servicex_adapter) == [[1, 2]]
+    assert sorted(os.listdir(spool_dir)) == ["file-complete-spool-pod-b.jsonl",
+                                             "file-complete-spool-pod-c.jsonl"]
+    assert Path(spool_dir, "file-complete-spool-pod-c.jsonl").read_text() == ""
+
+
+def test_adopt_after_restart(mock_servicex_adapter, spool_dir):
+    # The sidecar was restarted after it had claimed an orphaned spool
+    reporter = make_reporter(Queue(), spool_dir, spool_name="file-complete-spool-pod-c.jsonl")
+    reporter.add(ENDPOINT, file_complete_record(1))
+    os.rename(Path(spool_dir, "file-complete-spool-pod-c.jsonl"),
+              Path(spool_dir, "file-complete-spool-pod-c.adopted-file-complete-spool-pod-a.jsonl"))
+
+    reporter = make_reporter(Queue(), spool_dir, spool_name="file-complete-spool-pod-c.jsonl")
+    assert reporter.adopt_orphaned_spools() == 1
+    assert os.listdir(spool_dir) == ["file-complete-spool-pod-c.jsonl"]
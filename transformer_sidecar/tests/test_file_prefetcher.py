@@ -0,0 +1,128 @@
+# Copyright (c) 2022, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import logging
+import os
+import tempfile
+
+import pytest
+
+from transformer_sidecar.file_prefetcher import FilePrefetcher
+
+REPLICA = "https://eospublic.cern.ch//eos/opendata/a.root"
+
+
+@pytest.fixture
+def staging_dir():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
+
+@pytest.fixture
+def mock_pool_manager(mocker):
+    pool_manager = mocker.patch('transformer_sidecar.file_prefetcher.urllib3.PoolManager')
+    response = pool_manager.return_value.request.return_value
+    response.status = 200
+    response.stream.return_value = [b"abc", b"def"]
+    return pool_manager
+
+
+def test_prefetch_http(staging_dir, mock_pool_manager):
+    prefetcher = FilePrefetcher(staging_dir, budget_bytes=100, logger=logging.getLogger())
+    assert prefetcher.prefetch(1, ["root://site/a.root", REPLICA], size=6)
+
+    staged = prefetcher.take(1)
+    assert list(staged) == [REPLICA]
+    with open(staged[REPLICA], "rb") as f:
+        assert f.read() == b"abcdef"
+    mock_pool_manager.return_value.request.assert_called_with(
+        "GET", REPLICA, preload_content=False)
+
+    prefetcher.release(1)
+    assert os.listdir(staging_dir) == []
+    prefetcher.shutdown()
+
+
+def test_prefetch_budget(staging_dir, mock_pool_manager):
+    prefetcher = FilePrefetcher(staging_dir, budget_bytes=100, logger=logging.getLogger())
+    assert prefetcher.prefetch(1, [REPLICA], size=60)
+    assert not prefetcher.prefetch(2, [REPLICA + "2"], size=60)
+    assert prefetcher.prefetch(3, [REPLICA + "3"], size=40)
+
+    # Staging a file twice doesn't count against the budget twice
+    assert prefetcher.prefetch(1, [REPLICA], size=60)
+
+    prefetcher.take(1)
+    prefetcher.release(1)
+    assert prefetcher.prefetch(2, [REPLICA + "2"], size=60)
+    assert prefetcher.take(4) is None
+    prefetcher.shutdown()
+
+
+def test_prefetch_unstageable(staging_dir, mocker):
+    mocker.patch('transformer_sidecar.file_prefetcher.shutil.which', return_value=None)
+    prefetcher = FilePrefetcher(staging_dir, budget_bytes=100, logger=logging.getLogger())
+
+    # No xrdcp to copy root:// replicas with, and local files are already local
+    assert not prefetcher.prefetch(1, ["root://site/a.root", "/data/a.root"], size=10)
+
+    # Files of unknown size can't be fitted in the budget
+    assert not prefetcher.prefetch(2, [REPLICA], size=None)
+    prefetcher.shutdown()
+
+
+def test_prefetch_xrdcp(staging_dir, mocker):
+    mocker.patch('transformer_sidecar.file_prefetcher.shutil.which',
+                 return_value="/usr/bin/xrdcp")
+
+    def xrdcp(args, check, timeout):
+        with open(args[-1], "w") as f:
+            f.write("root file")
+    mock_run = mocker.patch('transformer_sidecar.file_prefetcher.subprocess.run',
+                            side_effect=xrdcp)
+
+    prefetcher = FilePrefetcher(staging_dir, budget_bytes=100, logger=logging.getLogger())
+    assert prefetcher.prefetch(1, ["root://site//a.root"], size=10)
+    staged = prefetcher.take(1)
+
+    assert mock_run.call_args[0][0][:4] == ["/usr/bin/xrdcp", "--silent", "--force",
+                                            "root://site//a.root"]
+    assert os.path.isfile(staged["root://site//a.root"])
+    prefetcher.shutdown()
+
+
+def test_prefetch_failure(staging_dir, mock_pool_manager):
+    mock_pool_manager.return_value.request.return_value.status = 404
+    prefetcher = FilePrefetcher(staging_dir, budget_bytes=100, logger=logging.getLogger())
+    assert prefetcher.prefetch(1, [REPLICA], size=60)
+
+    # The file is read remotely instead, and nothing is left behind
+    assert prefetcher.take(1) is None
+    prefetcher.release(1)
+    assert os.listdir(staging_dir) == []
+    assert prefetcher.prefetch(2, [REPLICA + "2"], size=100)
+    prefetcher.shutdown()
@@ -76,3 +76,16 @@ class TestObjectStoreManager:
         result = ObjectStoreManager('localhost:9999', 'foo', 'bar')
         result.upload_file("my-bucket", "foo.txt", "/tmp/foo.txt")
         mock_minio.fput_object.assert_called()
+
+    def test_upload_stream(self, mocker):
+        import minio
+        mock_minio = mocker.MagicMock(minio.api.Minio)
+        mocker.patch('minio.Minio', return_value=mock_minio)
+        stream = mocker.Mock()
+        result = ObjectStoreManager('localhost:9999', 'foo', 'bar')
+        result.upload_stream("my-bucket", "foo.parquet", stream, 8 * 1024 * 1024)
+        mock_minio.put_object.assert_called_once_with(bucket_name="my-bucket",
+                                                      object_name="foo.parquet",
+                                                      data=stream,
+                                                      length=-1,
+                                                      part_size=8 * 1024 * 1024)
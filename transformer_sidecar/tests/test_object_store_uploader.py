@@ -83,6 +83,8 @@ def test_shutdown(servicex_adapter, file_complete_record, mocker):
         mock_object_store_manager.return_value.upload_file.assert_called_with("123-456",
                                                                               "bar.parquet",
                                                                               "/foo/bar.parquet")
+        servicex_adapter.put_file_complete.assert_called_once_with(file_complete_record)
+        assert file_complete_record.output_object == "bar.parquet"
 
 
 @pytest.mark.skip(reason="I need better test data")
@@ -25,13 +25,15 @@
 # CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
 import socket
+import struct
 from unittest.mock import MagicMock
 
 import pytest
 
 from transformer_sidecar.science_container_command import ScienceContainerCommand, \
-    ScienceContainerException
+    ScienceContainerException, ScienceContainerPool
 
 
 @pytest.fixture
@@ -103,3 +105,122 @@ def test_close(mock_socket):
     scc.close()
     scc.conn.close.assert_called_once()
     scc.serv.close.assert_called_once()
+
+
+def test_pool_accepts_a_connection_per_slot(mock_socket):
+    mock_socket_instance = mock_socket.return_value
+
+    pool = ScienceContainerPool(3)
+
+    mock_socket_instance.bind.assert_called_once_with(("localhost", 8081))
+    mock_socket_instance.listen.assert_called_once_with(3)
+    assert mock_socket_instance.accept.call_count == 3
+    assert [slot.log_name for slot in pool.slots] == \
+        ["slot-0.log", "slot-1.log", "slot-2.log"]
+
+
+def test_pool_single_slot_log(mock_socket):
+    pool = ScienceContainerPool(1)
+    assert pool.slots[0].log_name == "abc.log"
+
+
+def test_pool_acquire(mock_socket):
+    pool = ScienceContainerPool(2)
+
+    with pool.acquire() as first:
+        with pool.acquire() as second:
+            assert first is not second
+            assert pool.idle.empty()
+
+    assert pool.idle.qsize() == 2
+
+
+def test_pool_drops_broken_slot(mock_socket):
+    pool = ScienceContainerPool(2)
+
+    with pytest.raises(ScienceContainerException):
+        with pool.acquire():
+            raise ScienceContainerException("problem in getting GeT")
+
+    with pytest.raises(ValueError):
+        with pool.acquire():
+            raise ValueError()
+
+    assert pool.idle.qsize() == 1
+
+
+def test_pool_close(mock_socket):
+    mock_socket.return_value.accept.side_effect = [(MagicMock(), MagicMock()),
+                                                   (MagicMock(), MagicMock())]
+    pool = ScienceContainerPool(2)
+    pool.close()
+    for slot in pool.slots:
+        slot.conn.send.assert_called_once_with(b"stop.\n")
+        slot.conn.close.assert_called_once()
+    mock_socket.return_value.close.assert_called_once()
+
+
+def _frame(message):
+    body = json.dumps(message).encode()
+    return struct.pack(">I", len(body)) + body
+
+
+def _receive(*chunks):
+    # Like a socket, hand out each chunk across as many reads as it takes
+    pending = list(chunks)
+
+    def recv(size):
+        if not pending:
+            return b""
+        chunk = pending.pop(0)
+        if len(chunk) > size:
+            pending.insert(0, chunk[size:])
+        return chunk[:size]
+    return recv
+
+
+def test_transform_legacy_protocol(mock_socket):
+    scc = ScienceContainerCommand()
+    scc.conn.recv.side_effect = _receive(b"GeT\n", b"success.\n")
+
+    assert scc.transform({"foo": "bar"}) == {"status": "success"}
+    assert scc.protocol == 1
+    assert scc.conn.send.call_args_list[0][0][0] == b'{"foo": "bar"}\n'
+    scc.conn.send.assert_called_with(b"confirmed.\n")
+
+    # Later files wait for the next GeT
+    scc.conn.recv.side_effect = _receive(b"GeT\n", b"failure.\n")
+    assert scc.transform({"foo": "baz"}) == {"status": "failure"}
+
+
+def test_transform_framed_protocol(mock_socket):
+    scc = ScienceContainerCommand()
+    result = {"status": "success", "total-events": 42, "output-bytes": 1024}
+    hello = _frame({"type": "hello", "protocol": 2})
+    reply = _frame(result)
+
+    # Frames may be split and coalesced any which way
+    stream = hello + reply
+    scc.conn.recv.side_effect = _receive(stream[:3], stream[3:10], stream[10:-3], stream[-3:])
+
+    assert scc.transform({"foo": "bar"}) == result
+    assert scc.protocol == 2
+    scc.conn.sendall.assert_called_once_with(_frame({"foo": "bar", "type": "transform"}))
+    scc.conn.send.assert_not_called()
+
+    scc.close()
+    scc.conn.sendall.assert_called_with(_frame({"type": "stop"}))
+
+
+def test_transform_unsupported_protocol(mock_socket):
+    scc = ScienceContainerCommand()
+    scc.conn.recv.side_effect = _receive(_frame({"type": "hello", "protocol": 99}))
+    with pytest.raises(ScienceContainerException):
+        scc.transform({"foo": "bar"})
+
+
+def test_transform_connection_closed(mock_socket):
+    scc = ScienceContainerCommand()
+    scc.conn.recv.side_effect = _receive(_frame({"type": "hello", "protocol": 2})[:6])
+    with pytest.raises(ScienceContainerException):
+        scc.transform({"foo": "bar"})
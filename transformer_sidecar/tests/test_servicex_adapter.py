@@ -90,3 +90,71 @@ class TestServiceXAdapter:
         assert caplog.records[0].msg == '%s, retrying in %s seconds...'
         assert caplog.records[1].levelno == logging.INFO
         assert caplog.records[1].msg == "Put file complete."
+
+    def test_put_file_complete_batch(self, mocker, caplog):
+        import requests
+        caplog.set_level(logging.INFO)
+        mock_session = mocker.MagicMock(requests.session)
+        mock_session.mount = mocker.Mock()
+        mock_session.put = mocker.Mock(return_value=mocker.Mock(status_code=200))
+        mocker.patch('requests.session', return_value=mock_session)
+
+        adapter = ServiceXAdapter("http://foo.com")
+        recs = [FileCompleteRecord("42", "my-root.root", 42, "success", 1, 2, 3),
+                FileCompleteRecord("42", "my-other.root", 43, "failure", 1, 0, 0)]
+
+        assert adapter.put_file_complete_batch(recs)
+        mock_session.put.assert_called_once()
+        args = mock_session.put.call_args
+        assert args[0][0] == 'http://foo.com/file-complete-batch'
+        docs = args[1]['json']
+        assert [doc['file-id'] for doc in docs] == [42, 43]
+        assert [doc['status'] for doc in docs] == ['success', 'failure']
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].msg == "Put file complete batch."
+
+    def test_put_file_complete_batch_empty(self, mocker):
+        import requests
+        mock_session = mocker.MagicMock(requests.session)
+        mock_session.mount = mocker.Mock()
+        mock_session.put = mocker.Mock()
+        mocker.patch('requests.session', return_value=mock_session)
+
+        adapter = ServiceXAdapter("http://foo.com")
+        assert adapter.put_file_complete_batch([])
+        mock_session.put.assert_not_called()
+
+    def test_put_file_complete_batch_server_error(self, mocker):
+        import requests
+        mock_session = mocker.MagicMock(requests.session)
+        mock_session.mount = mocker.Mock()
+        mock_session.put = mocker.Mock(return_value=mocker.Mock(status_code=503))
+        mocker.patch('requests.session', return_value=mock_session)
+
+        adapter = ServiceXAdapter("http://foo.com")
+        rec = FileCompleteRecord("42", "my-root.root", 42, "success", 1, 2, 3)
+        assert not adapter.put_file_complete_batch([rec])
+
+    def test_put_file_complete_batch_connection_error(self, mocker):
+        import requests
+        mock_session = mocker.MagicMock(requests.session)
+        mock_session.mount = mocker.Mock()
+        mock_session.put = mocker.Mock(side_effect=requests.exceptions.ConnectionError)
+        mocker.patch('requests.session', return_value=mock_session)
+        mocker.patch('transformer_sidecar.servicex_adapter.RETRY_DELAY', 0)
+
+        adapter = ServiceXAdapter("http://foo.com")
+        rec = FileCompleteRecord("42", "my-root.root", 42, "success", 1, 2, 3)
+        assert not adapter.put_file_complete_batch([rec])
+
+    def test_file_complete_record_round_trip(self):
+        rec = FileCompleteRecord("42", "my-root.root", 43, "success", 1, 2, 3)
+        copy = FileCompleteRecord.from_json(rec.to_json())
+        assert copy.to_json() == rec.to_json()
+
+    def test_file_complete_record_output_object(self):
+        rec = FileCompleteRecord("42", "my-root.root", 43, "success", 1, 2, 3,
+                                 output_object="my-root.parquet")
+        assert rec.to_json()['output-object'] == "my-root.parquet"
+        assert FileCompleteRecord.from_json(rec.to_json()).output_object == "my-root.parquet"
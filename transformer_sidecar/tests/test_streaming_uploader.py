@@ -0,0 +1,146 @@
+# Copyright (c) 2022, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import logging
+import os
+import threading
+
+import pytest
+
+from transformer_sidecar.streaming_uploader import StreamingUpload, StreamingUploadAborted
+
+
+class FakeObjectStore:
+    """
+    Reads the stream in parts the way the minio client does
+    """
+    def __init__(self, error=None):
+        self.parts = []
+        self.error = error
+        self.completed = False
+
+    def upload_stream(self, bucket, object_name, stream, part_size):
+        self.bucket, self.object_name = bucket, object_name
+        while True:
+            part = stream.read(part_size)
+            if not part:
+                break
+            self.parts.append(part)
+        if self.error:
+            raise self.error
+        self.completed = True
+
+
+def _write(path, data):
+    with open(path, "wb") as fifo:
+        fifo.write(data)
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger(__name__)
+
+
+def test_streaming_upload(tmp_path, logger):
+    store = FakeObjectStore()
+    output = tmp_path / "out.parquet"
+    upload = StreamingUpload(store, "my-bucket", output, logger, part_size=1024)
+    upload.start()
+
+    writer = threading.Thread(target=_write, args=(output, b"x" * 5000))
+    writer.start()
+    writer.join()
+
+    assert upload.finish(True)
+    assert store.completed
+    assert store.bucket == "my-bucket"
+    assert store.object_name == "out.parquet"
+    assert b"".join(store.parts) == b"x" * 5000
+    assert upload.bytes_uploaded == 5000
+    assert not os.path.exists(output)
+
+
+def test_streaming_upload_failed_transform(tmp_path, logger):
+    store = FakeObjectStore()
+    output = tmp_path / "out.parquet"
+    upload = StreamingUpload(store, "my-bucket", output, logger, part_size=1024)
+    upload.start()
+
+    # The transformer got part way through before it died
+    _write(output, b"x" * 100)
+
+    assert not upload.finish(False)
+    assert not store.completed
+    assert isinstance(upload.error, StreamingUploadAborted)
+    assert not os.path.exists(output)
+
+
+def test_streaming_upload_never_opened(tmp_path, logger):
+    store = FakeObjectStore()
+    output = tmp_path / "out.parquet"
+    upload = StreamingUpload(store, "my-bucket", output, logger)
+    upload.start()
+
+    assert not upload.finish(False)
+    assert not store.completed
+
+
+def test_streaming_upload_error(tmp_path, logger):
+    store = FakeObjectStore(error=IOError("connection reset"))
+    output = tmp_path / "out.parquet"
+    output.write_bytes(b"stale")
+    upload = StreamingUpload(store, "my-bucket", output, logger)
+    upload.start()
+
+    _write(output, b"x" * 100)
+
+    assert not upload.finish(True)
+    assert str(upload.error) == "connection reset"
+
+
+def test_streaming_upload_parquet_writer(tmp_path, logger):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    store = FakeObjectStore()
+    output = tmp_path / "out.parquet"
+    upload = StreamingUpload(store, "my-bucket", output, logger, part_size=1024)
+    upload.start()
+
+    # Written the way the transformer templates do, through a file object,
+    # since ParquetWriter seeks in a file it opens from a path
+    table = pa.table({"x": list(range(1000))})
+    with open(output, "wb") as wfile, pa.PythonFile(wfile, mode="w") as sink:
+        writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+        output_size = sink.tell()
+
+    assert upload.finish(True)
+    assert store.completed
+    assert upload.bytes_uploaded == output_size
+    assert pq.read_table(pa.BufferReader(b"".join(store.parts))).equals(table)
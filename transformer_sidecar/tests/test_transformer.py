@@ -26,18 +26,20 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import contextlib
+import base64
 import json
 import os
 import random
+import shutil
 import signal
 import tempfile
 from pathlib import PosixPath
 from types import SimpleNamespace
 
-from pytest import fixture
+from pytest import fixture, raises
 
-from transformer_sidecar.transformer import init, transform_file, prioritize_replicas, \
-    prepend_xcache
+from transformer_sidecar.transformer import init, transform_file, transform_files, \
+    prioritize_replicas, prepend_xcache, wait_for_binding
 
 # Test data
 test_request_id = "test-request-123"
@@ -85,7 +87,14 @@ def mock_object_store_uploader(mocker):
 
 @fixture
 def mock_science_container(mocker):
-    return mocker.patch('transformer_sidecar.transformer.ScienceContainerCommand')
+    # A single slot pool that hands out itself as the slot
+    mock_pool = mocker.patch('transformer_sidecar.transformer.ScienceContainerPool')
+    slot = mock_pool.return_value
+    slot.index = 0
+    slot.log_name = "abc.log"
+    slot.acquire.return_value.__enter__.return_value = slot
+    slot.acquire.return_value.__exit__.return_value = False
+    return mock_pool
 
 
 @fixture
@@ -93,6 +102,11 @@ def mock_input_queue(mocker):
     return mocker.patch("transformer_sidecar.transformer.Queue")
 
 
+@fixture
+def mock_file_complete_reporter(mocker):
+    return mocker.patch('transformer_sidecar.transformer.FileCompleteReporter')
+
+
 @fixture
 def mock_servicex_adapter(mocker):
     return mocker.patch('transformer_sidecar.transformer.ServiceXAdapter')
@@ -107,6 +121,12 @@ def args():
         rabbit_uri='amqp://localhost',
         result_destination='object-store',
         result_format='root',
+        report_batch_size=1,
+        report_flush_interval=5.0,
+        report_spool_dir=None,
+        prefetch_bytes=0,
+        slots=1,
+        stream_uploads=False,
     )
 
 
@@ -123,6 +143,7 @@ def init_test(args, mock_celery, transformer_capabilities,
     scripts_dir = os.path.join(temp_dir, "scripts")
     assert os.path.isdir(scripts_dir)
     assert os.path.isfile(os.path.join(scripts_dir, 'watch.sh'))
+    assert os.path.isfile(os.path.join(scripts_dir, 'watch.py'))
     assert os.path.isfile(os.path.join(scripts_dir, 'proxy-exporter.sh'))
 
 
@@ -153,6 +174,199 @@ def test_transformer_init(args, mock_celery, transformer_capabilities,
         )
 
 
+def test_transformer_init_report_batching(args, mock_celery, transformer_capabilities,
+                                          mock_object_store_uploader,
+                                          mock_object_store_manager,
+                                          mock_science_container,
+                                          mock_file_complete_reporter):
+    with (tempfile.TemporaryDirectory() as temp_dir):
+        args.report_batch_size = 50
+        args.report_flush_interval = 2.5
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        mock_file_complete_reporter.assert_called_once()
+        reporter_args = mock_file_complete_reporter.call_args.kwargs
+        assert reporter_args["spool_dir"] == temp_dir
+        assert reporter_args["batch_size"] == 50
+        assert reporter_args["flush_interval"] == 2.5
+        assert reporter_args["spool_name"] == "file-complete-spool.jsonl"
+        mock_file_complete_reporter.return_value.start.assert_called_once()
+
+        # The uploader reports through the same queue as the reporter
+        object_store_uploader_args = mock_object_store_uploader.call_args.kwargs
+        assert object_store_uploader_args["report_queue"] is \
+            mock_file_complete_reporter.call_args.kwargs["input_queue"]
+
+
+def test_transformer_init_report_spool_dir(args, mock_celery, transformer_capabilities,
+                                           mock_object_store_uploader,
+                                           mock_object_store_manager,
+                                           mock_science_container,
+                                           mock_file_complete_reporter, monkeypatch):
+    with (tempfile.TemporaryDirectory() as temp_dir):
+        monkeypatch.setenv("POD_NAME", "transformer-1234-abc")
+        args.report_batch_size = 50
+        args.report_spool_dir = "/report-spool"
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        # Each pod spools to a file of its own on the shared volume
+        reporter_args = mock_file_complete_reporter.call_args.kwargs
+        assert reporter_args["spool_dir"] == "/report-spool"
+        assert reporter_args["spool_name"] == "file-complete-spool-transformer-1234-abc.jsonl"
+
+
+def test_transformer_init_slots(args, mock_celery, transformer_capabilities,
+                                mock_object_store_uploader, mock_object_store_manager,
+                                mock_science_container):
+    with (tempfile.TemporaryDirectory() as temp_dir):
+        args.slots = 3
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        mock_science_container.assert_called_once_with(3)
+        argv = mock_celery.worker_main.call_args.kwargs['argv']
+        assert "--concurrency=3" in argv
+        assert "--pool=threads" in argv
+
+
+def test_transform_file_slot_log(args, mock_celery, transformer_capabilities,
+                                 mock_servicex_adapter,
+                                 mock_object_store_uploader, mock_input_queue,
+                                 mock_object_store_manager,
+                                 mock_science_container, mocker):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        slot = mock_science_container.return_value
+        slot.log_name = "slot-2.log"
+        slot.transform.return_value = {"status": "success"}
+        stats_parser = mocker.patch('transformer_sidecar.transformer.fill_stats_parser')
+
+        transform_file(
+            request_id=test_request_id,
+            file_id=test_file_id,
+            paths=["site1:a.root"],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+
+        log_file = os.path.join(temp_dir, test_request_id, "slot-2.log")
+        assert slot.transform.call_args[0][0]["logFile"] == log_file
+        assert stats_parser.call_args[0][1] == PosixPath(log_file)
+
+
+def test_transform_file_result_stats(args, mock_celery, transformer_capabilities,
+                                     mock_servicex_adapter,
+                                     mock_object_store_uploader, mock_input_queue,
+                                     mock_object_store_manager,
+                                     mock_science_container, mocker):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        mock_science_container.return_value.transform.return_value = {
+            "status": "success", "total-events": 42, "output-bytes": 1024,
+            "timings": {"query": 1.5, "serialization": 0.25, "writing": 0.125}
+        }
+        stats_parser = mocker.patch('transformer_sidecar.transformer.fill_stats_parser')
+
+        transform_file(
+            request_id=test_request_id,
+            file_id=test_file_id,
+            paths=["site1:a.root"],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+
+        # No need to read the log when the stats come with the result
+        stats_parser.assert_not_called()
+        upload = mock_input_queue.return_value.put.call_args[0][0]
+        assert upload.rec.total_events == 42
+        assert upload.rec.total_bytes == 1024
+
+
+def test_transform_file_stats_file(args, mock_celery, transformer_capabilities,
+                                   mock_servicex_adapter,
+                                   mock_object_store_uploader, mock_input_queue,
+                                   mock_object_store_manager,
+                                   mock_science_container, mocker):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        # A watch.sh watcher only reports the status, the transformer wrote its stats
+        def transform(request):
+            with open(request["statsFile"], "w") as stats:
+                json.dump({"total-events": 42, "output-bytes": 1024}, stats)
+            return {"status": "success"}
+
+        mock_science_container.return_value.transform.side_effect = transform
+        stats_parser = mocker.patch('transformer_sidecar.transformer.fill_stats_parser')
+
+        transform_file(
+            request_id=test_request_id,
+            file_id=test_file_id,
+            paths=["site1:a.root"],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+
+        request = mock_science_container.return_value.transform.call_args[0][0]
+        assert request["statsFile"] == \
+            os.path.join(temp_dir, test_request_id, "abc.stats.json")
+        stats_parser.assert_not_called()
+        upload = mock_input_queue.return_value.put.call_args[0][0]
+        assert upload.rec.total_events == 42
+        assert upload.rec.total_bytes == 1024
+
+
+def test_transform_file_streaming_upload(args, mock_celery, transformer_capabilities,
+                                         mock_servicex_adapter,
+                                         mock_object_store_uploader, mock_input_queue,
+                                         mock_object_store_manager,
+                                         mock_science_container, mocker):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        args.stream_uploads = True
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'parquet')
+
+        mock_upload = mocker.patch('transformer_sidecar.transformer.StreamingUpload')
+        mock_upload.return_value.object_name = "site1:a.root.parquet"
+        mock_upload.return_value.bytes_uploaded = 4096
+        mock_upload.return_value.finish.side_effect = [False, True]
+        mock_science_container.return_value.transform.side_effect = \
+            lambda request: {"status": "success"}
+
+        transform_file(
+            request_id=test_request_id,
+            file_id=test_file_id,
+            paths=["site1:a.root", "site2:a.root"],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format="parquet"
+        )
+
+        # The first replica's upload failed, so the second one was tried
+        assert mock_upload.call_count == 2
+        assert mock_upload.call_args[0][2] == PosixPath(
+            os.path.join(temp_dir, test_request_id, "scratch", "site2:a.root.parquet"))
+        mock_upload.return_value.finish.assert_called_with(True)
+
+        # Reported straight away rather than handed to the uploader
+        mock_input_queue.return_value.put.assert_not_called()
+        rec = mock_servicex_adapter.return_value.put_file_complete.call_args[0][0]
+        assert rec.status == "success"
+        assert rec.file_path == "site2:a.root"
+        assert rec.output_object == "site1:a.root.parquet"
+        assert rec.total_bytes == 4096
+
+
 def test_transformer_root_to_parquet(args, mock_celery, transformer_capabilities,
                                      mock_servicex_adapter,
                                      mock_object_store_uploader, mock_input_queue,
@@ -166,8 +380,8 @@ def test_transformer_root_to_parquet(args, mock_celery, transformer_capabilities
         assert object_store_uploader_args["request_id"] == '1234'
         assert object_store_uploader_args["convert_root_to_parquet"] is True
 
-        mock_science_container.return_value.await_response.side_effect = ["failure",
-                                                                          "success."]
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "success"}]
 
         # Call the task
         transform_file(
@@ -179,7 +393,7 @@ def test_transformer_root_to_parquet(args, mock_celery, transformer_capabilities
             result_format="parquet"
         )
 
-        science_request = mock_science_container.return_value.send.call_args[0][0]
+        science_request = mock_science_container.return_value.transform.call_args[0][0]
         assert science_request["result-format"] == "root"
 
 
@@ -196,8 +410,8 @@ def test_transformer_parquet(args, mock_celery, transformer_capabilities,
         assert object_store_uploader_args["request_id"] == '1234'
         assert object_store_uploader_args["convert_root_to_parquet"] is False
 
-        mock_science_container.return_value.await_response.side_effect = ["failure",
-                                                                          "success."]
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "success"}]
 
         # Call the task
         transform_file(
@@ -209,7 +423,7 @@ def test_transformer_parquet(args, mock_celery, transformer_capabilities,
             result_format="parquet"
         )
 
-        science_request = mock_science_container.return_value.send.call_args[0][0]
+        science_request = mock_science_container.return_value.transform.call_args[0][0]
         assert science_request["result-format"] == "parquet"
 
 
@@ -223,8 +437,8 @@ def test_transformer_output_dir(args, mock_celery, transformer_capabilities,
         init_test(args, mock_celery, transformer_capabilities, temp_dir,
                   ['root', 'parquet'], 'parquet')
 
-        mock_science_container.return_value.await_response.side_effect = ["failure",
-                                                                          "success."]
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "success"}]
 
         # Call the task
         transform_file(
@@ -236,7 +450,7 @@ def test_transformer_output_dir(args, mock_celery, transformer_capabilities,
             result_format="parquet"
         )
 
-        science_request = mock_science_container.return_value.send.call_args[0][0]
+        science_request = mock_science_container.return_value.transform.call_args[0][0]
         assert science_request["safeOutputFileName"] == '/local/results/site2:file.root.parquet'
         mock_servicex_adapter.return_value.put_file_complete.assert_called_once()
         assert mock_servicex_adapter.return_value. \
@@ -256,8 +470,8 @@ def test_transformer_long_filename(args, mock_celery, transformer_capabilities,
         assert object_store_uploader_args["request_id"] == '1234'
         assert object_store_uploader_args["convert_root_to_parquet"] is False
 
-        mock_science_container.return_value.await_response.side_effect = ["failure",
-                                                                          "success."]
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "success"}]
 
         long_filename = "rootfile12"*300
         # Call the task
@@ -270,12 +484,93 @@ def test_transformer_long_filename(args, mock_celery, transformer_capabilities,
             result_format="parquet"
         )
 
-        science_request = mock_science_container.return_value.send.call_args[0][0]
+        science_request = mock_science_container.return_value.transform.call_args[0][0]
         assert science_request["safeOutputFileName"] != long_filename
         assert len(science_request["safeOutputFileName"]) - \
                len(os.path.join(args.shared_dir, test_request_id, 'scratch')) == 256
 
 
+def test_wait_for_binding(args, mocker):
+    mock_connection = mocker.patch('transformer_sidecar.transformer.kombu.Connection')
+    queue = mock_connection.return_value.__enter__.return_value.SimpleQueue.return_value
+    message = queue.get.return_value
+    message.payload = {
+        'request-id': '5678',
+        'result-destination': 'object-store',
+        'result-format': 'parquet',
+        'transformer-language': 'python',
+        'transformer-command': '/generated/transform_single_file.py',
+        'generated-code': {
+            'generated_transformer.py': base64.b64encode(b'import foo').decode('ascii'),
+            'transformer_capabilities.json': base64.b64encode(b'{}').decode('ascii')
+        }
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        args.shared_dir = os.path.join(temp_dir, 'shared')
+        args.generated_dir = os.path.join(temp_dir, 'generated')
+        args.pool_queue = 'transformer-pool-pod-1'
+
+        wait_for_binding(args)
+
+        mock_connection.assert_called_with('amqp://localhost')
+        mock_connection.return_value.__enter__.return_value.SimpleQueue.assert_called_with(
+            'transformer-pool-pod-1', queue_opts={"durable": False, "auto_delete": True})
+        message.ack.assert_called_once()
+
+        assert args.request_id == '5678'
+        assert args.result_format == 'parquet'
+
+        with open(os.path.join(args.generated_dir, 'generated_transformer.py')) as f:
+            assert f.read() == 'import foo'
+
+        assert os.path.isfile(os.path.join(args.shared_dir, 'transformer_capabilities.json'))
+
+        # The science container needs the scripts to be in place when it is bound
+        assert os.path.isfile(os.path.join(args.shared_dir, 'scripts', 'watch.sh'))
+        with open(os.path.join(args.shared_dir, 'bind.env')) as f:
+            assert f.read().splitlines() == [
+                'REQUEST_ID=5678',
+                'TRANSFORMER_LANGUAGE=python',
+                'TRANSFORMER_COMMAND=/generated/transform_single_file.py'
+            ]
+
+
+def test_wait_for_binding_after_restart(args, mocker):
+    mock_connection = mocker.patch('transformer_sidecar.transformer.kombu.Connection')
+    queue = mock_connection.return_value.__enter__.return_value.SimpleQueue.return_value
+    queue.get.return_value.payload = {
+        'request-id': '5678',
+        'result-destination': 'object-store',
+        'result-format': 'parquet',
+        'transformer-language': 'python',
+        'transformer-command': '/generated/transform_single_file.py',
+        'generated-code': {
+            'generated_transformer.py': base64.b64encode(b'import foo').decode('ascii')
+        }
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        args.shared_dir = os.path.join(temp_dir, 'shared')
+        args.generated_dir = os.path.join(temp_dir, 'generated')
+        args.pool_queue = 'transformer-pool-pod-1'
+        wait_for_binding(args)
+        assert os.path.isfile(os.path.join(args.shared_dir, 'binding.json'))
+
+        # The sidecar container restarts, the shared volume is still there
+        mock_connection.reset_mock()
+        shutil.rmtree(args.generated_dir)
+        restarted = SimpleNamespace(**vars(args))
+        restarted.request_id = None
+        wait_for_binding(restarted)
+
+        mock_connection.assert_not_called()
+        assert restarted.request_id == '5678'
+        assert restarted.result_format == 'parquet'
+        with open(os.path.join(restarted.generated_dir, 'generated_transformer.py')) as f:
+            assert f.read() == 'import foo'
+
+
 def test_hash_path():
     from transformer_sidecar.transformer import hash_path
 
@@ -295,7 +590,8 @@ def test_transform_file(args, mock_celery, transformer_capabilities,
         init_test(args, mock_celery, transformer_capabilities, temp_dir,
                   ['root', 'parquet'], 'root')
 
-        mock_science_container.return_value.await_response.side_effect = ["failure", "success."]
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "success"}]
 
         # Call the task
         transform_file(
@@ -322,6 +618,115 @@ def test_transform_file(args, mock_celery, transformer_capabilities,
         )
 
 
+def test_transform_files(args, mock_celery, transformer_capabilities,
+                         mock_servicex_adapter,
+                         mock_object_store_uploader, mock_input_queue,
+                         mock_object_store_manager,
+                         mock_science_container):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        mock_science_container.return_value.transform.return_value = {"status": "success"}
+
+        transform_files(
+            request_id=test_request_id,
+            files=[(1, ["site1:a.root"]), (2, ["site1:b.root"])],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+
+        uploads = [c[0][0] for c in mock_input_queue.return_value.put.call_args_list]
+        assert [u.rec.file_id for u in uploads] == [1, 2]
+        assert [u.rec.file_path for u in uploads] == ["site1:a.root", "site1:b.root"]
+        assert all(u.rec.status == "success" for u in uploads)
+
+
+def test_transform_files_redelivered(args, mock_celery, transformer_capabilities,
+                                     mock_servicex_adapter,
+                                     mock_object_store_uploader, mock_input_queue,
+                                     mock_object_store_manager,
+                                     mock_science_container):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        # The worker is stopped while transforming the second file of the batch
+        mock_science_container.return_value.transform.side_effect = [
+            {"status": "success"}, SystemExit(0),
+            {"status": "success"}, {"status": "success"}, {"status": "success"}
+        ]
+        batch = dict(
+            request_id=test_request_id,
+            files=[(1, ["site1:a.root"]), (2, ["site1:b.root"]), (3, ["site1:c.root"])],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+        with raises(SystemExit):
+            transform_files(**batch)
+
+        # The unacknowledged batch is delivered again and transformed in full.
+        # ServiceX ignores the second report of the first file
+        transform_files(**batch)
+
+        sent = [c.args[0]["file-path"]
+                for c in mock_science_container.return_value.transform.call_args_list]
+        assert sent == ["site1:a.root", "site1:b.root",
+                        "site1:a.root", "site1:b.root", "site1:c.root"]
+
+        uploads = [c[0][0] for c in mock_input_queue.return_value.put.call_args_list]
+        assert [u.rec.file_id for u in uploads] == [1, 1, 2, 3]
+
+
+def test_transform_files_prefetch(args, mock_celery, transformer_capabilities,
+                                  mock_servicex_adapter,
+                                  mock_object_store_uploader, mock_input_queue,
+                                  mock_object_store_manager,
+                                  mock_science_container, mocker):
+    mock_prefetcher = mocker.patch('transformer_sidecar.transformer.FilePrefetcher')
+    prefetcher = mock_prefetcher.return_value
+    prefetcher.take.side_effect = lambda file_id: \
+        {"https://site1/b.root": "/servicex/output/staging/b"} if file_id == 2 else None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        args.prefetch_bytes = 1000
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+        assert mock_prefetcher.call_args.kwargs["budget_bytes"] == 1000
+
+        mock_science_container.return_value.transform.return_value = {"status": "success"}
+
+        transform_files(
+            request_id=test_request_id,
+            files=[(1, ["https://site1/a.root"], 10),
+                   (2, ["https://site1/b.root"], 20),
+                   (3, ["https://site1/c.root"], 30)],
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+
+        # Each file stages the ones after it while it is transformed
+        assert [c.args for c in prefetcher.prefetch.call_args_list] == [
+            (2, ["https://site1/b.root"], 20),
+            (3, ["https://site1/c.root"], 30),
+            (3, ["https://site1/c.root"], 30)
+        ]
+        assert [c.args for c in prefetcher.release.call_args_list] == [(1,), (2,), (3,)]
+
+        sent = [c.args[0]["downloadPath"]
+                for c in mock_science_container.return_value.transform.call_args_list]
+        assert sent == ["https://site1/a.root", "/servicex/output/staging/b",
+                        "https://site1/c.root"]
+
+        # Results are still named and reported after the replica
+        uploads = [c[0][0] for c in mock_input_queue.return_value.put.call_args_list]
+        assert [u.rec.file_path for u in uploads] == \
+            ["https://site1/a.root", "https://site1/b.root", "https://site1/c.root"]
+
+
 def test_transform_file_hard_failure(args, mock_celery,
                                      transformer_capabilities,
                                      mock_servicex_adapter,
@@ -332,8 +737,8 @@ def test_transform_file_hard_failure(args, mock_celery,
         init_test(args, mock_celery, transformer_capabilities, temp_dir,
                   ['root', 'parquet'], 'root')
 
-        mock_science_container.return_value.await_response.side_effect = ["failure",
-                                                                          "failure"]
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "failure"}]
         transform_file(
             request_id=test_request_id,
             file_id=test_file_id,
@@ -357,6 +762,35 @@ def test_transform_file_hard_failure(args, mock_celery,
         assert failure_report.request_id == test_request_id
 
 
+def test_transform_file_hard_failure_report_batching(
+        args, mock_celery, transformer_capabilities, mock_servicex_adapter,
+        mock_object_store_uploader, mock_input_queue, mock_object_store_manager,
+        mock_science_container, mock_file_complete_reporter):
+    with (tempfile.TemporaryDirectory() as temp_dir):
+        args.report_batch_size = 50
+        init_test(args, mock_celery, transformer_capabilities, temp_dir,
+                  ['root', 'parquet'], 'root')
+
+        mock_servicex_adapter.return_value.server_endpoint = test_service_endpoint
+        mock_science_container.return_value.transform.side_effect = [{"status": "failure"},
+                                                                     {"status": "failure"}]
+        transform_file(
+            request_id=test_request_id,
+            file_id=test_file_id,
+            paths=test_paths,
+            service_endpoint=test_service_endpoint,
+            result_destination=test_result_destination,
+            result_format=test_result_format
+        )
+
+        # The failure goes to the reporter rather than straight to ServiceX
+        mock_servicex_adapter.return_value.put_file_complete.assert_not_called()
+        report = mock_input_queue.return_value.put.call_args[0][0]
+        assert report.service_endpoint == test_service_endpoint
+        assert report.rec.status == "failure"
+        assert report.rec.file_id == test_file_id
+
+
 def test_transform_file_exception(args, mock_celery,
                                   transformer_capabilities,
                                   mock_servicex_adapter,
@@ -367,7 +801,7 @@ def test_transform_file_exception(args, mock_celery,
         init_test(args, mock_celery, transformer_capabilities, temp_dir,
                   ['root', 'parquet'], 'root')
 
-        mock_science_container.return_value.await_response.side_effect = Exception("Test Exception")  # noqa E501
+        mock_science_container.return_value.transform.side_effect = Exception("Test Exception")
 
         transform_file(
             request_id=test_request_id,
@@ -56,6 +56,20 @@ class TestTransformerArgumentParser:
         assert args.result_format == 'arrow'
         assert args.rabbit_uri == "http://rabbit.org"
         assert args.request_id == "123-45-678"
+        assert args.report_batch_size == 1
+        assert args.report_flush_interval == 5.0
+
+    def test_parse_report_batching(self):
+        arg_parser = TransformerArgumentParser(description="Test Transformer")
+        sys.argv = ["foo",
+                    '--request-id', "123-45-678",
+                    '--report-batch-size', '50',
+                    '--report-flush-interval', '2.5'
+                    ]
+
+        args = arg_parser.parse_args()
+        assert args.report_batch_size == 50
+        assert args.report_flush_interval == 2.5
 
     def test_extract_attr_list(self):
         attrs = TransformerArgumentParser.extract_attr_list("a,b,c")
@@ -0,0 +1,120 @@
+# Copyright (c) 2022, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+WATCH_PY = Path(__file__).parent.parent / "scripts" / "watch.py"
+
+
+@pytest.fixture
+def watch():
+    spec = importlib.util.spec_from_file_location("watch", WATCH_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _transformer(tmp_path, body):
+    script = tmp_path / "transform.py"
+    script.write_text("import sys\n" + body)
+    return str(script)
+
+
+def _request(tmp_path):
+    return {
+        "downloadPath": "root://foo/bar.root",
+        "safeOutputFileName": str(tmp_path / "out.parquet"),
+        "result-format": "parquet",
+        "logFile": str(tmp_path / "slot-0.log"),
+    }
+
+
+def test_transform_success(watch, tmp_path):
+    cmd = _transformer(tmp_path, """
+open(sys.argv[2], "w").write("x" * 10)
+print("Detailed transformer times. query_time:1.5 serialization: 0.25 writing: 0.125")
+print("Transform stats: Total Events: 42, resulting file size 1024")
+""")
+    result = watch.transform(sys.executable, cmd, _request(tmp_path), str(tmp_path))
+
+    assert result["status"] == "success"
+    assert result["exit-code"] == 0
+    assert result["total-events"] == 42
+    assert result["output-bytes"] == 1024
+    assert result["timings"] == {"query": 1.5, "serialization": 0.25, "writing": 0.125}
+    assert "error-class" not in result
+    assert "Total Events: 42" in (tmp_path / "slot-0.log").read_text()
+
+
+def test_transform_output_size_from_file(watch, tmp_path):
+    cmd = _transformer(tmp_path, """
+open(sys.argv[2], "w").write("x" * 10)
+print("Processed 7 events")
+""")
+    result = watch.transform(sys.executable, cmd, _request(tmp_path), str(tmp_path))
+
+    assert result["total-events"] == 7
+    assert result["output-bytes"] == 10
+
+
+def test_transform_failure(watch, tmp_path):
+    cmd = _transformer(tmp_path, """
+raise ValueError('key "foo" does not exist')
+""")
+    request = _request(tmp_path)
+    del request["logFile"]
+    result = watch.transform(sys.executable, cmd, request, str(tmp_path))
+
+    assert result["status"] == "failure"
+    assert result["exit-code"] == 1
+    assert result["error-class"] == "ValueError"
+    assert result["error"] == 'ValueError: key "foo" does not exist'
+    assert result["output-bytes"] == 0
+    assert os.path.isfile(tmp_path / "abc.log")
+
+
+def test_transform_stats_file(watch, tmp_path):
+    cmd = _transformer(tmp_path, """
+import json, os
+open(sys.argv[2], "w").write("x" * 10)
+print("Transform stats: Total Events: 1, resulting file size 1")
+json.dump({"total-events": 42, "output-bytes": 10,
+           "timings": {"query": 1.5, "serialization": 0.25, "writing": 0.125}},
+          open(os.environ["SERVICEX_STATS_FILE"], "w"))
+""")
+    request = _request(tmp_path)
+    request["statsFile"] = str(tmp_path / "slot-0.stats.json")
+    result = watch.transform(sys.executable, cmd, request, str(tmp_path))
+
+    assert result["total-events"] == 42
+    assert result["output-bytes"] == 10
+    assert result["timings"] == {"query": 1.5, "serialization": 0.25, "writing": 0.125}
@@ -0,0 +1,54 @@
+# Copyright (c) 2022, IRIS-HEP
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
+
+from transformer_sidecar.transformer_stats import TransformerStats
+
+
+def test_from_stats_file(tmp_path):
+    stats_path = tmp_path / "abc.stats.json"
+    stats_path.write_text(json.dumps({
+        "total-events": 10000,
+        "output-bytes": 102456,
+        "timings": {"query": 1.5, "serialization": 0.25, "writing": 0.125}
+    }))
+
+    stats = TransformerStats.from_stats_file(stats_path)
+    assert stats.total_events == 10000
+    assert stats.file_size == 102456
+    assert stats.log_body == ""
+
+
+def test_from_stats_file_missing(tmp_path):
+    assert TransformerStats.from_stats_file(tmp_path / "abc.stats.json") is None
+
+
+def test_from_stats_file_truncated(tmp_path):
+    stats_path = tmp_path / "abc.stats.json"
+    stats_path.write_text('{"total-events": 10')
+    assert TransformerStats.from_stats_file(stats_path) is None